@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+#
+#  bench_build.py
+"""
+Benchmarks for the conda build pipeline, using synthetic projects generated offline.
+
+Run with::
+
+	python benchmarks/bench_build.py --save baseline.json
+	python benchmarks/bench_build.py --baseline baseline.json --threshold 0.1
+
+Requirements are validated against a local channel, so no network access is needed.
+Baselines are specific to the machine they were recorded on, so they aren't committed to the repository.
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextlib
+import io
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# 3rd party
+import click
+from domdf_python_tools.paths import PathPlus
+from whey.foreman import Foreman
+
+# this package
+from whey_conda import CondaBuilder
+from whey_conda.archive import TarBz2ArchiveWriter, scan_files
+from whey_conda.channels import ChannelCache
+
+__all__ = (
+		"CORPORA",
+		"Corpus",
+		"compare",
+		"count_stat_calls",
+		"make_channel",
+		"make_project",
+		"run_benchmarks",
+		)
+
+
+class Corpus(NamedTuple):
+	"""
+	The shape of a synthetic project.
+	"""
+
+	#: The number of Python files in the package.
+	files: int
+
+	#: The approximate size of each file, in bytes.
+	file_size: int
+
+	#: The number of runtime requirements.
+	requirements: int
+
+
+CORPORA: Dict[str, Corpus] = {
+		"small": Corpus(files=10, file_size=1_000, requirements=2),
+		"medium": Corpus(files=250, file_size=10_000, requirements=10),
+		"huge": Corpus(files=5_000, file_size=50_000, requirements=50),
+		}
+
+WORDS = ("spam", "eggs", "ham", "bacon", "sausage", "beans", "lobster", "thermidor", "truffle", "pate")
+
+
+def make_channel(directory: PathPlus, corpus: Corpus) -> PathPlus:
+	"""
+	Create a local conda channel containing the requirements of a synthetic project.
+
+	:param directory:
+	:param corpus:
+
+	:returns: The path to the channel.
+	"""
+
+	channel_dir = directory / "channel"
+	(channel_dir / "noarch").maybe_make(parents=True)
+
+	packages = {
+			f"requirement-{idx}-1.0.0-py_0.tar.bz2": {"name": f"requirement-{idx}", "version": "1.0.0"}
+			for idx in range(corpus.requirements)
+			}
+	(channel_dir / "noarch" / "repodata.json").dump_json({"packages": packages})
+
+	return channel_dir
+
+
+def make_project(directory: PathPlus, corpus: Corpus, channel_dir: PathPlus) -> PathPlus:
+	"""
+	Create a synthetic project.
+
+	The content of the files is generated from a fixed seed, so it is the same on every run.
+
+	:param directory:
+	:param corpus:
+	:param channel_dir: The local channel to validate the requirements against.
+
+	:returns: The path to the project.
+	"""
+
+	project_dir = directory / "project"
+	package_dir = project_dir / "bench_project"
+	package_dir.maybe_make(parents=True)
+
+	requirements = ", ".join(f'"requirement-{idx}>=1.0"' for idx in range(corpus.requirements))
+
+	(project_dir / "pyproject.toml").write_lines([
+			"[project]",
+			'name = "bench-project"',
+			'version = "1.2.3"',
+			'description = "A synthetic project for benchmarking"',
+			f"dependencies = [{requirements}]",
+			'',
+			"[tool.whey]",
+			'package = "bench_project"',
+			'',
+			"[tool.whey-conda]",
+			f'conda-channels = ["{channel_dir.as_uri()}"]',
+			])
+
+	rng = random.Random(1234)
+
+	for idx in range(corpus.files):
+		# Ten modules per subpackage.
+		subpackage_dir = package_dir / f"sub{idx // 10}"
+		if not subpackage_dir.is_dir():
+			subpackage_dir.mkdir()
+			(subpackage_dir / "__init__.py").write_text('')
+
+		lines = []
+		size = 0
+		while size < corpus.file_size:
+			line = f"{rng.choice(WORDS)}_{rng.randrange(10_000)} = {rng.random()!r}  # {' '.join(rng.sample(WORDS, 3))}"
+			lines.append(line)
+			size += len(line) + 1
+
+		(subpackage_dir / f"module{idx}.py").write_lines(lines)
+
+	(package_dir / "__init__.py").write_text('')
+
+	return project_dir
+
+
+def _time(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+	# Returns the minimum and median wall-clock time of calling func, in seconds.
+
+	times = []
+
+	for _ in range(repeat):
+		start_time = time.perf_counter()
+		func()
+		times.append(time.perf_counter() - start_time)
+
+	return {"min": min(times), "median": statistics.median(times)}
+
+
+def _archive_tree(directory: PathPlus, filename: PathPlus) -> None:
+	# Add every file in directory to a new archive.
+
+	with TarBz2ArchiveWriter(filename) as archive:
+		for entry in scan_files(directory):
+			archive.add(entry.path, entry.relative_path, stat_result=entry.stat)
+
+
+class _CountingDirEntry:
+	# Wraps an os.DirEntry, counting the calls to stat().
+
+	def __init__(self, entry: "os.DirEntry[str]", counter: List[int]):
+		self._entry = entry
+		self._counter = counter
+
+	def __getattr__(self, name: str) -> Any:
+		return getattr(self._entry, name)
+
+	def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+		self._counter[0] += 1
+		return self._entry.stat(follow_symlinks=follow_symlinks)
+
+
+def count_stat_calls(func: Callable[[], object]) -> int:
+	"""
+	Returns the number of times ``func`` stats a file.
+
+	Calls to :func:`os.stat`, :func:`os.lstat` and :meth:`os.DirEntry.stat` are counted,
+	which covers :mod:`pathlib`, :mod:`tarfile` and :func:`os.scandir`.
+
+	:param func:
+	"""
+
+	counter = [0]
+	real_stat, real_lstat, real_scandir = os.stat, os.lstat, os.scandir
+
+	def counting_stat(*args, **kwargs) -> os.stat_result:  # noqa: MAN002
+		counter[0] += 1
+		return real_stat(*args, **kwargs)
+
+	def counting_lstat(*args, **kwargs) -> os.stat_result:  # noqa: MAN002
+		counter[0] += 1
+		return real_lstat(*args, **kwargs)
+
+	@contextlib.contextmanager
+	def counting_scandir(*args, **kwargs) -> Iterator[Iterator[_CountingDirEntry]]:  # noqa: MAN002
+		with real_scandir(*args, **kwargs) as it:
+			yield (_CountingDirEntry(entry, counter) for entry in it)
+
+	os.stat, os.lstat, os.scandir = counting_stat, counting_lstat, counting_scandir  # type: ignore[assignment]
+
+	try:
+		func()
+	finally:
+		os.stat, os.lstat, os.scandir = real_stat, real_lstat, real_scandir
+
+	return counter[0]
+
+
+def run_benchmarks(corpus: Corpus, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+	"""
+	Time the conda build pipeline for a synthetic project.
+
+	:param corpus: The shape of the project.
+	:param repeat: The number of times to run each benchmark.
+
+	:returns: Mapping of benchmark names to the minimum and median time, in seconds,
+		and for ``create_conda_archive`` the number of times files are statted.
+		``archive_empty_files`` archives as many empty files as the project has,
+		so its median time per file (``per_file_us``, in microseconds) is the cost of each member's header.
+	"""
+
+	with tempfile.TemporaryDirectory() as tmpdir:
+		tmp_path = PathPlus(tmpdir)
+		channel_dir = make_channel(tmp_path, corpus)
+		project_dir = make_project(tmp_path, corpus, channel_dir)
+		out_dir = tmp_path / "dist"
+
+		def make_builder() -> CondaBuilder:
+			foreman = Foreman(project_dir=project_dir)
+			return CondaBuilder(
+					project_dir=foreman.project_dir,
+					config=foreman.config,
+					build_dir=tmp_path / "build",
+					out_dir=out_dir,
+					channel_cache=ChannelCache(tmp_path / "cache"),
+					force=True,
+					)
+
+		def build_conda() -> None:
+			# Start from scratch each time, so the wheel is built too.
+			shutil.rmtree(out_dir, ignore_errors=True)
+			make_builder().build_conda()
+
+		results = {}
+
+		# The builders print their progress, which isn't of interest here.
+		with contextlib.redirect_stdout(io.StringIO()):
+			results["build_conda"] = _time(build_conda, repeat)
+
+			builder = make_builder()
+			wheel_file = out_dir / builder.build_wheel()
+			builder.clear_build_dir()
+
+			wheel_contents_dir = tmp_path / "wheel_contents"
+			with zipfile.ZipFile(wheel_file) as wheel:
+				wheel.extractall(wheel_contents_dir)
+
+			results["get_runtime_requirements"] = _time(builder.get_runtime_requirements, repeat)
+			results["write_conda_index"] = _time(builder.write_conda_index, repeat)
+			results["create_conda_archive"] = _time(lambda: builder.create_conda_archive(wheel_contents_dir), repeat)
+			results["create_conda_archive"]["stat_calls"] = count_stat_calls(
+					lambda: builder.create_conda_archive(wheel_contents_dir),
+					)
+			results["create_conda_archive_from_wheel"] = _time(
+					lambda: builder.create_conda_archive_from_wheel(wheel_file),
+					repeat,
+					)
+
+		empty_dir = tmp_path / "empty"
+		for idx in range(corpus.files):
+			subdir = empty_dir / f"sub{idx // 10}"
+			subdir.maybe_make(parents=True)
+			(subdir / f"file{idx}").touch()
+
+		results["archive_empty_files"] = _time(lambda: _archive_tree(empty_dir, tmp_path / "empty.tar.bz2"), repeat)
+		results["archive_empty_files"]["per_file_us"] = results["archive_empty_files"]["median"] / corpus.files * 1e6
+
+	return results
+
+
+def compare(
+		results: Dict[str, Dict[str, Dict[str, float]]],
+		baseline: Dict[str, Dict[str, Dict[str, float]]],
+		threshold: float,
+		) -> List[Tuple[str, str, float]]:
+	"""
+	Compare the results of a run against a baseline.
+
+	:param results: Mapping of corpus names to benchmark results.
+	:param baseline: Mapping of corpus names to benchmark results.
+	:param threshold: The fractional increase in the median time which counts as a regression.
+
+	:returns: The corpus name, benchmark name, and ratio of the new median time to the baseline median time,
+		for each benchmark which has regressed.
+	"""
+
+	regressions = []
+
+	for corpus_name, corpus_results in results.items():
+		for benchmark, timing in corpus_results.items():
+			if benchmark not in baseline.get(corpus_name, {}):
+				continue
+
+			ratio = timing["median"] / baseline[corpus_name][benchmark]["median"]
+			if ratio > 1 + threshold:
+				regressions.append((corpus_name, benchmark, ratio))
+
+	return regressions
+
+
+@click.option(
+		"--threshold",
+		type=click.FLOAT,
+		default=0.1,
+		help="The fractional increase in the median time which counts as a regression.",
+		show_default=True,
+		)
+@click.option(
+		"--baseline",
+		type=click.STRING,
+		default=None,
+		help="Compare the results against the baseline in the given JSON file.",
+		metavar="FILE",
+		)
+@click.option(
+		"--save",
+		type=click.STRING,
+		default=None,
+		help="Save the results to the given JSON file, for use as a baseline.",
+		metavar="FILE",
+		)
+@click.option(
+		"-r",
+		"--repeat",
+		type=click.INT,
+		default=5,
+		help="The number of times to run each benchmark.",
+		show_default=True,
+		)
+@click.option(
+		"-c",
+		"--corpus",
+		"corpora",
+		type=click.Choice(list(CORPORA)),
+		multiple=True,
+		default=["small", "medium"],
+		help="The synthetic projects to benchmark. May be given multiple times.",
+		show_default=True,
+		)
+@click.command()
+def main(
+		corpora: Tuple[str, ...] = ("small", "medium"),
+		repeat: int = 5,
+		save: Optional[str] = None,
+		baseline: Optional[str] = None,
+		threshold: float = 0.1,
+		) -> None:
+	"""
+	Benchmark the conda build pipeline.
+	"""
+
+	results = {}
+
+	for corpus_name in corpora:
+		corpus = CORPORA[corpus_name]
+		click.echo(f"{corpus_name}: {corpus.files} files of {corpus.file_size} bytes, {corpus.requirements} requirements")
+
+		results[corpus_name] = run_benchmarks(corpus, repeat=repeat)
+
+		for benchmark, timing in results[corpus_name].items():
+			line = f"  {benchmark:<32} {timing['min']:8.4f}s min  {timing['median']:8.4f}s median"
+			if "stat_calls" in timing:
+				line += f"  {timing['stat_calls']:.0f} stat calls"
+			if "per_file_us" in timing:
+				line += f"  {timing['per_file_us']:.1f}us per file"
+			click.echo(line)
+
+	if save is not None:
+		PathPlus(save).dump_json(
+				{"python": platform.python_version(), "platform": platform.platform(), "results": results},
+				indent=2,
+				)
+
+	if baseline is not None:
+		regressions = compare(results, PathPlus(baseline).load_json()["results"], threshold)
+
+		for corpus_name, benchmark, ratio in regressions:
+			click.echo(f"Regression in {corpus_name}/{benchmark}: {ratio:.2f}x the baseline", err=True)
+
+		if regressions:
+			sys.exit(1)
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,286 @@
+# stdlib
+import bz2
+import io
+import os
+import random
+import tarfile
+from typing import IO, List, Optional
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+import whey_conda.archive
+from whey_conda.archive import (
+		CondaArchiveWriter,
+		FanOutWriter,
+		ParallelBZ2Writer,
+		TarBz2ArchiveWriter,
+		get_archive_writer,
+		scan_files
+		)
+
+
+def make_data(size: int) -> bytes:
+	rng = random.Random(1234)
+	words = [b"spam", b"eggs", b"ham", b"bacon", b"sausage", b"\n"]
+	data = bytearray()
+
+	while len(data) < size:
+		data += rng.choice(words)
+
+	return bytes(data[:size])
+
+
+@pytest.mark.parametrize("size", [0, 10, 99_999, 100_000, 350_001])
+@pytest.mark.parametrize("threads", [1, 2, 4])
+def test_parallel_bz2_writer(size: int, threads: int):
+	data = make_data(size)
+	buf = io.BytesIO()
+
+	writer = ParallelBZ2Writer(buf, compresslevel=1, threads=threads)
+	for idx in range(0, len(data), 4096):
+		writer.write(data[idx:idx + 4096])
+	writer.close()
+
+	assert writer.closed
+	assert not buf.closed
+	assert bz2.decompress(buf.getvalue()) == data
+
+	# One stream per 100 kB block
+	assert buf.getvalue().count(b"BZh1") >= max(1, -(-size // 100_000))
+
+
+def test_parallel_bz2_writer_closed():
+	writer = ParallelBZ2Writer(io.BytesIO())
+	writer.close()
+	writer.close()
+
+	with pytest.raises(ValueError, match="write to closed file"):
+		writer.write(b"spam")
+
+
+def write_archive(filename: PathPlus, threads: int) -> None:
+	with TarBz2ArchiveWriter(filename, threads=threads) as writer:
+		for idx in range(10):
+			data = make_data(60_000 * idx)
+			tarinfo = tarfile.TarInfo(f"site-packages/spam/file_{idx}.txt")
+			tarinfo.size = len(data)
+			tarinfo.mtime = 1602552000
+			writer.addfile(tarinfo, io.BytesIO(data))
+
+		writer.add_bytes("info/files", b"site-packages/spam/file_0.txt\n")
+
+
+def test_tar_bz2_parallel(tmp_pathplus: PathPlus):
+	write_archive(tmp_pathplus / "serial.tar.bz2", threads=1)
+	write_archive(tmp_pathplus / "parallel.tar.bz2", threads=4)
+
+	serial = bz2.decompress((tmp_pathplus / "serial.tar.bz2").read_bytes())
+	parallel = bz2.decompress((tmp_pathplus / "parallel.tar.bz2").read_bytes())
+	assert serial == parallel
+
+	with tarfile.open(tmp_pathplus / "parallel.tar.bz2") as tar:
+		assert len(tar.getnames()) == 11
+
+
+def test_threads_per_cpu(tmp_pathplus: PathPlus):
+	with TarBz2ArchiveWriter(tmp_pathplus / "archive.tar.bz2", threads=0) as writer:
+		assert writer.threads == (os.cpu_count() or 1)
+
+
+def test_get_archive_writer():
+	assert get_archive_writer("tar.bz2") is TarBz2ArchiveWriter
+
+	with pytest.raises(ValueError, match="Unknown package format 'zip'"):
+		get_archive_writer("zip")
+
+
+def test_scan_files(tmp_pathplus: PathPlus):
+	tree = tmp_pathplus / "tree"
+	for filename in ("b.py", "a/z.py", "a-b/c.py", "a/b/c.py", "a.py", "A.py"):
+		(tree / filename).parent.maybe_make(parents=True)
+		(tree / filename).write_text(filename)
+
+	(tree / "empty").mkdir()
+	(tree / "link.py").symlink_to(tree / "b.py")
+	(tree / "link_dir").symlink_to(tree / "a")
+
+	entries = scan_files(tree)
+
+	expected = [p for p in sorted(tree.rglob('*')) if p.is_file() and "link_dir" not in p.parts]
+	assert [entry.path for entry in entries] == [os.fspath(p) for p in expected]
+	assert [entry.relative_path for entry in entries] == [p.relative_to(tree).as_posix() for p in expected]
+	assert [entry.stat for entry in entries] == [os.lstat(p) for p in expected]
+
+
+def test_add_with_stat_result(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "spam.py").write_text("print('hello world')")
+	(tmp_pathplus / "eggs.py").symlink_to("spam.py")
+	(tmp_pathplus / "spam.py").chmod(0o754)
+
+	with TarBz2ArchiveWriter(tmp_pathplus / "archive.tar.bz2") as archive:
+		for entry in scan_files(tmp_pathplus):
+			archive.add(entry.path, entry.relative_path, stat_result=entry.stat)
+
+	with tarfile.open(tmp_pathplus / "archive.tar.bz2") as tar, tarfile.open(os.devnull, 'w') as header_factory:
+		for name in ("spam.py", "eggs.py"):
+			tarinfo = header_factory.gettarinfo(tmp_pathplus / name, arcname=name)
+			tarinfo.mtime = int(tarinfo.mtime)
+			tarinfo.mode &= 0o7777
+			expected = dict(tarinfo.get_info())
+
+			actual = dict(tar.getmember(name).get_info())
+			del actual["chksum"], expected["chksum"]
+			assert actual == expected
+
+		assert tar.extractfile("spam.py").read() == b"print('hello world')"  # type: ignore[union-attr]
+
+
+def test_add_reproducible_skips_name_lookups(tmp_pathplus: PathPlus, monkeypatch):
+	(tmp_pathplus / "spam.py").write_bytes(b"spam" * 1024 * 1024)
+
+	def lookup(id_: int) -> str:
+		raise AssertionError("User and group names should not be looked up")
+
+	monkeypatch.setattr(whey_conda.archive, "_get_uname", lookup)
+	monkeypatch.setattr(whey_conda.archive, "_get_gname", lookup)
+
+	with TarBz2ArchiveWriter(tmp_pathplus / "archive.tar.bz2", source_date_epoch=0) as archive:
+		archive.add(tmp_pathplus / "spam.py", "spam.py")
+
+	with tarfile.open(tmp_pathplus / "archive.tar.bz2") as tar:
+		member = tar.getmember("spam.py")
+		assert (member.uname, member.gname, member.size) == ('', '', 4 * 1024 * 1024)
+		assert tar.extractfile(member).read() == b"spam" * 1024 * 1024  # type: ignore[union-attr]
+
+
+@pytest.mark.parametrize("package_format", ["tar.bz2", "conda"])
+@pytest.mark.parametrize("max_buffer", [1, 64 * 1024 * 1024])
+def test_add_many(tmp_pathplus: PathPlus, package_format: str, max_buffer: int):
+	pytest.importorskip("zstandard")
+
+	source_dir = tmp_pathplus / "source"
+	(source_dir / "spam").maybe_make(parents=True)
+	(source_dir / "spam" / "__init__.py").write_bytes(make_data(1024 * 1024 + 17))
+	(source_dir / "spam" / "empty.py").touch()
+	(source_dir / "spam" / "link.py").symlink_to("__init__.py")
+	(source_dir / "eggs.py").write_bytes(make_data(1000))
+
+	writer_class = get_archive_writer(package_format)
+	files = [(entry.path, entry.relative_path, entry.stat) for entry in scan_files(source_dir)]
+
+	# The name of a .conda archive is recorded inside it.
+	(tmp_pathplus / "serial").mkdir()
+	(tmp_pathplus / "pipelined").mkdir()
+	filename = f"spam-1.0.0-py_1.{package_format}"
+
+	with writer_class(tmp_pathplus / "serial" / filename, source_date_epoch=0) as serial:
+		for name, arcname, stat_result in files:
+			serial.add(name, arcname, stat_result=stat_result)
+
+	with writer_class(tmp_pathplus / "pipelined" / filename, source_date_epoch=0) as pipelined:
+		pipelined.add_many(files, max_buffer=max_buffer)
+
+	assert pipelined.paths == serial.paths
+	assert [entry["_path"] for entry in serial.paths] == [arcname for _, arcname, _ in files]
+	assert {"_path": "spam/link.py", "path_type": "softlink"} in serial.paths
+	assert (tmp_pathplus / "pipelined" / filename).read_bytes() == (tmp_pathplus / "serial" / filename).read_bytes()
+
+
+def test_add_many_errors(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "spam.py").write_bytes(make_data(1000))
+	stat_result = (tmp_pathplus / "spam.py").stat()
+	(tmp_pathplus / "spam.py").write_bytes(make_data(500))
+
+	with TarBz2ArchiveWriter(tmp_pathplus / "archive.tar.bz2") as archive:
+		with pytest.raises(OSError, match="unexpected end of data"):
+			archive.add_many([(tmp_pathplus / "spam.py", "spam.py", stat_result)])
+
+		with pytest.raises(FileNotFoundError):
+			archive.add_many([(tmp_pathplus / "eggs.py", "eggs.py", None)])
+
+
+@pytest.mark.parametrize("package_format, level", [("tar.bz2", 0), ("tar.bz2", 10), ("conda", 23)])
+def test_invalid_compression_level(tmp_pathplus: PathPlus, package_format: str, level: int):
+	writer_class = get_archive_writer(package_format)
+
+	with pytest.raises(ValueError, match=f"Invalid compression level {level} for '.{package_format}' packages"):
+		writer_class(tmp_pathplus / f"spam.{package_format}", level=level)
+
+	assert not (tmp_pathplus / f"spam.{package_format}").exists()
+
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_tar_bz2_compression_level(tmp_pathplus: PathPlus, threads: int):
+	data = make_data(1_000_000)
+
+	for level in (1, 9):
+		with TarBz2ArchiveWriter(tmp_pathplus / f"{level}.tar.bz2", threads=threads, level=level) as archive:
+			archive.add_bytes("spam.txt", data)
+
+		assert archive.level == level
+
+		with tarfile.open(tmp_pathplus / f"{level}.tar.bz2") as tar:
+			assert tar.extractfile("spam.txt").read() == data  # type: ignore[union-attr]
+
+	# Level 1 uses 100 kB blocks, which compress less well than level 9's 900 kB blocks.
+	assert (tmp_pathplus / "1.tar.bz2").stat().st_size > (tmp_pathplus / "9.tar.bz2").stat().st_size
+
+
+def test_fan_out_writer(tmp_pathplus: PathPlus):
+	pytest.importorskip("zstandard")
+
+	members = [("spam/__init__.py", make_data(1024 * 1024 + 17)), ("spam/empty.py", b''), ("eggs.py", make_data(1000))]
+	outputs = [("tar.bz2", "spam-1.0.0-py_1.tar.bz2"), ("conda", "spam-1.0.0-py_1.conda"), ("conda", "spam-1.0.0-py_2.conda")]
+
+	def open_writers(directory: PathPlus) -> List[CondaArchiveWriter]:
+		directory.mkdir()
+		return [
+				get_archive_writer(package_format)(directory / filename, source_date_epoch=0)
+				for package_format, filename in outputs
+				]
+
+	def finish(writers: List[CondaArchiveWriter]) -> None:
+		# Each archive gets its own metadata.
+		for writer in writers:
+			writer.add_bytes("info/index.json", writer.filename.name.encode("UTF-8"))
+			writer.close()
+
+	serial_writers = open_writers(tmp_pathplus / "serial")
+	for writer in serial_writers:
+		for arcname, data in members:
+			writer.add_bytes(arcname, data)
+	finish(serial_writers)
+
+	fan_out_writers = open_writers(tmp_pathplus / "fan_out")
+	with FanOutWriter(fan_out_writers, max_buffer=1) as fan_out:
+		for arcname, data in members:
+			fan_out.add_bytes(arcname, data)
+	finish(fan_out_writers)
+
+	for (_, filename), serial, fanned_out in zip(outputs, serial_writers, fan_out_writers):
+		assert fanned_out.paths == serial.paths
+		assert (tmp_pathplus / "fan_out" / filename).read_bytes() == (tmp_pathplus / "serial" / filename).read_bytes()
+
+
+def test_fan_out_writer_errors(tmp_pathplus: PathPlus):
+
+	class FailingWriter(TarBz2ArchiveWriter):
+
+		def _addfile(self, tarinfo: tarfile.TarInfo, fileobj: Optional[IO[bytes]] = None) -> None:
+			if tarinfo.name == "eggs.py":
+				raise OSError("Disk full")
+			super()._addfile(tarinfo, fileobj)
+
+	writers = [TarBz2ArchiveWriter(tmp_pathplus / "spam.tar.bz2"), FailingWriter(tmp_pathplus / "eggs.tar.bz2")]
+
+	with pytest.raises(OSError, match="Disk full"):
+		with FanOutWriter(writers, max_buffer=1) as fan_out:
+			fan_out.add_bytes("spam.py", make_data(1000))
+			for idx in range(100):
+				fan_out.add_bytes("eggs.py", make_data(100_000))
+
+	for writer in writers:
+		writer.close()
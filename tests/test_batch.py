@@ -0,0 +1,68 @@
+# stdlib
+from typing import List
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus
+from pyproject_examples.example_configs import MINIMAL_CONFIG
+
+# this package
+from whey_conda.__main__ import main
+from whey_conda.batch import build_many
+
+
+@pytest.fixture()
+def projects(tmp_pathplus: PathPlus) -> List[PathPlus]:
+	project_dirs = []
+
+	for name in ("spam", "eggs", "ham"):
+		project_dir = tmp_pathplus / name
+		project_dir.maybe_make()
+		(project_dir / "pyproject.toml").write_clean(MINIMAL_CONFIG.replace("spam", name))
+		project_dirs.append(project_dir)
+
+	# "eggs" has no package directory, so fails to build.
+	for name in ("spam", "ham"):
+		(tmp_pathplus / name / name).maybe_make()
+		(tmp_pathplus / name / name / "__init__.py").write_clean("print('hello world')")
+
+	return project_dirs
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_many(projects: List[PathPlus], tmp_pathplus: PathPlus, jobs: int):
+	results = build_many(projects, tmp_pathplus / "dist", jobs=jobs)
+
+	assert [result.project_dir for result in results] == [p.as_posix() for p in projects]
+	assert [result.success for result in results] == [True, False, True]
+
+	assert results[0].archive == (tmp_pathplus / "dist" / "spam-2020.0.0-py_1.tar.bz2").as_posix()
+	assert results[2].archive == (tmp_pathplus / "dist" / "ham-2020.0.0-py_1.tar.bz2").as_posix()
+	assert PathPlus(results[0].archive).is_file()
+	assert results[0].error is None
+
+	assert results[1].archive is None
+	assert results[1].error is not None
+	assert results[1].error.startswith("FileNotFoundError: Package directory 'eggs' not found")
+
+	assert all(result.duration > 0 for result in results)
+
+	assert results[0].timings is not None
+	assert [phase["name"] for phase in results[0].timings["phases"]][:2] == ["fingerprint", "fingerprint/sources"]
+
+
+def test_build_many_cli(projects: List[PathPlus], tmp_pathplus: PathPlus):
+	runner = CliRunner()
+
+	result: Result = runner.invoke(
+			main,
+			args=["build-many", "-j", '1', *(p.as_posix() for p in projects[::2])],
+			)
+	assert result.exit_code == 0
+	assert (tmp_pathplus / "spam" / "dist" / "spam-2020.0.0-py_1.tar.bz2").is_file()
+	assert (tmp_pathplus / "ham" / "dist" / "ham-2020.0.0-py_1.tar.bz2").is_file()
+
+	result = runner.invoke(main, args=["build-many", "-j", '1', *(p.as_posix() for p in projects)])
+	assert result.exit_code == 1
+	assert "1 of 3 builds failed." in result.stdout
@@ -1,12 +1,21 @@
 # stdlib
+import hashlib
+import io
+import json
+import os
+import tarfile
 import tempfile
+import threading
+import zipfile
 from typing import Any, Dict, List
 
 # 3rd party
 import pytest
+import zstandard
 from coincidence import min_version
 from coincidence.regressions import AdvancedDataRegressionFixture
-from domdf_python_tools.paths import PathPlus
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
 from pyproject_examples.example_configs import (
 		AUTHORS,
 		CLASSIFIERS,
@@ -21,7 +30,7 @@ from pyproject_examples.example_configs import (
 		UNICODE,
 		URLS
 		)
-from whey.builder import SDistBuilder
+from whey.builder import SDistBuilder, WheelBuilder
 from whey.config import load_toml
 
 # this package
@@ -42,6 +51,7 @@ from tests.example_configs import (
 		)
 from tests.utils import TarFile, TarFileRegressionFixture, get_stdouterr
 from whey_conda import CondaBuilder
+from whey_conda.__main__ import main
 
 
 @pytest.mark.parametrize(
@@ -573,3 +583,450 @@ def test_build_stubs_name(
 
 
 # TODO: test some bad configurations
+
+
+@pytest.mark.usefixtures("fixed_datetime")
+def test_build_conda_format(
+		tmp_pathplus: PathPlus,
+		advanced_data_regression: AdvancedDataRegressionFixture,
+		tar_regression: TarFileRegressionFixture,
+		):
+	(tmp_pathplus / "pyproject.toml").write_clean(f'{MINIMAL_CONFIG}\n[tool.whey-conda]\npackage-format = "conda"')
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world)")
+
+	data: Dict[str, Any] = {}
+
+	with tempfile.TemporaryDirectory() as tmpdir:
+		conda_builder = CondaBuilder(
+				project_dir=tmp_pathplus,
+				config=load_toml(tmp_pathplus / "pyproject.toml"),
+				build_dir=tmpdir,
+				out_dir=tmp_pathplus,
+				colour=False,
+				)
+
+		conda_file = conda_builder.build_conda()
+		assert conda_file == "spam-2020.0.0-py_1.conda"
+
+	with zipfile.ZipFile(tmp_pathplus / conda_file) as conda_zip:
+		data["zip_content"] = conda_zip.namelist()
+		assert json.loads(conda_zip.read("metadata.json")) == {"conda_pkg_format_version": 2}
+
+		for component in ("pkg", "info"):
+			tar_data = zstandard.ZstdDecompressor().decompressobj().decompress(
+					conda_zip.read(f"{component}-spam-2020.0.0-py_1.tar.zst"),
+					)
+			with TarFile.open(fileobj=io.BytesIO(tar_data)) as tar:
+				data[f"{component}_content"] = sorted(tar.getnames())
+
+				if component == "info":
+					assert sorted(tar.read_text("info/files").splitlines()) == data["pkg_content"]
+					tar_regression.check_archive(tar, "info/index.json", extension="_index.json")
+				else:
+					assert tar.read_text("site-packages/spam/__init__.py") == "print('hello world)\n"
+
+	advanced_data_regression.check(data)
+
+
+def test_build_no_intermediate_files(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world)")
+
+	build_dir = tmp_pathplus / "build"
+
+	conda_builder = CondaBuilder(
+			project_dir=tmp_pathplus,
+			config=load_toml(tmp_pathplus / "pyproject.toml"),
+			build_dir=build_dir,
+			out_dir=tmp_pathplus / "dist",
+			colour=False,
+			)
+
+	conda_file = conda_builder.build_conda()
+
+	# The build directory is only used to build the wheel.
+	assert not list(build_dir.iterdir())
+	assert sorted(p.name for p in (tmp_pathplus / "dist").iterdir()) == [
+			"spam-2020.0.0-py3-none-any.whl",
+			conda_file,
+			f"{conda_file}.fingerprint",
+			f"{conda_file}.json",
+			]
+
+
+def test_build_incremental(tmp_pathplus: PathPlus, capsys, monkeypatch):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world)")
+
+	def build(force: bool = False) -> PathPlus:
+		conda_builder = CondaBuilder(
+				project_dir=tmp_pathplus,
+				config=load_toml(tmp_pathplus / "pyproject.toml"),
+				build_dir=tmp_pathplus / "build",
+				out_dir=tmp_pathplus / "dist",
+				colour=False,
+				force=force,
+				)
+		return tmp_pathplus / "dist" / conda_builder.build_conda()
+
+	conda_file = build()
+	fingerprint = (tmp_pathplus / "dist" / f"{conda_file.name}.fingerprint").read_text()
+	os.utime(conda_file, ns=(0, 0))
+	capsys.readouterr()
+
+	# Unchanged
+	assert build() == conda_file
+	assert conda_file.stat().st_mtime_ns == 0
+	assert capsys.readouterr().out.endswith("is up to date\n")
+
+	# Forced
+	build(force=True)
+	assert conda_file.stat().st_mtime_ns != 0
+	assert "Conda package created at" in capsys.readouterr().out
+
+	# Source changed
+	os.utime(conda_file, ns=(0, 0))
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world')")
+	build()
+	assert conda_file.stat().st_mtime_ns != 0
+	assert (tmp_pathplus / "dist" / f"{conda_file.name}.fingerprint").read_text() != fingerprint
+
+	# Config changed
+	os.utime(conda_file, ns=(0, 0))
+	(tmp_pathplus / "pyproject.toml").write_clean(f'{MINIMAL_CONFIG}\n[tool.whey-conda]\nconda-description = "Spam"')
+	build()
+	assert conda_file.stat().st_mtime_ns != 0
+
+	# Reproducible build requested
+	os.utime(conda_file, ns=(0, 0))
+	monkeypatch.setenv("SOURCE_DATE_EPOCH", "1580601600")
+	build()
+	assert conda_file.stat().st_mtime_ns != 0
+
+	os.utime(conda_file, ns=(0, 0))
+	assert build() == conda_file
+	assert conda_file.stat().st_mtime_ns == 0
+
+	# Package removed
+	conda_file.unlink()
+	build()
+	assert conda_file.is_file()
+
+
+def test_build_background_requirements(tmp_pathplus: PathPlus, monkeypatch):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world')")
+
+	conda_builder = CondaBuilder(
+			project_dir=tmp_pathplus,
+			config=load_toml(tmp_pathplus / "pyproject.toml"),
+			build_dir=tmp_pathplus / "build",
+			out_dir=tmp_pathplus / "dist",
+			colour=False,
+			)
+
+	wheel_started = threading.Event()
+	build_wheel = conda_builder.build_wheel
+
+	def wrapped_build_wheel() -> str:
+		wheel_started.set()
+		return build_wheel()
+
+	def validate_requirements(requirements, *args, **kwargs):  # noqa: MAN001,MAN002
+		# Only returns if the wheel is built while the requirements are being validated.
+		assert wheel_started.wait(timeout=30)
+		return sorted(requirements)
+
+	monkeypatch.setattr(conda_builder, "build_wheel", wrapped_build_wheel)
+	monkeypatch.setattr("whey_conda.validate_requirements", validate_requirements)
+
+	conda_file = tmp_pathplus / "dist" / conda_builder.build_conda()
+	fingerprint = (tmp_pathplus / "dist" / f"{conda_file.name}.fingerprint").read_text().strip()
+	assert fingerprint == conda_builder.get_build_fingerprint()
+
+	def invalid_requirements(requirements, *args, **kwargs):  # noqa: MAN001,MAN002
+		raise ValueError("Invalid requirements")
+
+	monkeypatch.setattr("whey_conda.validate_requirements", invalid_requirements)
+	conda_builder.force = True
+
+	with pytest.raises(ValueError, match="Invalid requirements"):
+		conda_builder.build_conda()
+
+	assert not (tmp_pathplus / "dist" / f"{conda_file.name}.fingerprint").exists()
+
+
+def test_build_from_wheel(tmp_pathplus: PathPlus, capsys):
+	(tmp_pathplus / "pyproject.toml").write_clean(f'{MINIMAL_CONFIG}\n[project.scripts]\nspam = "spam:main"')
+	(tmp_pathplus / "LICENSE").write_clean("This is the license")
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world)")
+
+	def make_builder(builder_cls=CondaBuilder):  # noqa: MAN001,MAN002
+		return builder_cls(
+				project_dir=tmp_pathplus,
+				config=load_toml(tmp_pathplus / "pyproject.toml"),
+				build_dir=tmp_pathplus / "build",
+				out_dir=tmp_pathplus / "dist",
+				verbose=True,
+				colour=False,
+				)
+
+	wheel_file = tmp_pathplus / "dist" / make_builder(WheelBuilder).build_wheel()
+	capsys.readouterr()
+
+	conda_builder = make_builder()
+	assert conda_builder.find_wheel() == wheel_file
+	conda_builder.build_conda()
+	assert "Using existing wheel spam-2020.0.0-py3-none-any.whl" in capsys.readouterr().out
+
+	# Removed file
+	(tmp_pathplus / "spam" / "extra.py").write_clean("pass")
+	make_builder(WheelBuilder).build_wheel()
+	(tmp_pathplus / "spam" / "extra.py").unlink()
+	assert make_builder().find_wheel() is None
+
+	# Changed metadata
+	make_builder(WheelBuilder).build_wheel()
+	assert make_builder().find_wheel() == wheel_file
+	(tmp_pathplus / "pyproject.toml").write_clean(f"{MINIMAL_CONFIG}\ndescription = 'Spam'")
+	assert make_builder().find_wheel() is None
+
+	capsys.readouterr()
+	make_builder().build_conda()
+	assert "Using existing wheel" not in capsys.readouterr().out
+	assert make_builder().find_wheel() == wheel_file
+
+
+def test_build_from_wheel_explicit(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world)")
+
+	with zipfile.ZipFile(tmp_pathplus / "eggs-1.0.0-py3-none-any.whl", 'w') as wheel:
+		wheel.writestr("eggs/__init__.py", "print('hello world')")
+		wheel.writestr("eggs-1.0.0.dist-info/WHEEL", "Wheel-Version: 1.0")
+		wheel.writestr("eggs-1.0.0.dist-info/RECORD", '')
+
+	conda_builder = CondaBuilder(
+			project_dir=tmp_pathplus,
+			config=load_toml(tmp_pathplus / "pyproject.toml"),
+			build_dir=tmp_pathplus / "build",
+			out_dir=tmp_pathplus / "dist",
+			colour=False,
+			)
+
+	with pytest.raises(ValueError, match="'eggs-1.0.0-py3-none-any.whl' is not a wheel for 'spam-2020.0.0'."):
+		conda_builder.build_conda(tmp_pathplus / "eggs-1.0.0-py3-none-any.whl")
+
+
+def test_build_from_wheel_fingerprint(tmp_pathplus: PathPlus, capsys):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world')")
+
+	conda_builder = CondaBuilder(
+			project_dir=tmp_pathplus,
+			config=load_toml(tmp_pathplus / "pyproject.toml"),
+			build_dir=tmp_pathplus / "build",
+			out_dir=tmp_pathplus / "dist",
+			colour=False,
+			)
+
+	(tmp_pathplus / "wheels").mkdir()
+	wheel_file = tmp_pathplus / "wheels" / "spam-2020.0.0-py3-none-any.whl"
+	wheel_file.write_bytes((tmp_pathplus / "dist" / conda_builder.build_wheel()).read_bytes())
+
+	conda_file = tmp_pathplus / "dist" / conda_builder.build_conda(wheel_file)
+	assert (tmp_pathplus / "dist" / f"{conda_file.name}.fingerprint").read_text().strip() == (
+			conda_builder.get_build_fingerprint(wheel_file=wheel_file)
+			)
+	capsys.readouterr()
+
+	# Same wheel
+	conda_builder.build_conda(wheel_file)
+	assert capsys.readouterr().out.endswith("is up to date\n")
+
+	# A different wheel for the same sources
+	with zipfile.ZipFile(wheel_file, 'a') as wheel:
+		wheel.writestr("spam/extra.py", "pass")
+
+	conda_builder.build_conda(wheel_file)
+	assert "Conda package created at" in capsys.readouterr().out
+
+	with tarfile.open(conda_file) as tar:
+		assert "site-packages/spam/extra.py" in tar.getnames()
+
+
+@pytest.mark.parametrize("package_format", ["tar.bz2", "conda"])
+def test_build_reproducible(tmp_pathplus: PathPlus, monkeypatch, package_format: str):
+	monkeypatch.setenv("SOURCE_DATE_EPOCH", "1602552000")
+
+	(tmp_pathplus / "pyproject.toml").write_clean(
+			f'{MINIMAL_CONFIG}\n[tool.whey-conda]\npackage-format = "{package_format}"',
+			)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world)")
+	(tmp_pathplus / "spam" / "utils.py").write_clean("pass")
+
+	def build(out_dir: str) -> bytes:
+		conda_builder = CondaBuilder(
+				project_dir=tmp_pathplus,
+				config=load_toml(tmp_pathplus / "pyproject.toml"),
+				build_dir=tmp_pathplus / "build",
+				out_dir=tmp_pathplus / out_dir,
+				colour=False,
+				)
+		return (tmp_pathplus / out_dir / conda_builder.build_conda()).read_bytes()
+
+	first_build = build("dist1")
+
+	# Change the modification times and permissions of the source files.
+	os.utime(tmp_pathplus / "spam" / "__init__.py", (0, 0))
+	(tmp_pathplus / "spam" / "utils.py").chmod(0o600)
+
+	assert build("dist2") == first_build
+
+	if package_format == "tar.bz2":
+		tar_data = first_build
+	else:
+		with zipfile.ZipFile(io.BytesIO(first_build)) as conda_zip:
+			assert {zip_info.date_time for zip_info in conda_zip.infolist()} == {(2020, 10, 13, 1, 20, 0)}
+			tar_data = zstandard.ZstdDecompressor().decompressobj().decompress(
+					conda_zip.read("pkg-spam-2020.0.0-py_1.tar.zst"),
+					)
+
+	with tarfile.open(fileobj=io.BytesIO(tar_data)) as tar:
+		members = [member for member in tar.getmembers() if not member.name.startswith("info/")]
+
+	assert [member.name for member in members] == sorted(member.name for member in members)
+	assert {(member.mtime, member.uid, member.gid, member.uname, member.gname, member.mode) for member in members} == {
+			(1602552000, 0, 0, '', '', 0o644),
+			}
+
+
+@pytest.mark.parametrize("package_format", ["tar.bz2", "conda"])
+def test_build_repodata_record(tmp_pathplus: PathPlus, package_format: str):
+	(tmp_pathplus / "pyproject.toml").write_clean(
+			f'{MINIMAL_CONFIG}\n[tool.whey-conda]\npackage-format = "{package_format}"',
+			)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world)")
+
+	conda_builder = CondaBuilder(
+			project_dir=tmp_pathplus,
+			config=load_toml(tmp_pathplus / "pyproject.toml"),
+			build_dir=tmp_pathplus / "build",
+			out_dir=tmp_pathplus / "dist",
+			colour=False,
+			)
+	conda_file = tmp_pathplus / "dist" / conda_builder.build_conda()
+	data = conda_file.read_bytes()
+	record = (tmp_pathplus / "dist" / f"{conda_file.name}.json").load_json()
+
+	assert record.pop("md5") == hashlib.md5(data).hexdigest()
+	assert record.pop("sha256") == hashlib.sha256(data).hexdigest()
+	assert record.pop("size") == len(data)
+
+	if package_format == "tar.bz2":
+		with tarfile.open(conda_file) as tar:
+			index = json.load(tar.extractfile("info/index.json"))  # type: ignore[arg-type]
+	else:
+		with zipfile.ZipFile(conda_file) as conda_zip:
+			tar_data = zstandard.ZstdDecompressor().decompressobj().decompress(
+					conda_zip.read("info-spam-2020.0.0-py_1.tar.zst"),
+					)
+		with tarfile.open(fileobj=io.BytesIO(tar_data)) as tar:
+			index = json.load(tar.extractfile("info/index.json"))  # type: ignore[arg-type]
+
+	assert record == index
+
+
+def read_info_files(conda_file: PathPlus) -> Dict[str, bytes]:
+	if conda_file.name.endswith(".tar.bz2"):
+		tar = tarfile.open(conda_file)
+	else:
+		with zipfile.ZipFile(conda_file) as conda_zip:
+			tar_data = zstandard.ZstdDecompressor().decompressobj().decompress(
+					conda_zip.read(f"info-{conda_file.name[:-len('.conda')]}.tar.zst"),
+					)
+		tar = tarfile.open(fileobj=io.BytesIO(tar_data))
+
+	with tar:
+		return {member.name: tar.extractfile(member).read() for member in tar}  # type: ignore[union-attr]
+
+
+def test_build_conda_outputs(tmp_pathplus: PathPlus, capsys):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world')")
+
+	conda_builder = CondaBuilder(
+			project_dir=tmp_pathplus,
+			config=load_toml(tmp_pathplus / "pyproject.toml"),
+			build_dir=tmp_pathplus / "build",
+			out_dir=tmp_pathplus / "dist",
+			colour=False,
+			)
+
+	outputs = [("tar.bz2", 1), ("conda", 1), ("conda", 2)]
+	conda_filenames = conda_builder.build_conda_outputs(outputs)
+
+	assert conda_filenames == ["spam-2020.0.0-py_1.tar.bz2", "spam-2020.0.0-py_1.conda", "spam-2020.0.0-py_2.conda"]
+	assert sorted(p.name for p in (tmp_pathplus / "dist").iterdir()) == sorted([
+			"spam-2020.0.0-py3-none-any.whl",
+			*conda_filenames,
+			*(f"{filename}.fingerprint" for filename in conda_filenames),
+			*(f"{filename}.json" for filename in conda_filenames),
+			])
+	assert [phase.name for phase in conda_builder.timings.phases if '/' not in phase.name] == [
+			"fingerprint",
+			"wheel",
+			"metadata",
+			"archive",
+			]
+
+	info = [read_info_files(tmp_pathplus / "dist" / filename) for filename in conda_filenames]
+
+	for info_files, filename, (_, build_number) in zip(info, conda_filenames, outputs):
+		index = json.loads(info_files["info/index.json"])
+		assert index["build_number"] == build_number
+		assert (tmp_pathplus / "dist" / f"{filename}.json").load_json()["build"] == index["build"]
+		assert info_files["info/files"] == info[0]["info/files"]
+		assert info_files["info/paths.json"] == info[0]["info/paths.json"]
+
+	# The fingerprints match those of separate builds.
+	for filename, (_, build_number) in zip(conda_filenames, outputs):
+		fingerprint = (tmp_pathplus / "dist" / f"{filename}.fingerprint").read_text().strip()
+		assert fingerprint == conda_builder.get_build_fingerprint(build_number)
+
+	capsys.readouterr()
+	assert conda_builder.build_conda_outputs(outputs) == conda_filenames
+	assert capsys.readouterr().out.count("is up to date\n") == 3
+
+	with pytest.raises(ValueError, match="Each output must have a different package format or build number."):
+		conda_builder.create_conda_archives_from_wheel(
+				tmp_pathplus / "dist" / "spam-2020.0.0-py3-none-any.whl",
+				[("conda", 1), ("conda", 1)],
+				)
+
+
+def test_build_conda_outputs_cli(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world')")
+
+	with in_directory(tmp_pathplus):
+		result: Result = CliRunner().invoke(
+				main,
+				args=["build", "--format", "tar.bz2", "--format", "conda", "--build-number", '3'],
+				)
+
+	assert result.exit_code == 0
+	assert result.stdout.count("Conda package created at") == 2
+	assert (tmp_pathplus / "dist" / "spam-2020.0.0-py_3.tar.bz2").is_file()
+	assert (tmp_pathplus / "dist" / "spam-2020.0.0-py_3.conda").is_file()
@@ -0,0 +1,367 @@
+# stdlib
+import json
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 3rd party
+import pytest
+import requests
+from domdf_python_tools.paths import PathPlus
+from packaging.requirements import InvalidRequirement
+from shippinglabel.requirements import ComparableRequirement
+
+# this package
+from whey_conda import channels
+from whey_conda.channels import (
+		CacheMissError,
+		ChannelCache,
+		channel_url,
+		fetch_channel_listing,
+		get_channel_packages,
+		is_local_channel,
+		local_channel_path,
+		lookup_package,
+		resolve_channel,
+		validate_requirements
+		)
+
+CHANNELS: Dict[str, List[str]] = {
+		"conda-forge": ["domdf-python-tools", "typing_extensions", "click"],
+		"domdfcoding": ["whey", "consolekit"],
+		}
+
+
+@pytest.fixture()
+def fetched(monkeypatch) -> Iterator[List[str]]:
+	fetched_channels: List[str] = []
+
+	def fetch_channel_listing(channel: str, session: Optional[requests.Session] = None) -> List[str]:
+		fetched_channels.append(channel)
+		return CHANNELS[channel]
+
+	monkeypatch.setattr(channels, "fetch_channel_listing", fetch_channel_listing)
+	channels.clear_channel_listings()
+
+	yield fetched_channels
+
+	channels.clear_channel_listings()
+
+
+def requirements(*names: str) -> List[ComparableRequirement]:
+	return [ComparableRequirement(name) for name in names]
+
+
+@pytest.mark.usefixtures("fetched")
+def test_validate_requirements(tmp_pathplus: PathPlus):
+	cache = ChannelCache(tmp_pathplus)
+	validated = validate_requirements(
+			requirements("click>=7", "consolekit", "typing-extensions", "ruamel-yaml"),
+			["conda-forge", "domdfcoding"],
+			cache,
+			)
+
+	assert validated == requirements("click>=7", "consolekit", "typing_extensions", "ruamel.yaml")
+
+	with pytest.raises(InvalidRequirement, match="Cannot satisfy the requirement 'spam' from any of the channels: "):
+		validate_requirements(requirements("spam"), ["conda-forge", "domdfcoding"], cache)
+
+
+def test_cache_hits(tmp_pathplus: PathPlus, fetched: List[str]):
+	reqs = ["click>=7", "consolekit", "whey"]
+
+	validate_requirements(requirements(*reqs), ["conda-forge", "domdfcoding"], ChannelCache(tmp_pathplus))
+	assert sorted(fetched) == ["conda-forge", "domdfcoding"]
+
+	# Simulate a new process
+	channels.clear_channel_listings()
+	fetched.clear()
+
+	validated = validate_requirements(
+			requirements(*reqs),
+			["conda-forge", "domdfcoding"],
+			ChannelCache(tmp_pathplus),
+			)
+	assert validated == requirements(*reqs)
+	assert fetched == []
+
+
+def test_cache_listings(tmp_pathplus: PathPlus, fetched: List[str]):
+	validate_requirements(requirements("click"), ["conda-forge"], ChannelCache(tmp_pathplus))
+	assert fetched == ["conda-forge"]
+	assert ChannelCache(tmp_pathplus).get_listing("conda-forge") == sorted(CHANNELS["conda-forge"])
+
+	# Simulate a new process looking up a new requirement.
+	channels.clear_channel_listings()
+	fetched.clear()
+
+	validated = validate_requirements(requirements("typing-extensions"), ["conda-forge"], ChannelCache(tmp_pathplus))
+	assert validated == requirements("typing_extensions")
+	assert fetched == []
+
+	# The listing is also used in offline mode.
+	channels.clear_channel_listings()
+	assert lookup_package("domdf_python_tools", "conda-forge", ChannelCache(tmp_pathplus, offline=True)) == (
+			"domdf-python-tools"
+			)
+	assert fetched == []
+
+	# Listings expire with the lookups.
+	channels.clear_channel_listings()
+	ChannelCache(tmp_pathplus, ttl=-1).set_listing("conda-forge", CHANNELS["conda-forge"])
+	assert ChannelCache(tmp_pathplus).get_listing("conda-forge") is None
+	lookup_package("whey", "conda-forge", ChannelCache(tmp_pathplus))
+	assert fetched == ["conda-forge"]
+
+	cache = ChannelCache(tmp_pathplus)
+	cache.clear()
+	assert cache.get_listing("conda-forge") is None
+
+
+def test_cache_ttl(tmp_pathplus: PathPlus, fetched: List[str]):
+	lookup_package("click", "conda-forge", ChannelCache(tmp_pathplus, ttl=-1))
+	channels.clear_channel_listings()
+	lookup_package("click", "conda-forge", ChannelCache(tmp_pathplus, ttl=-1))
+
+	assert fetched == ["conda-forge", "conda-forge"]
+
+
+@pytest.mark.usefixtures("fetched")
+def test_cache_lru(tmp_pathplus: PathPlus):
+	cache = ChannelCache(tmp_pathplus)
+
+	validate_requirements(requirements("click", "typing-extensions"), ["conda-forge"], cache)
+	click_entry = tmp_pathplus / "conda-forge" / "click.json"
+	os.utime(click_entry, (0, 0))
+
+	validate_requirements(requirements("domdf-python-tools"), ["conda-forge"], cache)
+	assert [entry.name for entry in cache.entries()] == [
+			"click.json", "typing-extensions.json", "domdf-python-tools.json"
+			]
+
+	cache.max_size = sum(entry.stat().st_size for entry in cache.entries()[1:])
+	cache.prune()
+	assert [entry.name for entry in cache.entries()] == ["typing-extensions.json", "domdf-python-tools.json"]
+
+	# The cache was pruned recently, so isn't pruned again when entries are added.
+	cache.max_size = 0
+	validate_requirements(requirements("click"), ["conda-forge"], cache)
+	assert len(cache.entries()) == 3
+
+	os.utime(tmp_pathplus / ".pruned", (0, 0))
+	validate_requirements(requirements("whey"), ["conda-forge", "domdfcoding"], cache)
+	assert cache.entries() == []
+
+	cache.clear()
+	assert cache.entries() == []
+
+
+def test_cache_probed_once(tmp_pathplus: PathPlus, fetched: List[str], monkeypatch):
+	cache = ChannelCache(tmp_pathplus)
+	validate_requirements(requirements("click", "whey"), ["conda-forge", "domdfcoding"], cache)
+	fetched.clear()
+
+	reads: List[Tuple[str, str]] = []
+	get = cache.get
+
+	def counting_get(channel: str, name: str) -> Tuple[bool, Optional[str]]:
+		reads.append((channel, name))
+		return get(channel, name)
+
+	monkeypatch.setattr(cache, "get", counting_get)
+
+	validated = validate_requirements(requirements("click", "whey"), ["conda-forge", "domdfcoding"], cache)
+	assert validated == requirements("click", "whey")
+	assert reads == [("conda-forge", "click"), ("conda-forge", "whey"), ("domdfcoding", "whey")]
+	assert fetched == []
+
+
+def test_offline(tmp_pathplus: PathPlus, fetched: List[str]):
+	lookup_package("click", "conda-forge", ChannelCache(tmp_pathplus))
+	lookup_package("spam", "conda-forge", ChannelCache(tmp_pathplus))
+	fetched.clear()
+
+	cache = ChannelCache(tmp_pathplus, offline=True)
+	assert lookup_package("click", "conda-forge", cache) == "click"
+	assert lookup_package("spam", "conda-forge", cache) is None
+
+	with pytest.raises(CacheMissError, match="Cannot look up 'whey' in the channel 'domdfcoding' in offline mode"):
+		lookup_package("whey", "domdfcoding", cache)
+
+	assert fetched == []
+
+
+def test_from_environment(tmp_pathplus: PathPlus, monkeypatch):
+	monkeypatch.setenv("WHEY_CONDA_CACHE_DIR", str(tmp_pathplus))
+	monkeypatch.setenv("WHEY_CONDA_CACHE_TTL", "60")
+	monkeypatch.setenv("WHEY_CONDA_CACHE_SIZE", "2000")
+	monkeypatch.setenv("WHEY_CONDA_OFFLINE", "1")
+
+	cache = ChannelCache.from_environment()
+	assert cache.cache_dir == tmp_pathplus
+	assert cache.ttl == 60
+	assert cache.max_size == 2000
+	assert cache.offline
+
+	assert not ChannelCache.from_environment(offline=False).offline
+
+
+def write_repodata(filename: PathPlus, *names: str) -> None:
+	repodata = {
+			"packages": {f"{name}-1.0.0-0.tar.bz2": {"name": name} for name in names},
+			"packages.conda": {f"{name}-1.0.0-0.conda": {"name": name} for name in names},
+			}
+
+	filename.parent.maybe_make(parents=True)
+	filename.write_text(json.dumps(repodata))
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+	def log_message(self, format, *args) -> None:  # noqa: A002  # pylint: disable=redefined-builtin
+		pass
+
+
+@pytest.fixture()
+def channel_server(tmp_pathplus: PathPlus) -> Iterator[str]:
+	# Serves fake channels from a local HTTP server.
+
+	packages = {
+			"spam": {"noarch": ["spam", "ruamel.yaml-jinja2"], "linux-64": ["eggs-ext"]},
+			"ham": {"noarch": ["ham", "spam", "typing_extensions"]},
+			}
+
+	for channel, subdirs in packages.items():
+		for subdir, names in subdirs.items():
+			write_repodata(tmp_pathplus / "server" / channel / subdir / "repodata.json", *names)
+
+	handler = partial(_QuietHandler, directory=str(tmp_pathplus / "server"))
+	server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+
+	try:
+		yield f"http://127.0.0.1:{server.server_address[1]}"
+	finally:
+		server.shutdown()
+		server.server_close()
+		channels.clear_channel_listings()
+
+
+def test_channel_url():
+	assert channel_url("conda-forge") == "https://conda.anaconda.org/conda-forge"
+	assert channel_url("https://example.com/channel/") == "https://example.com/channel"
+
+
+def test_fetch_channel_listing(channel_server: str):
+	assert fetch_channel_listing(f"{channel_server}/spam") == ["eggs-ext", "ruamel.yaml-jinja2", "spam"]
+	assert fetch_channel_listing(f"{channel_server}/ham") == ["ham", "spam", "typing_extensions"]
+
+	with pytest.raises(ValueError, match="Conda channel '.*/bacon' not found."):
+		fetch_channel_listing(f"{channel_server}/bacon")
+
+
+def test_validate_requirements_concurrent(tmp_pathplus: PathPlus, channel_server: str):
+	conda_channels = [f"{channel_server}/spam", f"{channel_server}/ham"]
+	reqs = ["typing-extensions>=3.7", "spam", "eggs-ext", "ham", "ruamel.yaml.jinja2"]
+	expected = requirements("typing_extensions>=3.7", "spam", "eggs-ext", "ham", "ruamel.yaml-jinja2")
+
+	assert validate_requirements(requirements(*reqs), conda_channels, ChannelCache(tmp_pathplus)) == expected
+
+	channels.clear_channel_listings()
+
+	for _ in range(3):
+		assert validate_requirements(requirements(*reqs), conda_channels) == expected
+
+
+@pytest.mark.parametrize(
+		"channel, expected",
+		[
+				("conda-forge", False),
+				("conda-forge/label/dev", False),
+				("https://conda.anaconda.org/conda-forge", False),
+				("file:///srv/conda-mirror", True),
+				("/srv/conda-mirror", True),
+				("./conda-mirror", True),
+				("~/conda-mirror", True),
+				],
+		)
+def test_is_local_channel(channel: str, expected: bool):
+	assert is_local_channel(channel) is expected
+
+
+def test_local_channel_path(tmp_pathplus: PathPlus):
+	assert local_channel_path("file:///srv/conda-mirror") == PathPlus("/srv/conda-mirror")
+	assert local_channel_path("/srv/conda-mirror") == PathPlus("/srv/conda-mirror")
+
+	assert resolve_channel("conda-forge", tmp_pathplus) == "conda-forge"
+	assert resolve_channel("file:///srv/conda-mirror", tmp_pathplus) == "file:///srv/conda-mirror"
+	assert resolve_channel("./mirror", tmp_pathplus) == (tmp_pathplus / "mirror").as_posix()
+
+
+@pytest.fixture()
+def local_channel(tmp_pathplus: PathPlus) -> Iterator[PathPlus]:
+	channel_dir = tmp_pathplus / "mirror"
+	write_repodata(channel_dir / "noarch" / "repodata.json", "spam", "ruamel.yaml-jinja2")
+	write_repodata(channel_dir / "linux-64" / "current_repodata.json", "eggs-ext")
+
+	yield channel_dir
+
+	channels.clear_channel_listings()
+
+
+def test_local_channel(tmp_pathplus: PathPlus, local_channel: PathPlus, monkeypatch):
+
+	def fetch_channel_listing(channel: str, session: Optional[requests.Session] = None) -> List[str]:
+		raise AssertionError("Local channels must not be fetched")
+
+	monkeypatch.setattr(channels, "fetch_channel_listing", fetch_channel_listing)
+
+	cache = ChannelCache(tmp_pathplus / "cache", offline=True)
+
+	for channel in [local_channel.as_uri(), local_channel.as_posix()]:
+		validated = validate_requirements(
+				requirements("spam>=1", "ruamel-yaml-jinja2", "eggs-ext"),
+				[channel],
+				cache,
+				)
+		assert validated == requirements("spam>=1", "ruamel.yaml-jinja2", "eggs-ext")
+
+		with pytest.raises(InvalidRequirement, match="Cannot satisfy the requirement 'ham'"):
+			validate_requirements(requirements("ham"), [channel], cache)
+
+	# Nothing is stored in the cache for local channels.
+	assert cache.entries() == []
+
+	with pytest.raises(ValueError, match="Conda channel '.*' not found."):
+		get_channel_packages((tmp_pathplus / "missing").as_uri())
+
+
+def test_exact_name_preferred(tmp_pathplus: PathPlus):
+	write_repodata(tmp_pathplus / "first" / "noarch" / "repodata.json", "ruamel-yaml-jinja2", "spam")
+	write_repodata(tmp_pathplus / "second" / "noarch" / "repodata.json", "ruamel.yaml-jinja2", "Spam_Eggs")
+	channel_list = [(tmp_pathplus / "first").as_uri(), (tmp_pathplus / "second").as_uri()]
+
+	validated = validate_requirements(requirements("ruamel.yaml-jinja2", "spam", "spam-eggs"), channel_list)
+	assert validated == requirements("ruamel.yaml-jinja2", "spam", "Spam_Eggs")
+
+	# Without an exact match the first channel's normalized match is used.
+	validated = validate_requirements(requirements("ruamel_yaml_jinja2"), channel_list)
+	assert [req.name for req in validated] == ["ruamel-yaml-jinja2"]
+
+
+def test_local_channel_reload(local_channel: PathPlus):
+	channel = local_channel.as_uri()
+	index = get_channel_packages(channel)
+	assert sorted(index) == ["eggs-ext", "ruamel.yaml-jinja2", "spam"]
+	assert get_channel_packages(channel) is index
+
+	repodata_file = local_channel / "noarch" / "repodata.json"
+	write_repodata(repodata_file, "spam", "ham")
+	mtime = repodata_file.stat().st_mtime_ns + 1_000_000_000
+	os.utime(repodata_file, ns=(mtime, mtime))
+
+	assert sorted(get_channel_packages(channel)) == ["eggs-ext", "ham", "spam"]
+	assert lookup_package("HAM", channel) == "ham"
@@ -1,3 +1,6 @@
+# stdlib
+import os
+
 # 3rd party
 import dom_toml
 import pytest
@@ -7,6 +10,7 @@ from domdf_python_tools.paths import PathPlus
 
 # this package
 from whey_conda import WheyCondaParser
+from whey_conda.config import clear_config_cache, load_conda_config
 
 
 @pytest.mark.parametrize(
@@ -20,6 +24,13 @@ from whey_conda import WheyCondaParser
 						'[tool.whey-conda]\nconda-channels = ["domdfcoding", "conda-forge"]',
 						id="conda_channels",
 						),
+				pytest.param('[tool.whey-conda]\npackage-format = "conda"', id="package_format"),
+				pytest.param('[tool.whey-conda]\npackage-format = ".tar.bz2"', id="package_format_dot"),
+				pytest.param("[tool.whey-conda]\ncompression-threads = 4", id="compression_threads"),
+				pytest.param(
+						'[tool.whey-conda]\npackage-format = "conda"\ncompression-level = 3',
+						id="compression_level",
+						),
 				],
 		)
 def test_whey_conda_parser_valid_config(
@@ -42,3 +53,74 @@ def test_whey_conda_parser_invalid_extras(toml_config: str):
 
 	with pytest.raises(BadConfigError, match=r"Invalid value for \[tool.whey-conda.conda-extras\]: "):
 		WheyCondaParser().parse(dom_toml.loads(toml_config)["tool"]["whey-conda"])
+
+
+def test_whey_conda_parser_invalid_package_format():
+
+	with pytest.raises(BadConfigError, match=r"Invalid value for \[tool.whey-conda.package-format\]: "):
+		WheyCondaParser().parse({"package-format": "zip"})
+
+
+def test_whey_conda_parser_compression_threads():
+	# Resolved to the number of CPUs by the archive writer, so the parsed config is the same on every machine.
+	assert WheyCondaParser().parse({"compression-threads": 0})["compression-threads"] == 0
+
+	with pytest.raises(BadConfigError, match=r"Invalid value for \[tool.whey-conda.compression-threads\]: "):
+		WheyCondaParser().parse({"compression-threads": -1})
+
+
+def test_whey_conda_parser_compression_level():
+	assert WheyCondaParser().parse({"compression-level": 9})["compression-level"] == 9
+	assert WheyCondaParser().parse({"package-format": "conda", "compression-level": 22})["compression-level"] == 22
+
+	with pytest.raises(
+			BadConfigError,
+			match=r"Invalid value for \[tool.whey-conda.compression-level\]: "
+			r"Expected an integer between 1 and 9 for 'tar.bz2' packages.",
+			):
+		WheyCondaParser().parse({"compression-level": 19})
+
+	with pytest.raises(BadConfigError, match=r"Expected an integer between 1 and 22 for 'conda' packages."):
+		WheyCondaParser().parse({"package-format": ".conda", "compression-level": 0})
+
+
+def test_load_conda_config(tmp_pathplus: PathPlus, monkeypatch):
+	clear_config_cache()
+	pyproject_file = tmp_pathplus / "pyproject.toml"
+	pyproject_file.write_lines([
+			"[tool.mkrecipe]",
+			'conda-channels = ["domdfcoding"]',
+			'extras = ["cli"]',
+			'',
+			"[tool.whey-conda]",
+			'conda-channels = ["conda-forge"]',
+			])
+
+	calls = []
+	loads = dom_toml.loads
+
+	def counting_loads(*args, **kwargs):  # noqa: MAN002
+		calls.append(args)
+		return loads(*args, **kwargs)
+
+	monkeypatch.setattr(dom_toml, "loads", counting_loads)
+
+	config = load_conda_config(tmp_pathplus)
+	assert config["conda-channels"] == ["conda-forge"]
+	assert config["conda-extras"] == ["cli"]
+
+	# The returned configuration is a copy.
+	config["conda-channels"].append("bioconda")
+	assert load_conda_config(tmp_pathplus)["conda-channels"] == ["conda-forge"]
+	assert len(calls) == 1
+
+	pyproject_file.write_lines(["[tool.whey-conda]", 'conda-channels = ["bioconda"]'])
+	stat = pyproject_file.stat()
+	os.utime(pyproject_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+	assert load_conda_config(tmp_pathplus) == {"conda-channels": ["bioconda"]}
+	assert len(calls) == 2
+
+	clear_config_cache()
+	load_conda_config(tmp_pathplus)
+	assert len(calls) == 3
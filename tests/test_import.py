@@ -0,0 +1,47 @@
+# stdlib
+import re
+import subprocess
+import sys
+
+# 3rd party
+import pytest
+
+# The time, in microseconds, which importing whey_conda may add to importing whey.builder.
+IMPORT_TIME_BUDGET = 200_000
+
+
+def test_import_time():
+	process = subprocess.run(
+			[sys.executable, "-X", "importtime", "-c", "import whey.builder; import whey_conda"],
+			stderr=subprocess.PIPE,
+			check=True,
+			)
+
+	# With whey.builder already imported, the cumulative time for whey_conda covers only what it adds.
+	match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| whey_conda$", process.stderr.decode("UTF-8"), flags=re.M)
+	assert match is not None
+	assert int(match.group(1)) < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize(
+		"module",
+		[
+				"concurrent.futures",
+				"dom_toml",
+				"mkrecipe",
+				"platformdirs",
+				"requests",
+				"shippinglabel_conda",
+				"urllib.request",
+				],
+		)
+def test_import_is_lazy(module: str):
+	# whey imports some of these modules itself, so only check they aren't imported by whey_conda.
+	code = '; '.join([
+			"import sys, whey.builder",
+			f"before = {module!r} in sys.modules",
+			"import whey_conda",
+			f"print(before or {module!r} not in sys.modules)",
+			])
+	process = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True)
+	assert process.stdout.decode("UTF-8").strip() == "True"
@@ -0,0 +1,124 @@
+# stdlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus
+from pyproject_examples.example_configs import MINIMAL_CONFIG
+from whey.config import load_toml
+
+# this package
+from whey_conda import CondaBuilder
+from whey_conda.__main__ import main
+from whey_conda.repodata import add_to_index, index_directory, lock_index, read_package_record, read_repodata
+
+
+def build(tmp_pathplus: PathPlus, name: str, package_format: str = "tar.bz2", update_index: bool = False) -> PathPlus:
+	project_dir = tmp_pathplus / name
+	(project_dir / name).maybe_make(parents=True)
+	(project_dir / name / "__init__.py").write_clean("print('hello world')")
+	(project_dir / "pyproject.toml").write_clean(
+			f'{MINIMAL_CONFIG.replace("spam", name)}\n[tool.whey-conda]\npackage-format = "{package_format}"',
+			)
+
+	conda_builder = CondaBuilder(
+			project_dir=project_dir,
+			config=load_toml(project_dir / "pyproject.toml"),
+			out_dir=tmp_pathplus / "channel" / "noarch",
+			colour=False,
+			update_index=update_index,
+			)
+
+	return conda_builder.out_dir / conda_builder.build_conda()
+
+
+def load_record(package: PathPlus) -> Dict[str, Any]:
+	return package.with_name(f"{package.name}.json").load_json()
+
+
+def test_build_update_index(tmp_pathplus: PathPlus):
+	spam = build(tmp_pathplus, "spam", update_index=True)
+	eggs = build(tmp_pathplus, "eggs", package_format="conda", update_index=True)
+
+	repodata = read_repodata(tmp_pathplus / "channel" / "noarch")
+	assert repodata["info"] == {"subdir": "noarch"}
+	assert repodata["packages"] == {spam.name: load_record(spam)}
+	assert repodata["packages.conda"] == {eggs.name: load_record(eggs)}
+
+	assert read_package_record(spam) == load_record(spam)
+	assert read_package_record(eggs) == load_record(eggs)
+
+
+def test_index_directory(tmp_pathplus: PathPlus, monkeypatch):
+	noarch_dir = tmp_pathplus / "channel" / "noarch"
+	spam = build(tmp_pathplus, "spam")
+	eggs = build(tmp_pathplus, "eggs")
+	ham = build(tmp_pathplus, "ham", package_format="conda")
+
+	# Without the record written when the package was built the package is read instead.
+	ham_record = load_record(ham)
+	ham.with_name(f"{ham.name}.json").unlink()
+
+	repodata = index_directory(noarch_dir)
+	assert repodata["packages"] == {eggs.name: load_record(eggs), spam.name: load_record(spam)}
+	assert repodata["packages.conda"] == {ham.name: ham_record}
+	assert (noarch_dir / "repodata.json").load_json() == repodata
+
+	# Unchanged packages are not read again.
+	def read_package_record(package: PathPlus) -> Dict[str, Any]:
+		raise AssertionError(f"{package.name} was read")
+
+	monkeypatch.setattr("whey_conda.repodata.read_package_record", read_package_record)
+
+	eggs.unlink()
+	repodata = index_directory(noarch_dir)
+	assert repodata["packages"] == {spam.name: load_record(spam)}
+	assert repodata["packages.conda"] == {ham.name: ham_record}
+
+
+def test_add_to_index_concurrent(tmp_pathplus: PathPlus):
+	records = {f"pkg{idx}-1.0.0-py_1.tar.bz2": {"name": f"pkg{idx}"} for idx in range(50)}
+
+	with ThreadPoolExecutor(max_workers=8) as executor:
+		for future in [executor.submit(add_to_index, tmp_pathplus, {k: v}) for k, v in records.items()]:
+			future.result()
+
+	assert read_repodata(tmp_pathplus)["packages"] == records
+	assert not (tmp_pathplus / ".repodata.json.lock").exists()
+
+	with pytest.raises(ValueError, match="'spam.whl' is not a conda package."):
+		add_to_index(tmp_pathplus, {"spam.whl": {}})
+
+
+def test_lock_index_stale(tmp_pathplus: PathPlus):
+	lock_file = tmp_pathplus / ".repodata.json.lock"
+
+	# Left behind by a process which crashed.
+	lock_file.touch()
+	os.utime(lock_file, (0, 0))
+
+	with lock_index(tmp_pathplus, timeout=1):
+		assert lock_file.is_file()
+		assert lock_file.stat().st_mtime > 0
+
+	assert not lock_file.exists()
+	assert list(tmp_pathplus.iterdir()) == []
+
+	# A lock broken by another process is not removed by the process which held it.
+	with lock_index(tmp_pathplus, timeout=1):
+		lock_file.unlink()
+		lock_file.touch()
+
+	assert lock_file.is_file()
+
+
+def test_index_cli(tmp_pathplus: PathPlus):
+	build(tmp_pathplus, "spam")
+	build(tmp_pathplus, "eggs", package_format="conda")
+
+	result: Result = CliRunner().invoke(main, args=["index", (tmp_pathplus / "channel" / "noarch").as_posix()])
+	assert result.exit_code == 0
+	assert result.stdout.startswith("Indexed 2 packages in ")
@@ -0,0 +1,103 @@
+# 3rd party
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+from pyproject_examples.example_configs import MINIMAL_CONFIG
+
+# this package
+from whey_conda.__main__ import main
+from whey_conda.batch import build_many
+from whey_conda.timing import BuildTimings
+
+
+def test_build_timings():
+	timings = BuildTimings()
+
+	with timings.phase("outer") as outer:
+		outer.files = 2
+
+		with timings.phase("inner") as inner:
+			inner.bytes_read = 1000
+			inner.bytes_written = 500
+
+	with timings.phase("other"):
+		pass
+
+	assert [timing.name for timing in timings.phases] == ["outer", "outer/inner", "other"]
+	assert timings.phases[0].wall_time >= timings.phases[1].wall_time
+	assert timings.total_time == timings.phases[0].wall_time + timings.phases[2].wall_time
+
+	data = timings.to_dict()
+	assert data["phases"][1] == {
+			"name": "outer/inner",
+			"wall_time": timings.phases[1].wall_time,
+			"cpu_time": timings.phases[1].cpu_time,
+			"bytes_read": 1000,
+			"bytes_written": 500,
+			"files": 0,
+			}
+
+	table = timings.format_table().splitlines()
+	assert table[0].split() == ["Phase", "Wall", "(s)", "CPU", "(s)", "Read", "(kB)", "Written", "(kB)", "Files"]
+	assert table[1].startswith("outer ")
+	assert table[2].startswith("  inner ")
+	assert table[2].split()[3:] == ["1.0", "0.5", '0']
+
+
+def test_build_timings_file(tmp_pathplus: PathPlus):
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_clean("print('hello world')")
+
+	with in_directory(tmp_pathplus):
+		result: Result = CliRunner().invoke(main, args=["build", "--timings", "timings.json"])
+
+	assert result.exit_code == 0
+
+	data = (tmp_pathplus / "timings.json").load_json()
+	assert data["project"] == "spam"
+	assert data["version"] == "2020.0.0"
+	assert data["package"] == "spam-2020.0.0-py_1.tar.bz2"
+	# The requirements are resolved in the background, and only waited for when index.json is written.
+	assert [phase["name"] for phase in data["phases"]] == [
+			"fingerprint",
+			"fingerprint/sources",
+			"wheel",
+			"metadata",
+			"metadata/requirements",
+			"archive",
+			]
+
+	phases = {phase["name"]: phase for phase in data["phases"]}
+	assert phases["fingerprint/sources"]["files"] == 1
+	assert phases["wheel"]["bytes_written"] == (tmp_pathplus / "dist" / "spam-2020.0.0-py3-none-any.whl").stat().st_size
+	assert phases["archive"]["bytes_written"] == (tmp_pathplus / "dist" / "spam-2020.0.0-py_1.tar.bz2").stat().st_size
+	assert data["total_time"] > 0
+
+	# If the package exists the requirements are needed to check whether it is up to date.
+	with in_directory(tmp_pathplus):
+		result = CliRunner().invoke(main, args=["build", "--timings", "timings.json"])
+
+	assert result.exit_code == 0
+	assert [phase["name"] for phase in (tmp_pathplus / "timings.json").load_json()["phases"]] == [
+			"fingerprint",
+			"fingerprint/sources",
+			"fingerprint/requirements",
+			]
+
+
+def test_build_many_timings(tmp_pathplus: PathPlus):
+	# Two of the projects share a directory name.
+	projects = [tmp_pathplus / "spam", tmp_pathplus / "ham", tmp_pathplus / "other" / "spam"]
+
+	for project_dir in projects:
+		name = project_dir.name
+		(project_dir / name).maybe_make(parents=True)
+		(project_dir / name / "__init__.py").write_clean("print('hello world')")
+		(project_dir / "pyproject.toml").write_clean(MINIMAL_CONFIG.replace("spam", name))
+
+	build_many(projects, jobs=1, timings_dir=tmp_pathplus / "timings")
+
+	timings_files = sorted((tmp_pathplus / "timings").iterdir())
+	assert len(timings_files) == 3
+	assert sorted(filename.name.split('-')[0] for filename in timings_files) == ["ham", "spam", "spam"]
+	assert sorted(filename.load_json()["project"] for filename in timings_files) == ["ham", "spam", "spam"]
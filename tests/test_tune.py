@@ -0,0 +1,45 @@
+# 3rd party
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus
+from pyproject_examples.example_configs import MINIMAL_CONFIG
+
+# this package
+from whey_conda.__main__ import main
+from whey_conda.tune import auto_tune
+
+
+def make_project(tmp_pathplus: PathPlus) -> None:
+	(tmp_pathplus / "pyproject.toml").write_clean(MINIMAL_CONFIG)
+	(tmp_pathplus / "spam").mkdir()
+	(tmp_pathplus / "spam" / "__init__.py").write_lines(f"spam_{idx} = {idx * 31 % 997}" for idx in range(5000))
+
+
+def test_auto_tune(tmp_pathplus: PathPlus):
+	make_project(tmp_pathplus)
+
+	results = auto_tune(tmp_pathplus, [("tar.bz2", 1), ("tar.bz2", 9), ("conda", 3)], repeat=2)
+
+	assert [(result.package_format, result.level) for result in results] == [("tar.bz2", 1), ("tar.bz2", 9), ("conda", 3)]
+
+	for result in results:
+		assert result.duration > 0
+		assert 0 < result.size < result.content_size
+		assert result.ratio == result.size / result.content_size
+
+	assert results[0].content_size == results[1].content_size == results[2].content_size
+
+	# Nothing is left behind in the project.
+	assert sorted(p.name for p in tmp_pathplus.iterdir()) == ["pyproject.toml", "spam"]
+
+
+def test_auto_tune_cli(tmp_pathplus: PathPlus):
+	make_project(tmp_pathplus)
+
+	result: Result = CliRunner().invoke(main, args=["auto-tune", tmp_pathplus.as_posix(), "--format", "tar.bz2"])
+	assert result.exit_code == 0
+
+	lines = result.stdout.splitlines()
+	assert lines[0].split() == ["Format", "Level", "Time", "(s)", "Size", "(kB)", "Ratio"]
+	assert [line.split()[:2] for line in lines[1:4]] == [["tar.bz2", '1'], ["tar.bz2", '5'], ["tar.bz2", '9']]
+	assert lines[4].startswith("Fastest: package-format = \"tar.bz2\", compression-level = ")
+	assert lines[5].startswith("Smallest: package-format = \"tar.bz2\", compression-level = ")
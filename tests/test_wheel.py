@@ -0,0 +1,84 @@
+# stdlib
+import zipfile
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from whey_conda.wheel import INSTALLER, find_dist_info, iter_installed_files
+
+RECORD = """\
+spam/__init__.py,sha256=AAAA,10
+spam/data.txt,sha256=BBBB,3
+spam-1.0.0.data/purelib/spam_extra.py,sha256=CCCC,4
+spam-1.0.0.data/scripts/spam-cli,sha256=DDDD,5
+spam-1.0.0.dist-info/METADATA,sha256=EEEE,6
+spam-1.0.0.dist-info/WHEEL,sha256=FFFF,7
+spam-1.0.0.dist-info/RECORD,,
+"""
+
+
+@pytest.fixture()
+def wheel_file(tmp_pathplus: PathPlus) -> PathPlus:
+	filename = tmp_pathplus / "spam-1.0.0-py3-none-any.whl"
+
+	with zipfile.ZipFile(filename, 'w') as wheel:
+		wheel.writestr("spam/__init__.py", "print('hello world')")
+		info = zipfile.ZipInfo("spam/data.txt")
+		info.external_attr = 0o755 << 16
+		wheel.writestr(info, "abc")
+		wheel.writestr("spam-1.0.0.data/purelib/spam_extra.py", "pass")
+		wheel.writestr("spam-1.0.0.data/scripts/spam-cli", "#!/bin/sh")
+		wheel.writestr("spam-1.0.0.dist-info/METADATA", "Name: spam")
+		wheel.writestr("spam-1.0.0.dist-info/WHEEL", "Wheel-Version: 1.0")
+		wheel.writestr("spam-1.0.0.dist-info/RECORD", RECORD)
+
+	return filename
+
+
+def test_find_dist_info(wheel_file: PathPlus):
+	with zipfile.ZipFile(wheel_file) as wheel:
+		assert find_dist_info(wheel) == "spam-1.0.0.dist-info"
+
+
+def test_find_dist_info_missing(tmp_pathplus: PathPlus):
+	with zipfile.ZipFile(tmp_pathplus / "spam.whl", 'w') as wheel:
+		wheel.writestr("spam/__init__.py", "print('hello world')")
+
+	with zipfile.ZipFile(tmp_pathplus / "spam.whl") as wheel:
+		with pytest.raises(ValueError, match=r"No '\*.dist-info' directory found in"):
+			find_dist_info(wheel)
+
+
+def test_iter_installed_files(wheel_file: PathPlus):
+	with zipfile.ZipFile(wheel_file) as wheel:
+		files = {file.path: file for file in iter_installed_files(wheel)}
+
+		with files["spam/__init__.py"].opener() as fp:
+			assert fp.read() == b"print('hello world')"
+
+	assert list(files) == [
+			"spam/__init__.py",
+			"spam/data.txt",
+			"spam_extra.py",
+			"spam-1.0.0.dist-info/METADATA",
+			"spam-1.0.0.dist-info/WHEEL",
+			"spam-1.0.0.dist-info/INSTALLER",
+			"spam-1.0.0.dist-info/RECORD",
+			]
+
+	assert files["spam/__init__.py"].size == 20
+	assert files["spam/__init__.py"].mode == 0o644
+	assert files["spam/data.txt"].mode == 0o755
+	assert files["spam-1.0.0.dist-info/INSTALLER"].opener().read() == INSTALLER
+
+	assert files["spam-1.0.0.dist-info/RECORD"].opener().read().decode("UTF-8").splitlines() == [
+			"spam-1.0.0.dist-info/INSTALLER,sha256=vDMCLty3Y5_1M1W06R2t5QoLvwKZ7-thcdHsC6UCnPw,6",
+			"spam-1.0.0.dist-info/METADATA,sha256=EEEE,6",
+			"spam-1.0.0.dist-info/RECORD,,",
+			"spam-1.0.0.dist-info/WHEEL,sha256=FFFF,7",
+			"spam/__init__.py,sha256=AAAA,10",
+			"spam/data.txt,sha256=BBBB,3",
+			"spam_extra.py,sha256=CCCC,4",
+			]
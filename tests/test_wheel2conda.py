@@ -0,0 +1,164 @@
+# stdlib
+import hashlib
+import json
+import tarfile
+import zipfile
+from typing import List
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from dist_meta.metadata_mapping import MetadataMapping
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from whey_conda.__main__ import main
+from whey_conda.channels import ChannelCache
+from whey_conda.wheel2conda import WheelConverter, convert_wheels, find_wheels
+
+METADATA = """\
+Metadata-Version: 2.1
+Name: {name}
+Version: 1.2.3
+Summary: A {name} package
+Home-page: https://example.com/{name}
+Project-URL: Documentation, https://{name}.readthedocs.io
+Project-URL: Source Code, https://github.com/example/{name}
+License: MIT
+License-File: LICENSE
+Author-email: Joe Bloggs <joe@example.com>
+Provides-Extra: testing
+Requires-Dist: typing-extensions>=3.7
+Requires-Dist: colorama; platform_system == "Windows"
+Requires-Dist: pytest; extra == "testing"
+"""
+
+
+def make_wheel(directory: PathPlus, name: str, tag: str = "py3-none-any") -> PathPlus:
+	wheel_file = directory / f"{name}-1.2.3-{tag}.whl"
+
+	with zipfile.ZipFile(wheel_file, 'w') as wheel:
+		wheel.writestr(f"{name}/__init__.py", "print('hello world')")
+		wheel.writestr(f"{name}-1.2.3.dist-info/METADATA", METADATA.format(name=name))
+		wheel.writestr(f"{name}-1.2.3.dist-info/WHEEL", "Wheel-Version: 1.0")
+		wheel.writestr(f"{name}-1.2.3.dist-info/LICENSE", "This is the license")
+		wheel.writestr(f"{name}-1.2.3.dist-info/RECORD", f"{name}/__init__.py,sha256=AAAA,20\n")
+
+	return wheel_file
+
+
+@pytest.fixture()
+def local_channel(tmp_pathplus: PathPlus) -> str:
+	repodata = {"packages": {"typing_extensions-4.0.0-0.tar.bz2": {"name": "typing_extensions"}}}
+	(tmp_pathplus / "channel" / "noarch").maybe_make(parents=True)
+	(tmp_pathplus / "channel" / "noarch" / "repodata.json").dump_json(repodata)
+	return (tmp_pathplus / "channel").as_uri()
+
+
+@pytest.fixture()
+def wheels(tmp_pathplus: PathPlus) -> List[PathPlus]:
+	(tmp_pathplus / "wheels").maybe_make()
+	return [
+			make_wheel(tmp_pathplus / "wheels", "spam"),
+			make_wheel(tmp_pathplus / "wheels", "eggs", "cp38-cp38-linux_x86_64"),
+			make_wheel(tmp_pathplus / "wheels", "ham"),
+			]
+
+
+def test_convert(tmp_pathplus: PathPlus, local_channel: str, wheels: List[PathPlus]):
+	converter = WheelConverter(
+			tmp_pathplus / "dist",
+			[local_channel],
+			channel_cache=ChannelCache(tmp_pathplus / "cache", offline=True),
+			)
+	conda_file = converter.convert(wheels[0])
+	assert conda_file == tmp_pathplus / "dist" / "spam-1.2.3-py_1.tar.bz2"
+
+	with tarfile.open(conda_file) as tar:
+		assert tar.extractfile("info/files").read().decode("UTF-8").splitlines() == [  # type: ignore[union-attr]
+				"site-packages/spam/__init__.py",
+				"site-packages/spam-1.2.3.dist-info/METADATA",
+				"site-packages/spam-1.2.3.dist-info/WHEEL",
+				"site-packages/spam-1.2.3.dist-info/LICENSE",
+				"site-packages/spam-1.2.3.dist-info/INSTALLER",
+				"site-packages/spam-1.2.3.dist-info/RECORD",
+				]
+		assert tar.extractfile("info/license.txt").read() == b"This is the license\n"  # type: ignore[union-attr]
+		index = json.load(tar.extractfile("info/index.json"))  # type: ignore[arg-type]
+		about = json.load(tar.extractfile("info/about.json"))  # type: ignore[arg-type]
+		paths = json.load(tar.extractfile("info/paths.json"))  # type: ignore[arg-type]
+
+		assert paths["paths_version"] == 1
+		assert [entry["_path"] for entry in paths["paths"]] == tar.extractfile("info/files").read().decode("UTF-8").splitlines()  # type: ignore[union-attr]
+
+		for entry in paths["paths"]:
+			content = tar.extractfile(entry["_path"]).read()  # type: ignore[union-attr]
+			assert entry["path_type"] == "hardlink"
+			assert entry["sha256"] == hashlib.sha256(content).hexdigest()
+			assert entry["size_in_bytes"] == len(content)
+
+	assert index["name"] == "spam"
+	assert index["version"] == "1.2.3"
+	assert index["depends"] == ["typing_extensions>=3.7", "python"]
+	assert index["noarch"] == "python"
+
+	assert about["home"] == "https://example.com/spam"
+	assert about["dev_url"] == "https://github.com/example/spam"
+	assert about["doc_url"] == "https://spam.readthedocs.io"
+	assert about["license"] == "MIT"
+	assert about["summary"] == "A spam package"
+	assert about["extra"] == {"maintainers": ["Joe Bloggs"]}
+
+	with pytest.raises(ValueError, match="'eggs-1.2.3-cp38-cp38-linux_x86_64.whl' is not a pure-Python wheel."):
+		converter.convert(wheels[1])
+
+
+def test_runtime_requirements_extras(tmp_pathplus: PathPlus, local_channel: str):
+	converter = WheelConverter(
+			tmp_pathplus / "dist",
+			[local_channel],
+			channel_cache=ChannelCache(tmp_pathplus / "cache", offline=True),
+			)
+
+	metadata_map = MetadataMapping()
+	metadata_map["Provides-Extra"] = "testing"
+	metadata_map["Provides-Extra"] = "colour"
+	metadata_map["Requires-Dist"] = "typing-extensions>=3.7; platform_release != 'extra'"
+	metadata_map["Requires-Dist"] = "pytest; extra == 'testing'"
+	metadata_map["Requires-Dist"] = "coverage; 'testing' == extra"
+	metadata_map["Requires-Dist"] = "colorama; python_version >= '3.6' and (extra == 'colour' or extra == 'all')"
+	metadata_map["Requires-Dist"] = "importlib-metadata; python_version < '3.8' and extra == 'testing'"
+
+	assert converter.get_runtime_requirements(metadata_map) == ["typing_extensions>=3.7"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_convert_wheels(tmp_pathplus: PathPlus, local_channel: str, wheels: List[PathPlus], jobs: int):
+	assert find_wheels([tmp_pathplus / "wheels"]) == sorted(wheels)
+
+	results = convert_wheels(wheels, tmp_pathplus / "dist", [local_channel], jobs=jobs, package_format="conda")
+
+	assert [result.wheel for result in results] == [wheel.as_posix() for wheel in wheels]
+	assert [result.success for result in results] == [True, False, True]
+	assert results[0].archive == (tmp_pathplus / "dist" / "spam-1.2.3-py_1.conda").as_posix()
+	assert results[1].error == "ValueError: 'eggs-1.2.3-cp38-cp38-linux_x86_64.whl' is not a pure-Python wheel."
+	assert PathPlus(results[2].archive).is_file()
+
+
+def test_convert_cli(tmp_pathplus: PathPlus, local_channel: str, wheels: List[PathPlus]):
+	wheels[1].unlink()
+
+	result: Result = CliRunner().invoke(
+			main,
+			args=["convert", (tmp_pathplus / "wheels").as_posix(), "-o", (tmp_pathplus / "dist").as_posix(), "-c", local_channel],
+			)
+
+	assert result.exit_code == 0
+	assert "Converted 2 of 2 wheels in " in result.stdout
+	assert "packages/s)." in result.stdout
+	assert sorted(p.name for p in (tmp_pathplus / "dist").iterdir()) == [
+			"ham-1.2.3-py_1.tar.bz2",
+			"ham-1.2.3-py_1.tar.bz2.json",
+			"spam-1.2.3-py_1.tar.bz2",
+			"spam-1.2.3-py_1.tar.bz2.json",
+			]
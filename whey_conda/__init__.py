@@ -27,35 +27,53 @@ Whey extension for creating Conda packages for Python projects.
 #
 
 # stdlib
-import datetime
+import contextlib
+import hashlib
+import json
 import os
 import pathlib
 import posixpath
-import tempfile
+import zipfile
 from itertools import chain
 from subprocess import PIPE, Popen
 from textwrap import dedent, indent
-from typing import Any, List, Mapping, Optional, Union
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 
 # 3rd party
 import click
-import dom_toml
-import handy_archives
 from consolekit.terminal_colours import ColourTrilean, Fore
 from consolekit.utils import abort
+from dist_meta import entry_points, metadata
 from domdf_python_tools.paths import PathPlus
 from domdf_python_tools.typing import PathLike
 from domdf_python_tools.words import word_join
-from mkrecipe import filter_reqs_by_py_version, filter_reqs_with_markers
-from mkrecipe.config import MkrecipeParser
 from pyproject_parser.classes import _NormalisedName
 from shippinglabel.checksum import get_record_entry
 from shippinglabel.requirements import ComparableRequirement
-from shippinglabel_conda import make_conda_description, prepare_requirements, validate_requirements
+from whey.additional_files import Exclude, Include, RecursiveExclude, RecursiveInclude
 from whey.builder import WheelBuilder
 
 # this package
-from whey_conda.config import WheyCondaParser
+from whey_conda.archive import (
+		CondaArchiveWriter,
+		FanOutWriter,
+		_clean,
+		_get_about_urls,
+		_get_timestamp,
+		_pin_numpy,
+		get_archive_writer,
+		get_source_date_epoch,
+		scan_files
+		)
+from whey_conda.channels import ChannelCache, is_local_channel, resolve_channel, validate_requirements
+from whey_conda.config import WheyCondaParser, load_conda_config
+from whey_conda.repodata import add_to_index
+from whey_conda.timing import BuildTimings, PhaseTiming
+from whey_conda.wheel import add_wheel_to_archive, find_dist_info, read_record, record_digest
+
+if False:  # TYPE_CHECKING:  # pylint: disable=using-constant-test
+	# stdlib
+	from concurrent.futures import Future
 
 __all__ = ("CondaBuilder", )
 
@@ -78,6 +96,18 @@ class CondaBuilder(WheelBuilder):
 	:default out_dir: :file:`{<project_dir>}/dist`
 	:param verbose: Enable verbose output.
 	:param colour: Enable coloured terminal output.
+	:param channel_cache: The cache to use for looking up requirements in conda channels.
+		Defaults to a cache configured from environment variables by :meth:`ChannelCache.from_environment() <.ChannelCache.from_environment>`.
+	:param force: Build the package even if it is up to date.
+	:param update_index: Add the package to the ``repodata.json`` file in the output directory,
+		so the output directory can be used as the ``noarch`` subdirectory of a local conda channel.
+	:param timings_file: A file to write the time taken by each phase of the build to, as JSON.
+	:param conda_config: The parsed ``[tool.mkrecipe]`` and ``[tool.whey-conda]`` configuration.
+		Defaults to the (cached) configuration from :func:`~.load_conda_config`.
+
+	.. versionchanged:: 0.4.0
+
+		Added the ``channel_cache``, ``force``, ``update_index``, ``timings_file`` and ``conda_config`` arguments.
 
 	.. autosummary-widths:: 1/2
 	"""
@@ -91,6 +121,11 @@ class CondaBuilder(WheelBuilder):
 			*,
 			verbose: bool = False,
 			colour: ColourTrilean = None,
+			channel_cache: Optional[ChannelCache] = None,
+			force: bool = False,
+			update_index: bool = False,
+			timings_file: Optional[PathLike] = None,
+			conda_config: Optional[Mapping[str, Any]] = None,
 			):
 		super().__init__(
 				project_dir,
@@ -101,19 +136,31 @@ class CondaBuilder(WheelBuilder):
 				colour=colour,
 				)
 
-		our_config = dom_toml.load(self.project_dir / "pyproject.toml")
+		if channel_cache is None:
+			channel_cache = ChannelCache.from_environment()
+
+		#: The cache to use for looking up requirements in conda channels.
+		self.channel_cache: ChannelCache = channel_cache
+
+		#: Build the package even if it is up to date.
+		self.force: bool = force
 
-		mkrecipe_table = our_config.get("tool", {}).get("mkrecipe", {})
-		mkrecipe_config = MkrecipeParser().parse(mkrecipe_table, set_defaults=False)
+		#: Add the package to the ``repodata.json`` file in the output directory.
+		self.update_index: bool = update_index
 
-		if "extras" in mkrecipe_config:
-			mkrecipe_config["conda-extras"] = mkrecipe_config["extras"]
+		#: A file to write the time taken by each phase of the build to, as JSON.
+		self.timings_file: Optional[PathPlus] = PathPlus(timings_file) if timings_file is not None else None
 
-		self.config.update(mkrecipe_config)
+		#: The time taken by each phase of the most recent build.
+		self.timings: BuildTimings = BuildTimings()
 
-		whey_deb_table = our_config.get("tool", {}).get("whey-conda", {})
-		parsed_config = WheyCondaParser().parse(whey_deb_table, set_defaults=False)
-		self.config.update(parsed_config)
+		# The runtime requirements being resolved in the background by build_conda().
+		self._runtime_requirements: "Optional[Future[List[ComparableRequirement]]]" = None
+
+		if conda_config is None:
+			conda_config = load_conda_config(self.project_dir)
+
+		self.config.update(conda_config)
 
 		for key, default in WheyCondaParser.defaults.items():
 			self.config.setdefault(key, default)
@@ -148,13 +195,15 @@ class CondaBuilder(WheelBuilder):
 		if self.verbose:
 			self._echo(*args, **kwargs)
 
-	def write_conda_index(self, build_number: int = 1) -> None:
+	def get_conda_index(self, build_number: int = 1) -> Dict[str, Any]:
 		"""
-		Write the conda ``index.json`` file.
+		Returns the content of the conda ``index.json`` file.
 
 		.. seealso:: https://docs.conda.io/projects/conda-build/en/latest/resources/package-spec.html#info-index-json
 
 		:param build_number:
+
+		.. versionadded:: 0.4.0
 		"""
 
 		build_string = f"py_{build_number}"
@@ -174,31 +223,34 @@ class CondaBuilder(WheelBuilder):
 				"noarch": "python",
 				"platform": None,
 				"subdir": "noarch",
-				"timestamp": int(datetime.datetime.now().timestamp() * 1000),
+				"timestamp": _get_timestamp(),
 				}
 
+		return index
+
+	def write_conda_index(self, build_number: int = 1) -> None:
+		"""
+		Write the conda ``index.json`` file.
+
+		.. seealso:: https://docs.conda.io/projects/conda-build/en/latest/resources/package-spec.html#info-index-json
+
+		:param build_number:
+		"""
+
 		index_json_file = self.info_dir / "index.json"
-		index_json_file.dump_json(index, indent=2)
+		index_json_file.dump_json(self.get_conda_index(build_number), indent=2)
 		self.report_written(index_json_file)
 
-	def write_conda_about(self) -> None:
+	def get_conda_about(self) -> Dict[str, Any]:
 		"""
-		Write the conda ``about.json`` file.
+		Returns the content of the conda ``about.json`` file.
 
 		.. seealso:: https://docs.conda.io/projects/conda-build/en/latest/resources/package-spec.html#info-about-json
-		"""
 
-		about = {}
+		.. versionadded:: 0.4.0
+		"""
 
-		# pylint: disable=loop-invariant-statement
-		for category, url in self.config["urls"].items():
-			if category.lower() in {"homepage", "home page"}:
-				about["home"] = url
-				about["dev_url"] = url
-			elif category.lower().startswith("source"):
-				about["dev_url"] = url
-			elif category.lower() in {"docs", "documentation"}:
-				about["doc_url"] = url
+		about: Dict[str, Any] = _get_about_urls(self.config["urls"])
 
 		# TODO: "license_family"
 		# TODO: "license_url"
@@ -208,9 +260,12 @@ class CondaBuilder(WheelBuilder):
 		if self.config["description"]:
 			about["summary"] = self.config["description"]
 
+		# 3rd party
+		from shippinglabel_conda import make_conda_description
+
 		about["description"] = make_conda_description(
 				self.config["conda-description"],
-				self.config["conda-channels"],
+				[channel for channel in self.config["conda-channels"] if not is_local_channel(channel)],
 				)
 
 		author = []
@@ -230,44 +285,164 @@ class CondaBuilder(WheelBuilder):
 		elif author:
 			about["extra"] = {"maintainers": author}
 
-		# pylint: enable=loop-invariant-statement,use-list-comprehension
+		# pylint: enable=use-list-comprehension
+
+		return about
+
+	def write_conda_about(self) -> None:
+		"""
+		Write the conda ``about.json`` file.
+
+		.. seealso:: https://docs.conda.io/projects/conda-build/en/latest/resources/package-spec.html#info-about-json
+		"""
 
 		about_json_file = self.info_dir / "about.json"
-		about_json_file.dump_json(about, indent=2)
+		about_json_file.dump_json(self.get_conda_about(), indent=2)
 		self.report_written(about_json_file)
 
-	def create_conda_archive(self, wheel_contents_dir: PathLike, build_number: int = 1) -> str:
+	def get_info_files(self, build_number: int = 1) -> Dict[str, bytes]:
 		"""
-		Create the conda archive.
+		Returns the content of the files in the ``info`` directory of the conda package,
+		except for ``info/files`` and ``info/paths.json``, which depend on the contents of the package.
+
+		The files are generated in memory and are not written to the build directory.
 
-		:param wheel_contents_dir: The directory containing the installed contents of the wheel.
 		:param build_number:
 
-		:return: The filename of the created archive.
+		:returns: A mapping of filenames (e.g. ``'info/index.json'``) to their content.
+
+		.. versionadded:: 0.4.0
+		"""  # noqa: D400
+
+		info_files = {}
+
+		if self.config.get("license", None) is not None:
+			info_files["info/license.txt"] = _clean(self.config["license"].text)
+			self._echo_if_v("Writing info/license.txt")
+
+		info_files["info/about.json"] = _clean(json.dumps(self.get_conda_about(), indent=2))
+		self._echo_if_v("Writing info/about.json")
+
+		info_files["info/index.json"] = _clean(json.dumps(self.get_conda_index(build_number), indent=2))
+		self._echo_if_v("Writing info/index.json")
+
+		return info_files
+
+	def _get_conda_filename(self, build_number: int, package_format: Optional[str] = None) -> PathPlus:
+		"""
+		Returns the path of the conda archive to create.
+
+		:param build_number:
+		:param package_format: The format of the archive. Defaults to the :conf:`package-format` option.
 		"""
 
 		build_string = f"py_{build_number}"
-		site_packages = pathlib.PurePosixPath("site-packages")
 
 		package_name = self.config["name"]
 		if isinstance(package_name, _NormalisedName):
 			package_name = package_name.unnormalized
 
-		conda_filename = self.out_dir / f"{package_name.lower()}-{self.config['version']}-{build_string}.tar.bz2"
+		writer_cls = get_archive_writer(package_format or self.config["package-format"])
+		return self.out_dir / f"{package_name.lower()}-{self.config['version']}-{build_string}{writer_cls.extension}"
+
+	def _open_archive(self, conda_filename: PathPlus, package_format: Optional[str] = None) -> CondaArchiveWriter:
+		"""
+		Open the conda archive for writing, in the format given by the :conf:`package-format` option
+		and at the level given by the :conf:`compression-level` option.
+
+		:param conda_filename:
+		:param package_format: The format of the archive, which overrides the :conf:`package-format` option.
+			The :conf:`compression-level` option is then ignored, as it is specific to the configured format.
+		"""  # noqa: D400
+
+		if package_format is None or package_format == self.config["package-format"]:
+			package_format = self.config["package-format"]
+			level = self.config["compression-level"]
+		else:
+			level = None
+
+		writer_cls = get_archive_writer(package_format)
+		return writer_cls(
+				conda_filename,
+				threads=self.config["compression-threads"],
+				source_date_epoch=get_source_date_epoch(),
+				level=level,
+				)
+
+	@staticmethod
+	def _record_archive_timing(timing: PhaseTiming, conda_archive: CondaArchiveWriter) -> None:
+		"""
+		Record the amount of data processed while creating the archive.
+
+		:param timing:
+		:param conda_archive: The closed archive.
+		"""
+
+		timing.files = len(conda_archive.paths)
+		timing.bytes_read = sum(entry["size_in_bytes"] for entry in conda_archive.paths)
+		timing.bytes_written = conda_archive.size
+
+	def _write_repodata_record(self, conda_archive: CondaArchiveWriter, index: Dict[str, Any]) -> None:
+		"""
+		Write the entry for the package in ``repodata.json`` next to the package,
+		and add it to the ``repodata.json`` file in the output directory if :attr:`~.update_index` is :py:obj:`True`.
+
+		:param conda_archive: The closed archive.
+		:param index: The content of the package's ``info/index.json`` file.
+		"""  # noqa: D400
+
+		conda_archive.write_repodata_record(index)
+
+		if self.update_index:
+			add_to_index(self.out_dir, {conda_archive.filename.name: conda_archive.get_repodata_record(index)})
+
+	def _add_info_files(self, conda_archive: CondaArchiveWriter, files_entries: List[str]) -> None:
+		"""
+		Write the ``info/files`` and ``info/paths.json`` files, and add the contents of the ``info`` directory to the archive.
+
+		:param conda_archive:
+		:param files_entries: The files in the archive, relative to the root of the conda environment.
+		"""
+
+		(self.info_dir / "files").write_lines(files_entries)
+		(self.info_dir / "paths.json").write_clean(conda_archive.get_paths_json())
+
+		for entry in scan_files(self.info_dir):
+			conda_archive.add(entry.path, arcname=f"info/{entry.relative_path}", stat_result=entry.stat)
+
+	def create_conda_archive(self, wheel_contents_dir: PathLike, build_number: int = 1) -> str:
+		"""
+		Create the conda archive.
+
+		:param wheel_contents_dir: The directory containing the installed contents of the wheel.
+		:param build_number:
+
+		:return: The filename of the created archive.
+
+		.. versionchanged:: 0.4.0
+
+			The archive format is determined by the :conf:`package-format` option.
+
+		.. seealso:: :meth:`~.create_conda_archive_from_wheel`, which doesn't require the wheel to be installed first.
+		"""
+
+		site_packages = pathlib.PurePosixPath("site-packages")
+		conda_filename = self._get_conda_filename(build_number)
 		wheel_contents_dir = PathPlus(wheel_contents_dir)
 
 		self.out_dir.maybe_make(parents=True)
 
 		files_entries = []
+		# The files to add, which are read on a separate thread while they are compressed.
+		files: List[Tuple[str, str, Optional[os.stat_result]]] = []
 
-		with handy_archives.TarFile.open(conda_filename, mode="w:bz2") as conda_archive:
+		with self.timings.phase("archive") as timing, self._open_archive(conda_filename) as conda_archive:
 
 			pkg_dir = posixpath.join(self.config["source-dir"], self.config["package"].split('.')[0])
-			for file in (wheel_contents_dir / pkg_dir).rglob('*'):
-				if file.is_file():
-					filename = (site_packages / file.relative_to(wheel_contents_dir)).as_posix()
-					files_entries.append(str(filename))
-					conda_archive.add(str(file), arcname=filename)
+			for entry in scan_files(wheel_contents_dir / pkg_dir):
+				filename = (site_packages / pkg_dir / entry.relative_path).as_posix()
+				files_entries.append(filename)
+				files.append((entry.path, filename, entry.stat))
 
 			dist_info_dir = wheel_contents_dir / f"{self.archive_name}.dist-info"
 
@@ -275,7 +450,10 @@ class CondaBuilder(WheelBuilder):
 				# Otherwise it says pip
 				(dist_info_dir / "INSTALLER").write_clean("conda")
 
-			for file in dist_info_dir.rglob('*'):
+			for entry in scan_files(dist_info_dir):
+				file = PathPlus(entry.path)
+				stat_result: Optional[os.stat_result] = entry.stat
+
 				if file.name == "RECORD":
 					record_lines = file.read_lines()
 					for idx, line in enumerate(record_lines):
@@ -292,25 +470,305 @@ class CondaBuilder(WheelBuilder):
 
 					# Remove double blank line caused by removal of entries
 					file.write_clean('\n'.join(record_lines).replace("\n\n", '\n'))
+					stat_result = None  # The file has changed.
 
 				elif file.name in {"REQUESTED", "direct_url.json"}:  # pylint: disable=loop-invariant-statement
 					continue
 
-				if file.is_file():
-					filename = (site_packages / file.relative_to(wheel_contents_dir)).as_posix()
-					files_entries.append(str(filename))
-					conda_archive.add(str(file), arcname=filename)
-
-			(self.info_dir / "files").write_lines(files_entries)
+				filename = (site_packages / dist_info_dir.name / entry.relative_path).as_posix()
+				files_entries.append(filename)
+				files.append((entry.path, filename, stat_result))
 
-			for file in self.info_dir.rglob('*'):
-				if not file.is_file():
-					continue
+			conda_archive.add_many(files)
+			self._add_info_files(conda_archive, files_entries)
 
-				conda_archive.add(str(file), arcname=file.relative_to(self.build_dir).as_posix())
+		self._record_archive_timing(timing, conda_archive)
+		self._write_repodata_record(conda_archive, (self.info_dir / "index.json").load_json())
 
 		return os.path.basename(conda_filename)
 
+	def create_conda_archive_from_wheel(self, wheel_file: PathLike, build_number: int = 1) -> str:
+		"""
+		Create the conda archive directly from the wheel, without installing it first.
+
+		Each file in the wheel is decompressed straight into the conda archive,
+		and the files in the ``info`` directory are generated in memory,
+		so no intermediate files are written to disk.
+
+		If the :envvar:`SOURCE_DATE_EPOCH` environment variable is set the archive is reproducible:
+		the files are added in order, with their modification times, owners and permissions normalised,
+		and the timestamp in ``index.json`` is taken from :envvar:`SOURCE_DATE_EPOCH`.
+		Identical inputs then produce byte-for-byte identical packages.
+
+		The entry for the package in a channel's ``repodata.json`` file is written next to the archive
+		(see :meth:`CondaArchiveWriter.write_repodata_record() <.CondaArchiveWriter.write_repodata_record>`),
+		and is added to the ``repodata.json`` file in the output directory if :attr:`~.update_index` is :py:obj:`True`.
+
+		:param wheel_file: The wheel to convert.
+		:param build_number:
+
+		:return: The filename of the created archive.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		return self.create_conda_archives_from_wheel(wheel_file, [(self.config["package-format"], build_number)])[0]
+
+	def create_conda_archives_from_wheel(
+			self,
+			wheel_file: PathLike,
+			outputs: Iterable[Tuple[str, int]],
+			) -> List[str]:
+		"""
+		Create several conda archives from the wheel in a single pass, e.g. in both package formats.
+
+		Each file in the wheel is decompressed once and written to all of the archives,
+		which are compressed in parallel (see :class:`~.FanOutWriter`).
+		Each archive has its own ``info`` files, and its own entry for ``repodata.json``,
+		as described for :meth:`~.create_conda_archive_from_wheel`.
+
+		:param wheel_file: The wheel to convert.
+		:param outputs: Tuples of the package format (as used in the :conf:`package-format` option)
+			and build number of each archive.
+
+		:return: The filenames of the created archives, in the order of ``outputs``.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		outputs = list(outputs)
+		conda_filenames = [
+				self._get_conda_filename(build_number, package_format) for package_format, build_number in outputs
+				]
+
+		if len(set(conda_filenames)) != len(conda_filenames):
+			raise ValueError("Each output must have a different package format or build number.")
+
+		with self.timings.phase("metadata"):
+			info_files = {build_number: self.get_info_files(build_number) for _, build_number in outputs}
+
+		self.out_dir.maybe_make(parents=True)
+
+		with self.timings.phase("archive") as timing, contextlib.ExitStack() as stack:
+			conda_archives: List[CondaArchiveWriter] = [
+					stack.enter_context(self._open_archive(conda_filename, package_format))
+					for conda_filename, (package_format, _) in zip(conda_filenames, outputs)
+					]
+
+			with zipfile.ZipFile(wheel_file) as wheel:
+				sort = get_source_date_epoch() is not None
+
+				if len(conda_archives) == 1:
+					# Handing the data to another thread would only add overhead.
+					files_entries = add_wheel_to_archive(conda_archives[0], wheel, sort=sort)
+				else:
+					with FanOutWriter(conda_archives) as fan_out:
+						files_entries = add_wheel_to_archive(fan_out, wheel, sort=sort)
+
+			for conda_archive, (_, build_number) in zip(conda_archives, outputs):
+				archive_info_files = {
+						**info_files[build_number],
+						"info/files": _clean('\n'.join(files_entries)),
+						"info/paths.json": _clean(conda_archive.get_paths_json()),
+						}
+
+				for filename, content in archive_info_files.items():
+					conda_archive.add_bytes(filename, content)
+
+		self._record_archive_timing(timing, conda_archives[0])
+		timing.bytes_written = sum(conda_archive.size for conda_archive in conda_archives)
+
+		for conda_archive, (_, build_number) in zip(conda_archives, outputs):
+			self._write_repodata_record(conda_archive, json.loads(info_files[build_number]["info/index.json"]))
+
+		return [os.path.basename(conda_filename) for conda_filename in conda_filenames]
+
+	def iter_package_files(self) -> Iterator[PathPlus]:
+		"""
+		Iterate over the files in the project which are included in the package.
+
+		This is the source files, plus those included by the ``additional-files`` key.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		yield from self.iter_source_files()
+
+		for entry in self.config["additional-files"]:
+			if isinstance(entry, (Include, RecursiveInclude)):
+				yield from entry.iter_files(self.project_dir)
+
+	def get_build_fingerprint(self, build_number: int = 1, wheel_file: Optional[PathLike] = None) -> str:
+		"""
+		Returns a fingerprint of the inputs to the build.
+
+		The fingerprint is a SHA256 hash of the version of ``whey-conda``, the build number,
+		the value of :envvar:`SOURCE_DATE_EPOCH`,
+		the configuration (including the ``[tool.whey-conda]`` and ``[tool.mkrecipe]`` tables),
+		the contents of the files included in the package, the resolved runtime requirements,
+		and the contents of ``wheel_file`` if given.
+
+		:param build_number:
+		:param wheel_file: An existing wheel which is converted to the conda package.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		return self._finish_fingerprint(
+				self._get_source_fingerprint(build_number, wheel_file),
+				self._get_runtime_requirements(),
+				)
+
+	def _get_source_fingerprint(self, build_number: int, wheel_file: Optional[PathLike] = None) -> "hashlib._Hash":
+		"""
+		Returns the hash of the inputs to the build, except for the runtime requirements.
+
+		:param build_number:
+		:param wheel_file: An existing wheel which is converted to the conda package.
+		"""
+
+		# A package built without SOURCE_DATE_EPOCH isn't reproducible, so must be rebuilt when it is set.
+		source_date_epoch = get_source_date_epoch()
+
+		fingerprint = hashlib.sha256()
+		fingerprint.update(f"whey-conda {__version__}\nbuild {build_number}\n".encode("UTF-8"))
+		fingerprint.update(f"source-date-epoch {source_date_epoch}\n".encode("UTF-8"))
+		fingerprint.update(json.dumps(self.config, sort_keys=True, default=_fingerprint_default).encode("UTF-8"))
+
+		with self.timings.phase("sources") as timing:
+			for filename in sorted(set(self.iter_package_files())):
+				content = filename.read_bytes()
+				fingerprint.update(f"\n{filename.relative_to(self.project_dir).as_posix()}\n".encode("UTF-8"))
+				fingerprint.update(hashlib.sha256(content).digest())
+				timing.files += 1
+				timing.bytes_read += len(content)
+
+			if wheel_file is not None:
+				# A different wheel given with the same sources must still be converted.
+				wheel_digest = hashlib.sha256()
+
+				with open(wheel_file, "rb") as fp:
+					for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+						wheel_digest.update(chunk)
+						timing.bytes_read += len(chunk)
+
+				fingerprint.update(f"\nwheel {wheel_digest.hexdigest()}\n".encode("UTF-8"))
+				timing.files += 1
+
+		return fingerprint
+
+	@staticmethod
+	def _finish_fingerprint(fingerprint: "hashlib._Hash", requirements: List[ComparableRequirement]) -> str:
+		"""
+		Add the runtime requirements to the hash from :meth:`~._get_source_fingerprint`, and return the fingerprint.
+
+		:param fingerprint:
+		:param requirements:
+		"""
+
+		depends = '\n'.join(map(str, requirements))
+		fingerprint.update(f"\n{depends}\n".encode("UTF-8"))
+
+		return fingerprint.hexdigest()
+
+	def _iter_wheel_contents(self, dist_info: str) -> Iterator[Tuple[str, bytes]]:
+		"""
+		Iterate over the names and expected content of the files in the wheel built from the current source.
+
+		:param dist_info: The name of the ``*.dist-info`` directory.
+		"""
+
+		code_directory = self.project_dir / self.code_directory
+
+		# Matches WheelBuilder.copy_source()
+		for file in self.iter_source_files():
+			yield file.relative_to(code_directory).as_posix(), _clean(file.read_text())
+
+		for entry in self.config["additional-files"]:
+			if isinstance(entry, (Include, RecursiveInclude)):
+				for file in entry.iter_files(self.project_dir):
+					yield file.relative_to(code_directory).as_posix(), file.read_bytes()
+
+		yield f"{dist_info}/METADATA", _clean(metadata.dumps(self.get_metadata_map()))
+
+		if self.config.get("license", None) is not None:
+			yield f"{dist_info}/LICENSE", _clean(self.config["license"].text)
+
+		ep_dict = {}
+
+		if self.config["scripts"]:
+			ep_dict["console_scripts"] = self.config["scripts"]
+
+		if self.config["gui-scripts"]:
+			ep_dict["gui_scripts"] = self.config["gui-scripts"]
+
+		ep_dict.update(self.config["entry-points"])
+
+		yield f"{dist_info}/entry_points.txt", entry_points.dumps(ep_dict).encode("UTF-8")
+
+	def is_wheel_current(self, wheel_file: PathLike) -> bool:
+		"""
+		Returns whether the given wheel was built from the current source files and configuration,
+		and can therefore be converted to a conda package instead of building a new wheel.
+
+		The hashes in the wheel's ``RECORD`` file are compared to those of the source files,
+		the additional files, and the generated metadata.
+
+		:param wheel_file:
+
+		.. versionadded:: 0.4.0
+		"""  # noqa: D400
+
+		dist_info = f"{self.archive_name}.dist-info"
+
+		try:
+			with zipfile.ZipFile(wheel_file) as wheel:
+				if find_dist_info(wheel) != dist_info:
+					return False
+
+				record = read_record(wheel)
+
+		except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+			return False
+
+		expected = dict(self._iter_wheel_contents(dist_info))
+
+		for arcname, digest in record.items():
+			if arcname in expected:
+				if digest != record_digest(expected[arcname]):
+					return False
+			elif not arcname.startswith(f"{dist_info}/"):
+				# The file has since been removed from the source.
+				return False
+
+		# Files matched by additional-files "exclude" entries are missing from the wheel.
+		has_excludes = any(
+				isinstance(entry, (Exclude, RecursiveExclude)) for entry in self.config["additional-files"]
+				)
+
+		for arcname in expected:
+			if arcname not in record and not has_excludes:
+				return False
+
+		return True
+
+	def find_wheel(self) -> Optional[PathPlus]:
+		"""
+		Returns the path to an existing wheel in the output directory which was built from the current
+		source files and configuration, or :py:obj:`None` if there isn't one.
+
+		.. seealso:: :meth:`~.is_wheel_current`
+
+		.. versionadded:: 0.4.0
+		"""  # noqa: D400
+
+		wheel_file = self.out_dir / f"{self.archive_name}-{self.tag}.whl"
+
+		if wheel_file.is_file() and self.is_wheel_current(wheel_file):
+			return wheel_file
+		else:
+			return None
+
 	def write_license(self, dest_dir: PathPlus, dest_filename: str = "LICENSE") -> None:
 		"""
 		Write the ``LICENSE`` file.
@@ -330,6 +788,28 @@ class CondaBuilder(WheelBuilder):
 		Returns a list of the project's runtime requirements.
 		"""
 
+		self._echo_if_v(
+				f"Checking dependencies against the following channels: "
+				f"{word_join(self.config['conda-channels'], use_repr=True)}",
+				)
+
+		return self._get_runtime_requirements()
+
+	def _get_runtime_requirements(self) -> List[ComparableRequirement]:
+		with self.timings.phase("requirements"):
+			if self._runtime_requirements is not None:
+				# Started by build_conda(); only the time spent waiting for the result is recorded.
+				return self._runtime_requirements.result()
+
+			return self._resolve_runtime_requirements()
+
+	def _resolve_runtime_requirements(self) -> List[ComparableRequirement]:
+		# May be called on a background thread, so doesn't record timings.
+
+		# 3rd party
+		from mkrecipe import filter_reqs_by_py_version, filter_reqs_with_markers
+		from shippinglabel_conda import prepare_requirements
+
 		extras: List[Union[str, ComparableRequirement]] = []
 
 		if self.config["conda-extras"] == "all":
@@ -349,54 +829,194 @@ class CondaBuilder(WheelBuilder):
 				)
 		all_requirements = filter_reqs_by_py_version(self.config, all_requirements)
 
-		self._echo_if_v(
-				f"Checking dependencies against the following channels: "
-				f"{word_join(self.config['conda-channels'], use_repr=True)}",
-				)
-
 		all_requirements = validate_requirements(
 				prepare_requirements(all_requirements),
-				self.config["conda-channels"],
+				[resolve_channel(channel, self.project_dir) for channel in self.config["conda-channels"]],
+				cache=self.channel_cache,
 				)
 
-		requirements_entries = [req for req in all_requirements if req and req != "numpy"]
-
-		if [v.specifier for v in all_requirements if v == "numpy"]:
-			requirements_entries.append(ComparableRequirement("numpy>=1.19.0"))
-
-		return requirements_entries
+		return _pin_numpy(all_requirements)
 
-	def build_conda(self) -> str:
+	def build_conda(self, wheel_file: Optional[PathLike] = None) -> str:
 		"""
 		Build the Conda distribution.
 
+		:param wheel_file: An existing wheel to convert to a conda package.
+			If :py:obj:`None` a matching wheel in the output directory is used if there is one
+			(see :meth:`~.find_wheel`), otherwise a new wheel is built.
+
 		:return: The filename of the created archive.
+
+		.. versionchanged:: 0.4.0
+
+			The wheel is converted in-process, rather than being installed into a temporary directory with ``pip``.
+			The files in the ``info`` directory are no longer written to the build directory.
+
+			A fingerprint of the build (see :meth:`~.get_build_fingerprint`) is stored next to the package.
+			If the package exists and the fingerprint has not changed the package is not rebuilt,
+			unless :attr:`~.force` is :py:obj:`True`.
+
+			The package's entry for ``repodata.json``, with its hashes and size, is stored next to the package.
+
+			Added the ``wheel_file`` argument.
+
+			The time taken by each phase of the build is recorded in :attr:`~.timings`.
+
+			The runtime requirements are resolved and validated against the conda channels in the background,
+			while the wheel is built, and their result is only waited for when ``index.json`` is written.
+		"""
+
+		return self.build_conda_outputs([(self.config["package-format"], 1)], wheel_file)[0]
+
+	def build_conda_outputs(
+			self,
+			outputs: Sequence[Tuple[str, int]],
+			wheel_file: Optional[PathLike] = None,
+			) -> List[str]:
+		"""
+		Build several Conda distributions in a single pass, e.g. in both package formats or with several build numbers.
+
+		The wheel is built (or found) once, and its contents are written to all of the packages at once
+		(see :meth:`~.create_conda_archives_from_wheel`),
+		so the build takes little longer than that of the slowest package.
+		Fingerprints are stored for each package as described for :meth:`~.build_conda`.
+		The packages are only rebuilt if any of them is missing or out of date.
+
+		:param outputs: Tuples of the package format (as used in the :conf:`package-format` option)
+			and build number of each package.
+		:param wheel_file: An existing wheel to convert to conda packages.
+			If :py:obj:`None` a matching wheel in the output directory is used if there is one
+			(see :meth:`~.find_wheel`), otherwise a new wheel is built.
+
+		:return: The filenames of the created archives, in the order of ``outputs``.
+
+		.. versionadded:: 0.4.0
 		"""
 
-		build_number = 1
+		# stdlib
+		from concurrent.futures import ThreadPoolExecutor
+
+		if not outputs:
+			raise ValueError("No outputs given.")
+
+		self.timings = BuildTimings()
 
-		# Build the wheel first and clear the build directory
-		wheel_file = self.build_wheel()
+		executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whey-conda-requirements")
+		self._runtime_requirements = executor.submit(self._resolve_runtime_requirements)
+		executor.shutdown(wait=False)
 
-		self.clear_build_dir()
+		try:
+			return self._build_conda(outputs, wheel_file, self._runtime_requirements)
+		finally:
+			self._runtime_requirements = None
 
-		self.write_license(self.info_dir, "license.txt")
+	def _build_conda(
+			self,
+			outputs: Sequence[Tuple[str, int]],
+			wheel_file: Optional[PathLike],
+			runtime_requirements: "Future[List[ComparableRequirement]]",
+			) -> List[str]:
+		conda_files = [
+				self._get_conda_filename(build_number, package_format) for package_format, build_number in outputs
+				]
+		fingerprint_files = [conda_file.with_name(f"{conda_file.name}.fingerprint") for conda_file in conda_files]
+		build_numbers = sorted({build_number for _, build_number in outputs})
+
+		with self.timings.phase("fingerprint"):
+			source_fingerprints = {
+					build_number: self._get_source_fingerprint(build_number, wheel_file)
+					for build_number in build_numbers
+					}
+
+			if not self.force and all(file.is_file() for file in chain(conda_files, fingerprint_files)):
+				# Waits for the requirements, which are only needed here if the packages might be up to date.
+				runtime_requirements_list = self._get_runtime_requirements()
+				fingerprints: Optional[Dict[int, str]] = {
+						build_number: self._finish_fingerprint(fingerprint, runtime_requirements_list)
+						for build_number, fingerprint in source_fingerprints.items()
+						}
+			else:
+				fingerprints = None
 
-		self.write_conda_about()
-		self.write_conda_index(build_number=build_number)
+		if fingerprints is not None and all(
+				fingerprint_file.read_text().strip() == fingerprints[build_number]
+				for fingerprint_file, (_, build_number) in zip(fingerprint_files, outputs)
+				):
+			for conda_file in conda_files:
+				self._echo(Fore.GREEN(f"Conda package at {conda_file.resolve().as_posix()} is up to date"))
 
-		with tempfile.TemporaryDirectory() as tmpdir:
-			self._echo_if_v("Installing wheel into temporary directory")
+			self._report_timings(", ".join(conda_file.name for conda_file in conda_files))
+			return [conda_file.name for conda_file in conda_files]
 
-			pip_install_wheel(self.out_dir / wheel_file, tmpdir, self.verbose)
-			conda_filename = self.create_conda_archive(str(tmpdir), build_number=build_number)
+		# Don't leave stale fingerprints behind if the build fails.
+		for fingerprint_file in fingerprint_files:
+			fingerprint_file.unlink(missing_ok=True)
 
-		self._echo(Fore.GREEN(f"Conda package created at {(self.out_dir / conda_filename).resolve().as_posix()}"))
-		return conda_filename
+		with self.timings.phase("wheel") as timing:
+			if wheel_file is not None:
+				wheel_file = PathPlus(wheel_file)
+
+				with zipfile.ZipFile(wheel_file) as wheel:
+					if find_dist_info(wheel) != f"{self.archive_name}.dist-info":
+						raise ValueError(f"{wheel_file.name!r} is not a wheel for {self.archive_name!r}.")
+			else:
+				wheel_file = self.find_wheel()
+
+			if wheel_file is None:
+				# Build the wheel first and clear the build directory
+				wheel_file = self.out_dir / self.build_wheel()
+				self.clear_build_dir()
+				timing.bytes_written = wheel_file.stat().st_size
+			else:
+				self._echo_if_v(f"Using existing wheel {wheel_file.name}")
+
+		self._echo_if_v(f"Converting {wheel_file.name} to a conda package")
+		conda_filenames = self.create_conda_archives_from_wheel(wheel_file, outputs)
+
+		if fingerprints is None:
+			fingerprints = {
+					build_number: self._finish_fingerprint(fingerprint, runtime_requirements.result())
+					for build_number, fingerprint in source_fingerprints.items()
+					}
+
+		for fingerprint_file, conda_filename, (_, build_number) in zip(fingerprint_files, conda_filenames, outputs):
+			fingerprint_file.write_clean(fingerprints[build_number])
+			self._echo(Fore.GREEN(f"Conda package created at {(self.out_dir / conda_filename).resolve().as_posix()}"))
+
+		self._report_timings(", ".join(conda_filenames))
+		return conda_filenames
+
+	def _report_timings(self, conda_filename: str) -> None:
+		"""
+		Show the time taken by each phase of the build in verbose mode,
+		and write it to :attr:`~.timings_file` if set.
+
+		:param conda_filename: The filename of the conda package, or a comma-separated list of filenames.
+		"""  # noqa: D400
+
+		self._echo_if_v(f"Build timings:\n{self.timings.format_table()}")
+
+		if self.timings_file is not None:
+			self.timings_file.parent.maybe_make(parents=True)
+			self.timings.dump(
+					self.timings_file,
+					project=str(self.config["name"]),
+					version=str(self.config["version"]),
+					package=conda_filename,
+					)
 
 	build = build_conda
 
 
+def _fingerprint_default(obj: object) -> object:
+	# Makes the config JSON serializable, in a deterministic order.
+
+	if isinstance(obj, (set, frozenset)):
+		return sorted(map(str, obj))
+
+	return str(obj)
+
+
 def pip_install_wheel(wheel_file: PathLike, target_dir: PathLike, verbose: bool = False) -> None:
 	# pylint: disable=use-tuple-over-list
 	command = [
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+#
+#  __main__.py
+"""
+Command-line interface for ``whey-conda``.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import sys
+
+# 3rd party
+import click
+from consolekit import CONTEXT_SETTINGS, click_group
+from consolekit.options import (
+		DescribedArgument,
+		auto_default_argument,
+		auto_default_option,
+		colour_option,
+		flag_option
+		)
+from consolekit.tracebacks import handle_tracebacks
+
+if False:  # TYPE_CHECKING:  # pylint: disable=using-constant-test
+	# stdlib
+	from typing import Optional, Tuple
+
+	# 3rd party
+	from consolekit.terminal_colours import ColourTrilean
+	from domdf_python_tools.typing import PathLike
+
+__all__ = ("auto_tune", "build", "build_many", "clear_cache", "convert", "index", "main")
+
+
+@click_group()
+def main() -> None:
+	"""
+	Create Conda packages for Python projects.
+	"""
+
+
+@flag_option(
+		"-T",
+		"--traceback",
+		"show_traceback",
+		help="Show the complete traceback on error.",
+		envvar="WHEY_TRACEBACK",
+		)
+@colour_option()
+@flag_option("-v", "--verbose", help="Enable verbose output.", envvar="WHEY_VERBOSE")
+@flag_option(
+		"--index",
+		"update_index",
+		help="Add the package to the repodata.json file in the output directory, which should be <channel>/noarch.",
+		)
+@auto_default_option(
+		"--timings",
+		"timings_file",
+		type=click.STRING,
+		help="Write the time taken by each phase of the build to the given file as JSON.",
+		metavar="FILE",
+		envvar="WHEY_CONDA_TIMINGS",
+		)
+@flag_option(
+		"-f",
+		"--force",
+		help="Build the package even if it is up to date.",
+		envvar="WHEY_CONDA_FORCE",
+		)
+@flag_option(
+		"--offline",
+		help="Only use cached conda channel lookups, and fail if a lookup is not in the cache.",
+		envvar="WHEY_CONDA_OFFLINE",
+		)
+@auto_default_option(
+		"--from-wheel",
+		type=click.STRING,
+		help="Convert the given wheel rather than building one.",
+		metavar="WHEEL",
+		)
+@click.option(
+		"--build-number",
+		"build_numbers",
+		type=click.IntRange(min=0),
+		multiple=True,
+		help="The build number of the package. May be given multiple times to build several packages. Defaults to 1.",
+		)
+@click.option(
+		"--format",
+		"package_formats",
+		type=click.Choice(["tar.bz2", "conda"]),
+		multiple=True,
+		help=(
+				"The format of the package. May be given multiple times to build several packages in one pass. "
+				"Defaults to the package-format option."
+				),
+		)
+@auto_default_option(
+		"-o",
+		"--out-dir",
+		type=click.STRING,
+		help="The output directory.",
+		metavar="DIRECTORY",
+		)
+@auto_default_option(
+		"--build-dir",
+		type=click.STRING,
+		help="The temporary build directory.",
+		metavar="DIRECTORY",
+		)
+@auto_default_argument(
+		"project",
+		type=click.STRING,
+		cls=DescribedArgument,
+		description="The path to the project to build.",
+		)
+@main.command(context_settings=CONTEXT_SETTINGS)
+def build(
+		project: "PathLike" = '.',
+		build_dir: "Optional[str]" = None,
+		out_dir: "Optional[str]" = None,
+		from_wheel: "Optional[str]" = None,
+		package_formats: "Tuple[str, ...]" = (),
+		build_numbers: "Tuple[int, ...]" = (),
+		offline: bool = False,
+		force: bool = False,
+		update_index: bool = False,
+		timings_file: "Optional[str]" = None,
+		verbose: bool = False,
+		colour: "ColourTrilean" = None,
+		show_traceback: bool = False,
+		) -> None:
+	"""
+	Build a conda package for the given project.
+	"""
+
+	# 3rd party
+	from domdf_python_tools.paths import PathPlus
+	from whey.foreman import Foreman
+	from whey.utils import WheyTracebackHandler
+
+	# this package
+	from whey_conda import CondaBuilder
+	from whey_conda.channels import ChannelCache
+
+	project = PathPlus(project).resolve()
+
+	with handle_tracebacks(show_traceback, WheyTracebackHandler):
+		foreman = Foreman(project_dir=project)
+
+		click.echo(f"Building {foreman.project_dir.as_posix()}")
+
+		builder = CondaBuilder(
+				project_dir=foreman.project_dir,
+				config=foreman.config,
+				build_dir=build_dir,
+				out_dir=out_dir,
+				verbose=verbose,
+				colour=colour,
+				channel_cache=ChannelCache.from_environment(offline=offline),
+				force=force,
+				update_index=update_index,
+				timings_file=timings_file,
+				)
+
+		if package_formats or build_numbers:
+			outputs = [
+					(package_format, build_number)
+					for package_format in (package_formats or [builder.config["package-format"]])
+					for build_number in (build_numbers or [1])
+					]
+			builder.build_conda_outputs(outputs, from_wheel)
+		else:
+			builder.build_conda(from_wheel)
+
+
+@flag_option("-v", "--verbose", help="Enable verbose output.", envvar="WHEY_VERBOSE")
+@flag_option(
+		"--index",
+		"update_index",
+		help="Add the packages to the repodata.json file in the output directory, which should be <channel>/noarch.",
+		)
+@click.option(
+		"--timings-dir",
+		type=click.STRING,
+		default=None,
+		help="Write the time taken by each phase of each build to a JSON file in the given directory.",
+		metavar="DIRECTORY",
+		envvar="WHEY_CONDA_TIMINGS_DIR",
+		)
+@flag_option(
+		"-f",
+		"--force",
+		help="Build the packages even if they are up to date.",
+		envvar="WHEY_CONDA_FORCE",
+		)
+@flag_option(
+		"--offline",
+		help="Only use cached conda channel lookups, and fail if a lookup is not in the cache.",
+		envvar="WHEY_CONDA_OFFLINE",
+		)
+@click.option(
+		"-j",
+		"--jobs",
+		type=click.INT,
+		default=None,
+		help="The number of projects to build at once. Defaults to the number of CPUs.",
+		)
+@click.option(
+		"-o",
+		"--out-dir",
+		type=click.STRING,
+		default=None,
+		help="The output directory. Defaults to the 'dist' directory of each project.",
+		metavar="DIRECTORY",
+		)
+@click.argument("projects", type=click.STRING, nargs=-1, required=True)
+@main.command(context_settings=CONTEXT_SETTINGS)
+def build_many(
+		projects: "Tuple[str, ...]",
+		out_dir: "Optional[str]" = None,
+		jobs: "Optional[int]" = None,
+		offline: bool = False,
+		force: bool = False,
+		update_index: bool = False,
+		timings_dir: "Optional[str]" = None,
+		verbose: bool = False,
+		) -> None:
+	"""
+	Build conda packages for several projects.
+	"""
+
+	# 3rd party
+	from consolekit.terminal_colours import Fore
+
+	# this package
+	from whey_conda.batch import build_many
+
+	results = build_many(
+			projects,
+			out_dir,
+			jobs=jobs,
+			verbose=verbose,
+			force=force,
+			offline=offline,
+			update_index=update_index,
+			timings_dir=timings_dir,
+			)
+
+	for result in results:
+		if result.success:
+			click.echo(Fore.GREEN(f"{result.project_dir}: {result.archive} ({result.duration:.1f}s)"))
+		else:
+			click.echo(Fore.RED(f"{result.project_dir}: {result.error} ({result.duration:.1f}s)"), err=True)
+
+	failures = sum(not result.success for result in results)
+
+	if failures:
+		click.echo(f"{failures} of {len(results)} builds failed.", err=True)
+		sys.exit(1)
+
+
+@flag_option(
+		"--index",
+		"update_index",
+		help="Add the packages to the repodata.json file in the output directory, which should be <channel>/noarch.",
+		)
+@flag_option(
+		"--offline",
+		help="Only use cached conda channel lookups, and fail if a lookup is not in the cache.",
+		envvar="WHEY_CONDA_OFFLINE",
+		)
+@click.option(
+		"-j",
+		"--jobs",
+		type=click.INT,
+		default=None,
+		help="The number of wheels to convert at once. Defaults to the number of CPUs.",
+		)
+@click.option(
+		"--format",
+		"package_format",
+		type=click.Choice(["tar.bz2", "conda"]),
+		default="tar.bz2",
+		help="The format of the conda packages.",
+		show_default=True,
+		)
+@click.option(
+		"-c",
+		"--channel",
+		"channels",
+		type=click.STRING,
+		multiple=True,
+		help="A conda channel to check the requirements against. May be given multiple times.",
+		default=["conda-forge"],
+		show_default=True,
+		)
+@click.option(
+		"-o",
+		"--out-dir",
+		type=click.STRING,
+		default="dist",
+		help="The output directory.",
+		metavar="DIRECTORY",
+		show_default=True,
+		)
+@click.argument("wheels", type=click.STRING, nargs=-1, required=True)
+@main.command(context_settings=CONTEXT_SETTINGS)
+def convert(
+		wheels: "Tuple[str, ...]",
+		out_dir: str = "dist",
+		channels: "Tuple[str, ...]" = ("conda-forge", ),
+		package_format: str = "tar.bz2",
+		jobs: "Optional[int]" = None,
+		offline: bool = False,
+		update_index: bool = False,
+		) -> None:
+	"""
+	Convert pure-Python wheels to conda packages.
+
+	WHEELS may be wheel files or directories containing wheel files.
+	"""
+
+	# stdlib
+	import time
+
+	# 3rd party
+	from consolekit.terminal_colours import Fore
+
+	# this package
+	from whey_conda.wheel2conda import convert_wheels, find_wheels
+
+	start_time = time.perf_counter()
+	results = convert_wheels(
+			find_wheels(wheels),
+			out_dir,
+			channels,
+			jobs=jobs,
+			package_format=package_format,
+			offline=offline,
+			update_index=update_index,
+			)
+	duration = time.perf_counter() - start_time
+
+	for result in results:
+		if result.success:
+			click.echo(Fore.GREEN(f"{result.wheel}: {result.archive}"))
+		else:
+			click.echo(Fore.RED(f"{result.wheel}: {result.error}"), err=True)
+
+	converted = sum(result.success for result in results)
+	rate = converted / duration if duration > 0 else 0.0
+	click.echo(
+			f"Converted {converted} of {len(results)} wheels in {duration:.1f}s "
+			f"({rate:.1f} packages/s).",
+			)
+
+	if converted != len(results):
+		sys.exit(1)
+
+
+@click.argument("directory", type=click.STRING, default="dist/noarch")
+@main.command(context_settings=CONTEXT_SETTINGS)
+def index(directory: str = "dist/noarch") -> None:
+	"""
+	Update the repodata.json file for the conda packages in DIRECTORY.
+
+	Only packages which have changed since the index was last updated are read.
+	"""
+
+	# this package
+	from whey_conda.repodata import index_directory
+
+	repodata = index_directory(directory)
+	n_packages = len(repodata["packages"]) + len(repodata["packages.conda"])
+	click.echo(f"Indexed {n_packages} packages in {directory}")
+
+
+@flag_option(
+		"-T",
+		"--traceback",
+		"show_traceback",
+		help="Show the complete traceback on error.",
+		envvar="WHEY_TRACEBACK",
+		)
+@flag_option(
+		"--offline",
+		help="Only use cached conda channel lookups, and fail if a lookup is not in the cache.",
+		envvar="WHEY_CONDA_OFFLINE",
+		)
+@click.option(
+		"-r",
+		"--repeat",
+		type=click.IntRange(min=1),
+		default=1,
+		help="The number of times to create each package. The shortest time is reported.",
+		show_default=True,
+		)
+@click.option(
+		"--threads",
+		type=click.IntRange(min=0),
+		default=None,
+		help="The number of threads to compress with, or 0 for one per CPU. Defaults to compression-threads.",
+		)
+@click.option(
+		"--format",
+		"package_formats",
+		type=click.Choice(["tar.bz2", "conda"]),
+		multiple=True,
+		help="Only try the given package format. May be given multiple times.",
+		)
+@auto_default_argument(
+		"project",
+		type=click.STRING,
+		cls=DescribedArgument,
+		description="The path to the project to build.",
+		)
+@main.command(context_settings=CONTEXT_SETTINGS)
+def auto_tune(
+		project: "PathLike" = '.',
+		package_formats: "Tuple[str, ...]" = (),
+		threads: "Optional[int]" = None,
+		repeat: int = 1,
+		offline: bool = False,
+		show_traceback: bool = False,
+		) -> None:
+	"""
+	Compare the time taken to build, and the size of, the project's conda package
+	with each package format and a range of compression levels.
+	"""  # noqa: D400
+
+	# stdlib
+	import importlib.util
+
+	# 3rd party
+	from whey.utils import WheyTracebackHandler
+
+	# this package
+	from whey_conda.channels import ChannelCache
+	from whey_conda.tune import DEFAULT_CANDIDATES
+	from whey_conda.tune import auto_tune as _auto_tune
+
+	if not package_formats:
+		package_formats = ("tar.bz2", "conda") if importlib.util.find_spec("zstandard") else ("tar.bz2", )
+
+	candidates = [candidate for candidate in DEFAULT_CANDIDATES if candidate[0] in package_formats]
+
+	with handle_tracebacks(show_traceback, WheyTracebackHandler):
+		results = _auto_tune(
+				project,
+				candidates,
+				threads=threads,
+				repeat=repeat,
+				channel_cache=ChannelCache.from_environment(offline=offline),
+				)
+
+	click.echo(f"{'Format':<8}  {'Level':>5}  {'Time (s)':>8}  {'Size (kB)':>10}  {'Ratio':>6}")
+	for result in results:
+		click.echo(
+				f"{result.package_format:<8}  {result.level:>5}  {result.duration:>8.3f}  "
+				f"{result.size / 1000:>10.1f}  {result.ratio:>6.1%}",
+				)
+
+	for label, best in (
+			("Fastest", min(results, key=lambda r: r.duration)),
+			("Smallest", min(results, key=lambda r: (r.size, r.duration))),
+			):
+		click.echo(f'{label}: package-format = "{best.package_format}", compression-level = {best.level}')
+
+
+@main.command(context_settings=CONTEXT_SETTINGS)
+def clear_cache() -> None:
+	"""
+	Clear the cache of conda channel lookups.
+	"""
+
+	# this package
+	from whey_conda.channels import ChannelCache
+
+	ChannelCache.from_environment().clear()
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,1197 @@
+#!/usr/bin/env python3
+#
+#  archive.py
+"""
+Writers for the different conda package formats.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import bz2
+import copy
+import datetime
+import hashlib
+import io
+import json
+import os
+import stat
+import tarfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections import deque
+from functools import lru_cache
+from types import TracebackType
+from typing import (
+		IO,
+		Any,
+		Deque,
+		Dict,
+		Iterable,
+		Iterator,
+		List,
+		Mapping,
+		NamedTuple,
+		Optional,
+		Sequence,
+		Tuple,
+		Type,
+		TypeVar
+		)
+
+# 3rd party
+import handy_archives
+from domdf_python_tools.paths import PathPlus, clean_writer
+from domdf_python_tools.typing import PathLike
+
+if False:  # TYPE_CHECKING:  # pylint: disable=using-constant-test
+	# stdlib
+	from concurrent.futures import Future
+
+	# 3rd party
+	from shippinglabel.requirements import ComparableRequirement
+
+__all__ = (
+		"CondaArchiveWriter",
+		"CondaV2ArchiveWriter",
+		"FanOutWriter",
+		"FileEntry",
+		"PIPELINE_BUFFER_SIZE",
+		"ParallelBZ2Writer",
+		"TarBz2ArchiveWriter",
+		"archive_formats",
+		"get_archive_writer",
+		"get_source_date_epoch",
+		"scan_files",
+		)
+
+_W = TypeVar("_W", bound="CondaArchiveWriter")
+
+# The size of the chunks the bodies of files are copied into the archive in.
+_COPY_BUFSIZE = 1024 * 1024
+
+#: The maximum amount of file data, in bytes, read ahead of the compressor by :meth:`CondaArchiveWriter.add_many`.
+PIPELINE_BUFFER_SIZE: int = 16 * 1024 * 1024
+
+
+class CondaArchiveWriter(ABC):
+	"""
+	Abstract base class for writers of conda package archives.
+
+	Members whose names start with ``info/`` form the package metadata,
+	and all other members form the package contents.
+
+	The SHA256 hash and size of each file in the package contents are computed
+	as it is written to the archive, and are available from :attr:`~.paths`.
+	Symbolic links are recorded there with the ``softlink`` path type.
+	Likewise the MD5 and SHA256 hashes and the size of the archive itself are computed
+	as it is written to disk, and are available from :attr:`~.md5`, :attr:`~.sha256` and :attr:`~.size`
+	once the archive has been closed.
+
+	:param filename: The filename of the archive to create.
+	:param threads: The number of threads to compress with. ``0`` uses one thread per CPU.
+	:param source_date_epoch: If given, the archive is made reproducible.
+		The modification time of every member is set to this Unix timestamp,
+		the owner to ``root`` (with no user or group names),
+		and the permissions to ``0o755`` for directories and executables or ``0o644`` otherwise.
+	:param level: The compression level. Defaults to :attr:`~.default_level`.
+
+	.. versionchanged:: 0.4.0  Added the ``level`` argument.
+	"""
+
+	#: The file extension (including the leading ``.``) used by this package format.
+	extension: str
+
+	#: The compression levels supported by this package format.
+	compression_levels: range
+
+	#: The compression level used if none is given.
+	default_level: int
+
+	def __init__(
+			self,
+			filename: PathLike,
+			threads: int = 1,
+			source_date_epoch: Optional[int] = None,
+			level: Optional[int] = None,
+			):
+		if level is None:
+			level = self.default_level
+		elif level not in self.compression_levels:
+			raise ValueError(
+					f"Invalid compression level {level} for {self.extension!r} packages: "
+					f"expected {self.compression_levels[0]} to {self.compression_levels[-1]}.",
+					)
+
+		self.filename = PathPlus(filename)
+		self.threads = threads or os.cpu_count() or 1
+		self.source_date_epoch = source_date_epoch
+		self.level = level
+
+		#: The entries for ``info/paths.json`` for the package contents written so far.
+		self.paths: List[Dict[str, Any]] = []
+
+		self._output = _HashingWriter(self.filename.open("wb"))
+
+	@property
+	def stem(self) -> str:
+		"""
+		The filename of the archive without the extension, i.e. ``{name}-{version}-{build_string}``.
+		"""
+
+		name = self.filename.name
+		if name.endswith(self.extension):
+			return name[:-len(self.extension)]
+		else:  # pragma: no cover
+			return name
+
+	def addfile(self, tarinfo: tarfile.TarInfo, fileobj: Optional[IO[bytes]] = None) -> None:
+		"""
+		Add a member to the archive.
+
+		:param tarinfo: The header for the member.
+		:param fileobj: A binary file object from which :attr:`tarinfo.size <tarfile.TarInfo.size>` bytes are read.
+		"""
+
+		if self.source_date_epoch is not None:
+			tarinfo.mtime = self.source_date_epoch
+			tarinfo.uid = tarinfo.gid = 0
+			tarinfo.uname = tarinfo.gname = ''
+
+			if tarinfo.isdir() or tarinfo.mode & 0o111:
+				tarinfo.mode = 0o755
+			else:
+				tarinfo.mode = 0o644
+
+		if tarinfo.name.startswith("info/") or fileobj is None or not tarinfo.isreg():
+			self._addfile(tarinfo, fileobj)
+
+			if tarinfo.issym() and not tarinfo.name.startswith("info/"):
+				# conda recreates the link on install, so there is no content to hash.
+				self.paths.append({"_path": tarinfo.name, "path_type": "softlink"})
+
+			return
+
+		reader = _HashingReader(fileobj)
+		self._addfile(tarinfo, reader)  # type: ignore[arg-type]
+		self.paths.append({
+				"_path": tarinfo.name,
+				"path_type": "hardlink",
+				"sha256": reader.sha256.hexdigest(),
+				"size_in_bytes": reader.size,
+				})
+
+	@property
+	def md5(self) -> str:
+		"""
+		The MD5 hash of the archive, as a hexadecimal string.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		return self._output.md5.hexdigest()
+
+	@property
+	def sha256(self) -> str:
+		"""
+		The SHA256 hash of the archive, as a hexadecimal string.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		return self._output.sha256.hexdigest()
+
+	@property
+	def size(self) -> int:
+		"""
+		The size of the archive, in bytes.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		return self._output.size
+
+	def get_repodata_record(self, index: Dict[str, Any]) -> Dict[str, Any]:
+		"""
+		Returns the entry for the archive in a channel's ``repodata.json`` file.
+
+		The entry is the content of the package's ``info/index.json`` file,
+		with the ``md5``, ``sha256`` and ``size`` of the archive.
+
+		This must be called after the archive has been closed.
+
+		:param index: The content of the package's ``info/index.json`` file.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		return {**index, "md5": self.md5, "sha256": self.sha256, "size": self.size}
+
+	def write_repodata_record(self, index: Dict[str, Any]) -> PathPlus:
+		"""
+		Write the entry for the archive in a channel's ``repodata.json`` file
+		(see :meth:`~.get_repodata_record`) to a JSON file next to the archive,
+		so the archive does not have to be read again to index the channel.
+
+		This must be called after the archive has been closed.
+
+		:param index: The content of the package's ``info/index.json`` file.
+
+		:returns: The path to the JSON file, i.e. :file:`{<filename>}.json`.
+
+		.. versionadded:: 0.4.0
+		"""  # noqa: D400
+
+		record_file = self.filename.with_name(f"{self.filename.name}.json")
+		record_file.dump_json(self.get_repodata_record(index), indent=2)
+		return record_file
+
+	def get_paths_json(self) -> str:
+		"""
+		Returns the contents of the ``info/paths.json`` file for the package contents written so far.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		return json.dumps({"paths": self.paths, "paths_version": 1}, indent=2)
+
+	@abstractmethod
+	def _addfile(self, tarinfo: tarfile.TarInfo, fileobj: Optional[IO[bytes]] = None) -> None:
+		raise NotImplementedError
+
+	def _zipinfo(self, name: str) -> zipfile.ZipInfo:
+		"""
+		Returns a :class:`zipfile.ZipInfo` for a member of a zip-based archive,
+		with the modification time given by :attr:`~.source_date_epoch`, if set.
+
+		:param name: The name of the member.
+		"""  # noqa: D400
+
+		if self.source_date_epoch is None:
+			date_time = time.localtime(time.time())[:6]
+		else:
+			# Zip files can't represent dates before 1980.
+			date_time = time.gmtime(max(self.source_date_epoch, 315532800))[:6]
+
+		zip_info = zipfile.ZipInfo(name, date_time=date_time)
+		zip_info.external_attr = 0o644 << 16
+		return zip_info
+
+	def add(self, name: PathLike, arcname: str, stat_result: Optional[os.stat_result] = None) -> None:
+		"""
+		Add the file ``name`` to the archive.
+
+		:param name: The file on disk.
+		:param arcname: The name of the member in the archive.
+		:param stat_result: The result of :func:`os.lstat` for the file,
+			if already known (e.g. from :func:`~.scan_files`). The file is not statted again.
+
+		.. versionchanged:: 0.4.0  Added the ``stat_result`` argument.
+		"""
+
+		if stat_result is None:
+			stat_result = os.lstat(name)
+
+		# The user and group names are discarded for reproducible archives, so don't look them up.
+		lookup_names = self.source_date_epoch is None
+		tarinfo = _tarinfo_from_stat(os.fspath(name), arcname, stat_result, lookup_names=lookup_names)
+
+		if tarinfo.isreg():
+			# The file is read in large chunks, so it doesn't need buffering.
+			with open(name, "rb", buffering=0) as fp:
+				self.addfile(tarinfo, fp)
+		else:
+			self.addfile(tarinfo)
+
+	def add_many(
+			self,
+			files: Iterable[Tuple[PathLike, str, Optional[os.stat_result]]],
+			max_buffer: int = PIPELINE_BUFFER_SIZE,
+			) -> None:
+		"""
+		Add several files to the archive, reading them on a separate thread while they are compressed.
+
+		The archive is identical to one created by calling :meth:`~.add` for each file in turn,
+		but the disk is read while the compressor runs, which hides the latency of slow (e.g. network) filesystems.
+
+		:param files: The files to add, as tuples of the file on disk, the name of the member in the archive,
+			and the result of :func:`os.lstat` for the file (or :py:obj:`None`), as for :meth:`~.add`.
+			The iterable is consumed on the reading thread.
+		:param max_buffer: The maximum amount of file data, in bytes, read ahead of the compressor.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		# The user and group names are discarded for reproducible archives, so don't look them up.
+		lookup_names = self.source_date_epoch is None
+
+		with _PipelineReader(files, max_buffer, lookup_names) as reader:
+			for tarinfo in reader:
+				if tarinfo.isreg():
+					self.addfile(tarinfo, reader)  # type: ignore[arg-type]
+				else:
+					self.addfile(tarinfo)
+
+	def add_bytes(self, arcname: str, data: bytes) -> None:
+		"""
+		Add a member to the archive with the given contents.
+
+		:param arcname: The name of the member in the archive.
+		:param data:
+		"""
+
+		tarinfo = tarfile.TarInfo(arcname)
+		tarinfo.size = len(data)
+		tarinfo.mode = 0o644
+		self.addfile(tarinfo, io.BytesIO(data))
+
+	def close(self) -> None:
+		"""
+		Finish writing the archive.
+		"""
+
+		self._close()
+		self._output.close()
+
+	@abstractmethod
+	def _close(self) -> None:
+		raise NotImplementedError
+
+	def __enter__(self: _W) -> _W:
+		return self
+
+	def __exit__(
+			self,
+			exc_type: Optional[Type[BaseException]],
+			exc_val: Optional[BaseException],
+			exc_tb: Optional[TracebackType],
+			) -> None:
+		self.close()
+
+
+class FileEntry(NamedTuple):
+	"""
+	A file found by :func:`~.scan_files`.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	#: The path to the file.
+	path: str
+
+	#: The path to the file relative to the directory which was scanned, with forward slashes.
+	relative_path: str
+
+	#: The result of :func:`os.lstat` for the file.
+	stat: os.stat_result
+
+
+def scan_files(directory: PathLike) -> List[FileEntry]:
+	"""
+	Returns the files in ``directory`` and its subdirectories, in the same order as ``sorted(directory.rglob('*'))``.
+
+	The directory tree is walked with :func:`os.scandir`, which for most entries tells whether it is
+	a file or a directory without an extra system call, and each file is only statted once.
+	Pass the stat results to :meth:`CondaArchiveWriter.add() <.CondaArchiveWriter.add>`
+	so the files aren't statted again when they are added to an archive.
+
+	Symbolic links to files are included, but symbolic links to directories aren't followed.
+
+	:param directory:
+
+	.. versionadded:: 0.4.0
+	"""
+
+	entries = []
+	to_scan = [(os.fspath(directory), '')]
+
+	while to_scan:
+		path, prefix = to_scan.pop()
+
+		with os.scandir(path) as it:
+			for entry in it:
+				relative_path = f"{prefix}{entry.name}"
+
+				if entry.is_dir(follow_symlinks=False):
+					to_scan.append((entry.path, f"{relative_path}/"))
+				elif entry.is_file():
+					entries.append(FileEntry(entry.path, relative_path, entry.stat(follow_symlinks=False)))
+
+	# Sort by path components, as pathlib does.
+	entries.sort(key=lambda e: e.relative_path.split('/'))
+	return entries
+
+
+@lru_cache()
+def _get_uname(uid: int) -> str:
+	try:
+		# stdlib
+		import pwd
+
+		return pwd.getpwuid(uid)[0]
+	except (ImportError, KeyError):
+		return ''
+
+
+@lru_cache()
+def _get_gname(gid: int) -> str:
+	try:
+		# stdlib
+		import grp
+
+		return grp.getgrgid(gid)[0]
+	except (ImportError, KeyError):
+		return ''
+
+
+def _tarinfo_from_stat(
+		name: str,
+		arcname: str,
+		stat_result: os.stat_result,
+		lookup_names: bool = True,
+		) -> tarfile.TarInfo:
+	# Equivalent to TarFile.gettarinfo(), but from an existing stat result
+	# and with the user and group names cached (or left empty if lookup_names is False).
+
+	tarinfo = tarfile.TarInfo(arcname)
+	tarinfo.mode = stat.S_IMODE(stat_result.st_mode)
+	tarinfo.uid = stat_result.st_uid
+	tarinfo.gid = stat_result.st_gid
+	tarinfo.mtime = int(stat_result.st_mtime)
+
+	if lookup_names:
+		tarinfo.uname = _get_uname(stat_result.st_uid)
+		tarinfo.gname = _get_gname(stat_result.st_gid)
+
+	if stat.S_ISREG(stat_result.st_mode):
+		tarinfo.type = tarfile.REGTYPE
+		tarinfo.size = stat_result.st_size
+	elif stat.S_ISDIR(stat_result.st_mode):
+		tarinfo.type = tarfile.DIRTYPE
+	elif stat.S_ISLNK(stat_result.st_mode):
+		tarinfo.type = tarfile.SYMTYPE
+		tarinfo.linkname = os.readlink(name)
+	else:  # pragma: no cover
+		raise ValueError(f"Unsupported file type for {name!r}")
+
+	return tarinfo
+
+
+class _MemberQueue:
+	"""
+	Passes the headers and data of archive members from one thread to another,
+	holding at most ``max_buffer`` bytes of data at a time.
+
+	The producer puts the header of each member, followed by the body of each regular file in chunks,
+	and then calls :meth:`~.finish`, or :meth:`~.fail` with an exception to raise in the consumer.
+
+	Iterating over the queue yields the header of each member in turn.
+	The body of each regular file must then be read from the queue before the next header is requested.
+
+	:param max_buffer:
+	"""  # noqa: D400
+
+	_DONE = object()
+
+	def __init__(self, max_buffer: int):
+		self._max_buffer = max_buffer
+
+		self._condition = threading.Condition()
+		self._items: Deque[Tuple[Any, int]] = deque()
+		self._buffered = 0
+		self._stopped = False
+
+		# The unread part of the current file's body.
+		self._pending = b''
+		self._remaining = 0
+
+	def put(self, item: Any, size: int) -> bool:
+		"""
+		Add a header or a chunk of data to the queue, waiting until there is room.
+
+		:param item:
+		:param size: The amount of data in ``item``, in bytes.
+
+		:returns: :py:obj:`False` if the consumer has stopped.
+		"""
+
+		with self._condition:
+			# Always allow one item, even if it is larger than the buffer.
+			while not self._stopped and self._buffered and self._buffered + size > self._max_buffer:
+				self._condition.wait()
+
+			if self._stopped:
+				return False
+
+			self._items.append((item, size))
+			self._buffered += size
+			self._condition.notify_all()
+			return True
+
+	def finish(self) -> None:
+		"""
+		Signal to the consumer that there are no more members.
+		"""
+
+		self.put(self._DONE, 0)
+
+	def fail(self, exception: BaseException) -> None:
+		"""
+		Raise the given exception in the consumer once it has read the preceding members.
+
+		:param exception:
+		"""
+
+		self.put(exception, 0)
+
+	def stop(self) -> None:
+		"""
+		Stop the consumer reading any more members, and discard those already queued.
+		"""
+
+		with self._condition:
+			self._stopped = True
+			self._items.clear()
+			self._condition.notify_all()
+
+	def _get(self) -> Any:
+		with self._condition:
+			while not self._items and not self._stopped:
+				self._condition.wait()
+
+			if not self._items:
+				raise EOFError("The queue was stopped")
+
+			item, size = self._items.popleft()
+			self._buffered -= size
+			self._condition.notify_all()
+
+		if isinstance(item, BaseException):
+			raise item
+
+		return item
+
+	def __iter__(self) -> Iterator[tarfile.TarInfo]:
+		while True:
+			item = self._get()
+			if item is self._DONE:
+				return
+
+			self._pending = b''
+			self._remaining = item.size if item.isreg() else 0
+			yield item
+
+	def read(self, size: int = -1) -> bytes:
+		"""
+		Read up to ``size`` bytes of the body of the current file.
+
+		:param size:
+		"""
+
+		if size < 0 or size > self._remaining:
+			size = self._remaining
+
+		parts = [self._pending] if self._pending else []
+		available = len(self._pending)
+
+		while available < size:
+			chunk = self._get()
+			parts.append(chunk)
+			available += len(chunk)
+
+		data = parts[0] if len(parts) == 1 else b''.join(parts)
+		self._pending = data[size:]
+		self._remaining -= size
+		return data[:size]
+
+
+def _put_body(queues: Iterable[_MemberQueue], fileobj: IO[bytes], size: int) -> bool:
+	# Read size bytes from fileobj in chunks and put them on each of the queues.
+	# Returns False if any of the consumers has stopped.
+
+	remaining = size
+	while remaining:
+		chunk = fileobj.read(min(remaining, _COPY_BUFSIZE))
+		if not chunk:
+			# As raised by tarfile when the file is shorter than its header says.
+			raise OSError("unexpected end of data")
+
+		remaining -= len(chunk)
+		for queue in queues:
+			if not queue.put(chunk, len(chunk)):
+				return False
+
+	return True
+
+
+class _PipelineReader(_MemberQueue):
+	"""
+	Reads files on a background thread, passing their headers and data to the consumer
+	through a queue which holds at most ``max_buffer`` bytes.
+
+	Exceptions raised while reading the files are raised in the consumer.
+
+	:param files: Tuples of the file on disk, the name of the member in the archive,
+		and the result of :func:`os.lstat` for the file (or :py:obj:`None`).
+	:param max_buffer:
+	:param lookup_names: Whether to look up the names of the owner and group of each file.
+	"""  # noqa: D400
+
+	def __init__(
+			self,
+			files: Iterable[Tuple[PathLike, str, Optional[os.stat_result]]],
+			max_buffer: int,
+			lookup_names: bool,
+			):
+		super().__init__(max_buffer)
+
+		self._files = files
+		self._lookup_names = lookup_names
+
+		self._thread = threading.Thread(target=self._run, name="whey-conda-reader", daemon=True)
+		self._thread.start()
+
+	def _run(self) -> None:
+		try:
+			for name, arcname, stat_result in self._files:
+				if stat_result is None:
+					stat_result = os.lstat(name)
+
+				tarinfo = _tarinfo_from_stat(os.fspath(name), arcname, stat_result, self._lookup_names)
+				if not self.put(tarinfo, tarfile.BLOCKSIZE):
+					return
+
+				if tarinfo.isreg():
+					with open(name, "rb", buffering=0) as fp:
+						if not _put_body([self], fp, tarinfo.size):
+							return
+
+		except BaseException as e:  # pylint: disable=broad-except
+			self.fail(e)
+		else:
+			self.finish()
+
+	def close(self) -> None:
+		"""
+		Stop the reading thread and wait for it to exit.
+		"""
+
+		self.stop()
+		self._thread.join()
+
+	def __enter__(self) -> "_PipelineReader":
+		return self
+
+	def __exit__(
+			self,
+			exc_type: Optional[Type[BaseException]],
+			exc_val: Optional[BaseException],
+			exc_tb: Optional[TracebackType],
+			) -> None:
+		self.close()
+
+
+class FanOutWriter:
+	"""
+	Writes the same members to several archives at once.
+
+	The data of each member is read once, and passed to a separate thread for each archive,
+	so the archives are compressed in parallel.
+	Writing several archives therefore takes little longer than writing the slowest of them.
+
+	On leaving the context manager (or calling :meth:`~.join`) the threads finish writing the members,
+	but the archives are left open so that members which differ between them (e.g. ``info/index.json``)
+	can be added to each before it is closed.
+
+	:param writers: The archives to write to.
+	:param max_buffer: The maximum amount of data, in bytes, waiting to be written to each archive.
+
+	.. versionadded:: 0.4.0
+	"""  # noqa: D400
+
+	def __init__(self, writers: Sequence[CondaArchiveWriter], max_buffer: int = PIPELINE_BUFFER_SIZE):
+
+		#: The archives to write to.
+		self.writers: List[CondaArchiveWriter] = list(writers)
+
+		self._queues = [_MemberQueue(max_buffer) for _ in self.writers]
+		self._errors: List[Optional[BaseException]] = [None] * len(self.writers)
+		self._threads = [
+				threading.Thread(target=self._run, args=(idx, ), name=f"whey-conda-writer-{idx}", daemon=True)
+				for idx in range(len(self.writers))
+				]
+		self._finished = False
+
+		for thread in self._threads:
+			thread.start()
+
+	def _run(self, idx: int) -> None:
+		writer, queue = self.writers[idx], self._queues[idx]
+
+		try:
+			for tarinfo in queue:
+				if tarinfo.isreg():
+					writer.addfile(tarinfo, queue)  # type: ignore[arg-type]
+				else:
+					writer.addfile(tarinfo)
+		except BaseException as e:  # pylint: disable=broad-except
+			self._errors[idx] = e
+			# Don't leave the producer waiting for room in the queue.
+			queue.stop()
+
+	def _raise_error(self) -> None:
+		for error in self._errors:
+			if error is not None:
+				raise error
+
+	def addfile(self, tarinfo: tarfile.TarInfo, fileobj: Optional[IO[bytes]] = None) -> None:
+		"""
+		Add a member to each of the archives.
+
+		:param tarinfo: The header for the member.
+		:param fileobj: A binary file object from which :attr:`tarinfo.size <tarfile.TarInfo.size>` bytes are read.
+			Required for regular files.
+		"""
+
+		for queue in self._queues:
+			# Each archive may normalise the header.
+			if not queue.put(copy.copy(tarinfo), tarfile.BLOCKSIZE):
+				self._raise_error()
+
+		if tarinfo.isreg() and tarinfo.size:
+			if fileobj is None:
+				raise ValueError(f"No data given for {tarinfo.name!r}")
+
+			if not _put_body(self._queues, fileobj, tarinfo.size):
+				self._raise_error()
+
+	def add_bytes(self, arcname: str, data: bytes) -> None:
+		"""
+		Add a member to each of the archives with the given contents.
+
+		:param arcname: The name of the member in the archive.
+		:param data:
+		"""
+
+		tarinfo = tarfile.TarInfo(arcname)
+		tarinfo.size = len(data)
+		tarinfo.mode = 0o644
+		self.addfile(tarinfo, io.BytesIO(data))
+
+	def join(self) -> None:
+		"""
+		Wait for every member to be written to each of the archives.
+
+		If writing to any of the archives failed the exception is raised here.
+		"""
+
+		if not self._finished:
+			self._finished = True
+
+			for queue in self._queues:
+				queue.finish()
+
+			for thread in self._threads:
+				thread.join()
+
+		self._raise_error()
+
+	def __enter__(self) -> "FanOutWriter":
+		return self
+
+	def __exit__(
+			self,
+			exc_type: Optional[Type[BaseException]],
+			exc_val: Optional[BaseException],
+			exc_tb: Optional[TracebackType],
+			) -> None:
+		if exc_val is None:
+			self.join()
+			return
+
+		# Abandon the archives, and let the original exception propagate.
+		if not self._finished:
+			self._finished = True
+
+			for queue in self._queues:
+				queue.stop()
+
+			for thread in self._threads:
+				thread.join()
+
+
+class _HashingReader:
+	"""
+	Wraps a binary file object, computing the SHA256 hash and size of the data as it is read.
+
+	:param fileobj:
+	"""
+
+	def __init__(self, fileobj: IO[bytes]):
+		self._fileobj = fileobj
+		self.sha256 = hashlib.sha256()
+		self.size = 0
+
+	def read(self, size: int = -1) -> bytes:
+		data = self._fileobj.read(size)
+		self.sha256.update(data)
+		self.size += len(data)
+		return data
+
+
+class _HashingWriter(io.RawIOBase):
+	"""
+	Writable binary stream which computes the MD5 and SHA256 hashes and the size of the data
+	as it is written to ``fileobj``.
+
+	The stream is not seekable, so the data is only ever written once, in order.
+
+	:param fileobj: The binary file object to write the data to. It is closed when the stream is closed.
+	"""  # noqa: D400
+
+	def __init__(self, fileobj: IO[bytes]):
+		super().__init__()
+
+		self._fileobj = fileobj
+		self.md5 = hashlib.md5()
+		self.sha256 = hashlib.sha256()
+		self.size = 0
+
+	def writable(self) -> bool:  # noqa: D102
+		return True
+
+	def write(self, data: bytes) -> int:  # type: ignore[override]  # noqa: D102
+		self._fileobj.write(data)
+		self.md5.update(data)
+		self.sha256.update(data)
+		self.size += len(data)
+		return len(data)
+
+	def close(self) -> None:  # noqa: D102
+		if not self.closed:
+			self._fileobj.close()
+			super().close()
+
+
+class ParallelBZ2Writer(io.RawIOBase):
+	"""
+	Writable binary stream which compresses data with bzip2 using a pool of threads.
+
+	In the same manner as ``pbzip2``, the data is split into blocks of ``compresslevel * 100 kB``,
+	each of which is compressed as an independent bzip2 stream.
+	The streams are written to ``fileobj`` in order, producing a multi-stream bzip2 file
+	which can be read by any bzip2 decompressor (including :mod:`bz2` and ``conda``).
+
+	:param fileobj: The binary file object to write the compressed data to.
+	:param compresslevel: The bzip2 compression level, between 1 and 9.
+	:param threads: The number of threads to compress with. Defaults to the number of CPUs.
+	"""
+
+	def __init__(self, fileobj: IO[bytes], compresslevel: int = 9, threads: Optional[int] = None):
+		# stdlib
+		from concurrent.futures import ThreadPoolExecutor
+
+		super().__init__()
+
+		self._fileobj = fileobj
+		self._compresslevel = compresslevel
+		self._block_size = compresslevel * 100_000
+		self._threads = threads or os.cpu_count() or 1
+		self._buffer = bytearray()
+		self._pending: Deque["Future[bytes]"] = deque()
+		self._executor = ThreadPoolExecutor(max_workers=self._threads)
+		self._written_any = False
+
+	def writable(self) -> bool:  # noqa: D102
+		return True
+
+	def write(self, data: bytes) -> int:  # type: ignore[override]  # noqa: D102
+		if self.closed:
+			raise ValueError("write to closed file")
+
+		self._buffer += data
+
+		while len(self._buffer) >= self._block_size:
+			self._submit(bytes(self._buffer[:self._block_size]))
+			del self._buffer[:self._block_size]
+
+		return len(data)
+
+	def _submit(self, block: bytes) -> None:
+		# Limit the number of blocks held in memory.
+		while len(self._pending) >= self._threads * 2:
+			self._write_next()
+
+		self._pending.append(self._executor.submit(bz2.compress, block, self._compresslevel))
+		self._written_any = True
+
+	def _write_next(self) -> None:
+		self._fileobj.write(self._pending.popleft().result())
+
+	def close(self) -> None:
+		"""
+		Compress any remaining data and wait for all blocks to be written.
+
+		The underlying file object is not closed.
+		"""
+
+		if self.closed:
+			return
+
+		try:
+			if self._buffer or not self._written_any:
+				self._submit(bytes(self._buffer))
+				self._buffer.clear()
+
+			while self._pending:
+				self._write_next()
+
+		finally:
+			self._executor.shutdown()
+			super().close()
+
+
+class TarBz2ArchiveWriter(CondaArchiveWriter):
+	"""
+	Writer for the legacy ``.tar.bz2`` conda package format.
+
+	:param filename: The filename of the archive to create.
+	:param threads: The number of threads to compress with.
+		If greater than ``1`` the archive is compressed in parallel by :class:`~.ParallelBZ2Writer`.
+	:param source_date_epoch: If given, the archive is made reproducible.
+	:param level: The bzip2 compression level, between 1 and 9.
+
+	.. versionchanged:: 0.4.0  Added the ``threads``, ``source_date_epoch`` and ``level`` arguments.
+	"""
+
+	extension = ".tar.bz2"
+	compression_levels = range(1, 10)
+	default_level = 9
+
+	def __init__(
+			self,
+			filename: PathLike,
+			threads: int = 1,
+			source_date_epoch: Optional[int] = None,
+			level: Optional[int] = None,
+			):
+		super().__init__(filename, threads=threads, source_date_epoch=source_date_epoch, level=level)
+
+		if self.threads > 1:
+			output: IO[bytes] = self._output  # type: ignore[assignment]
+			self._compressor: Optional[ParallelBZ2Writer] = ParallelBZ2Writer(
+					output,
+					compresslevel=self.level,
+					threads=self.threads,
+					)
+			self._tar = tarfile.open(fileobj=self._compressor, mode="w|")
+		else:
+			self._compressor = None
+			self._tar = handy_archives.TarFile.open(fileobj=self._output, mode="w:bz2", compresslevel=self.level)
+
+		self._tar.copybufsize = _COPY_BUFSIZE  # type: ignore[attr-defined]
+
+	def _addfile(self, tarinfo: tarfile.TarInfo, fileobj: Optional[IO[bytes]] = None) -> None:
+		self._tar.addfile(tarinfo, fileobj)
+
+	def _close(self) -> None:
+		self._tar.close()
+
+		if self._compressor is not None:
+			self._compressor.close()
+
+
+class CondaV2ArchiveWriter(CondaArchiveWriter):
+	"""
+	Writer for the ``.conda`` (v2) conda package format.
+
+	The archive is an uncompressed zip file containing ``metadata.json``,
+	and the package contents and metadata as two separate zstandard-compressed tarballs.
+
+	.. seealso:: https://docs.conda.io/projects/conda/en/latest/user-guide/concepts/packages.html#conda-file-format
+
+	The package contents are streamed straight into the zip file,
+	while the (small) package metadata is buffered in memory until the archive is closed.
+
+	:param filename: The filename of the archive to create.
+	:param threads: The number of threads to compress with.
+	:param source_date_epoch: If given, the archive is made reproducible.
+	:param level: The zstandard compression level, between 1 and 22.
+	"""
+
+	extension = ".conda"
+	compression_levels = range(1, 23)
+	default_level = 19
+
+	def __init__(
+			self,
+			filename: PathLike,
+			threads: int = 1,
+			source_date_epoch: Optional[int] = None,
+			level: Optional[int] = None,
+			):
+		try:
+			# 3rd party
+			import zstandard
+		except ImportError:  # pragma: no cover
+			raise ImportError(
+					"The 'zstandard' package is required to create '.conda' packages. "
+					"Install it with 'pip install whey-conda[conda]'.",
+					) from None
+
+		super().__init__(filename, threads=threads, source_date_epoch=source_date_epoch, level=level)
+
+		# zstandard uses the calling thread when threads is 0, and additional worker threads if greater than 1.
+		self._compressor = zstandard.ZstdCompressor(
+				level=self.level,
+				threads=self.threads if self.threads > 1 else 0,
+				)
+		# The output stream isn't seekable, so the sizes and CRCs of the members follow their data.
+		self._zip = zipfile.ZipFile(self._output, mode='w', compression=zipfile.ZIP_STORED)
+		self._zip.writestr(self._zipinfo("metadata.json"), json.dumps({"conda_pkg_format_version": 2}))
+
+		self._pkg_entry = self._zip.open(self._zipinfo(f"pkg-{self.stem}.tar.zst"), mode='w', force_zip64=True)
+		self._pkg_stream = self._compressor.stream_writer(self._pkg_entry, closefd=False)
+		self._pkg_tar = tarfile.open(fileobj=self._pkg_stream, mode="w|")
+		self._pkg_tar.copybufsize = _COPY_BUFSIZE  # type: ignore[attr-defined]
+
+		self._info_buffer = io.BytesIO()
+		self._info_tar = tarfile.open(fileobj=self._info_buffer, mode="w|")
+
+	def _addfile(self, tarinfo: tarfile.TarInfo, fileobj: Optional[IO[bytes]] = None) -> None:
+		if tarinfo.name.startswith("info/"):
+			self._info_tar.addfile(tarinfo, fileobj)
+		else:
+			self._pkg_tar.addfile(tarinfo, fileobj)
+
+	def _close(self) -> None:
+		self._pkg_tar.close()
+		self._pkg_stream.close()
+		self._pkg_entry.close()
+
+		self._info_tar.close()
+		info_data = self._compressor.compress(self._info_buffer.getvalue())
+		self._zip.writestr(self._zipinfo(f"info-{self.stem}.tar.zst"), info_data)
+
+		self._zip.close()
+
+
+archive_formats: Dict[str, Type[CondaArchiveWriter]] = {
+		"tar.bz2": TarBz2ArchiveWriter,
+		"conda": CondaV2ArchiveWriter,
+		}
+"""
+Mapping of package format names (as used in the :conf:`package-format` option)
+to the classes which write them.
+"""
+
+
+def get_archive_writer(package_format: str) -> Type[CondaArchiveWriter]:
+	"""
+	Returns the writer class for the given package format.
+
+	:param package_format: The package format, e.g. ``'tar.bz2'`` or ``'conda'``.
+
+	:raises ValueError: If the format is unknown.
+	"""
+
+	try:
+		return archive_formats[package_format]
+	except KeyError:
+		raise ValueError(f"Unknown package format {package_format!r}") from None
+
+
+def get_source_date_epoch() -> Optional[int]:
+	"""
+	Returns the value of the :envvar:`SOURCE_DATE_EPOCH` environment variable, or :py:obj:`None` if unset.
+
+	See https://reproducible-builds.org/specs/source-date-epoch/ for the specification.
+
+	:raises ValueError: if the value is in an invalid format.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	epoch = os.environ.get("SOURCE_DATE_EPOCH")
+
+	if epoch is None:
+		return None
+	elif epoch.isdigit():
+		return int(epoch)
+	else:
+		raise ValueError(f"'SOURCE_DATE_EPOCH' must be an integer with no fractional component, not {epoch!r}")
+
+
+def _get_timestamp() -> int:
+	# The timestamp for index.json, in milliseconds, honouring SOURCE_DATE_EPOCH.
+
+	source_date_epoch = get_source_date_epoch()
+
+	if source_date_epoch is None:
+		return int(datetime.datetime.now().timestamp() * 1000)
+	else:
+		return source_date_epoch * 1000
+
+
+def _clean(string: str) -> bytes:
+	# Matches the output of PathPlus.write_clean
+	buf = io.StringIO()
+	clean_writer(string, buf)
+	return buf.getvalue().encode("UTF-8")
+
+
+def _get_about_urls(urls: Mapping[str, str]) -> Dict[str, str]:
+	# Returns the "home", "dev_url" and "doc_url" entries for about.json from a mapping of URL categories to URLs.
+
+	about = {}
+
+	# pylint: disable=loop-invariant-statement
+	for category, url in urls.items():
+		if category.lower() in {"homepage", "home page"}:
+			about["home"] = url
+			about["dev_url"] = url
+		elif category.lower().startswith("source"):
+			about["dev_url"] = url
+		elif category.lower() in {"docs", "documentation"}:
+			about["doc_url"] = url
+	# pylint: enable=loop-invariant-statement
+
+	return about
+
+
+def _pin_numpy(requirements: Iterable["ComparableRequirement"]) -> List["ComparableRequirement"]:
+	# Returns the requirements for index.json, with any numpy requirement replaced by "numpy>=1.19.0".
+
+	# 3rd party
+	from shippinglabel.requirements import ComparableRequirement
+
+	requirements = list(requirements)
+	requirements_entries = [req for req in requirements if req and req != "numpy"]
+
+	if [v.specifier for v in requirements if v == "numpy"]:
+		requirements_entries.append(ComparableRequirement("numpy>=1.19.0"))
+
+	return requirements_entries
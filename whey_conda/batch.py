@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+#
+#  batch.py
+"""
+Build conda packages for many projects in one go.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+__all__ = ("BuildResult", "build_many", "build_project")
+
+
+class BuildResult(NamedTuple):
+	"""
+	The result of building a conda package for a single project with :func:`~.build_many`.
+	"""
+
+	#: The project directory.
+	project_dir: str
+
+	#: Whether the package was built successfully.
+	success: bool
+
+	#: The absolute path to the conda package, or :py:obj:`None` if the build failed.
+	archive: Optional[str]
+
+	#: The time taken to build the package, in seconds.
+	duration: float
+
+	#: A description of the error which caused the build to fail, or :py:obj:`None` if it succeeded.
+	error: Optional[str] = None
+
+	#: The time taken by each phase of the build, as returned by :meth:`.BuildTimings.to_dict`.
+	#: :py:obj:`None` if the build failed before any phases were timed.
+	timings: Optional[Dict[str, Any]] = None
+
+
+def build_project(
+		project_dir: PathLike,
+		out_dir: Optional[PathLike] = None,
+		*,
+		verbose: bool = False,
+		force: bool = False,
+		offline: Optional[bool] = None,
+		update_index: bool = False,
+		timings_file: Optional[PathLike] = None,
+		) -> BuildResult:
+	"""
+	Build a conda package for the given project, and return the result rather than raising an exception on error.
+
+	:param project_dir: The project to build the package for.
+	:param out_dir: The output directory.
+	:default out_dir: :file:`{<project_dir>}/dist`
+	:param verbose: Enable verbose output.
+	:param force: Build the package even if it is up to date.
+	:param offline: Only use cached conda channel lookups.
+		Defaults to the value of the :envvar:`WHEY_CONDA_OFFLINE` environment variable.
+	:param update_index: Add the package to the ``repodata.json`` file in the output directory,
+		which should be the :file:`noarch` subdirectory of a local conda channel.
+	:param timings_file: A file to write the time taken by each phase of the build to, as JSON.
+	"""
+
+	# 3rd party
+	from whey.foreman import Foreman
+
+	# this package
+	from whey_conda import CondaBuilder
+	from whey_conda.channels import ChannelCache
+
+	project_dir = PathPlus(project_dir).abspath()
+	start_time = time.perf_counter()
+	builder: Optional[CondaBuilder] = None
+
+	try:
+		foreman = Foreman(project_dir=project_dir)
+
+		builder = CondaBuilder(
+				project_dir=foreman.project_dir,
+				config=foreman.config,
+				out_dir=out_dir,
+				verbose=verbose,
+				colour=False,
+				channel_cache=ChannelCache.from_environment(offline=offline),
+				force=force,
+				update_index=update_index,
+				timings_file=timings_file,
+				)
+		archive = builder.out_dir / builder.build_conda()
+
+	except Exception as e:
+		return BuildResult(
+				project_dir=project_dir.as_posix(),
+				success=False,
+				archive=None,
+				duration=time.perf_counter() - start_time,
+				error=f"{type(e).__name__}: {e}",
+				timings=builder.timings.to_dict() if builder is not None else None,
+				)
+
+	return BuildResult(
+			project_dir=project_dir.as_posix(),
+			success=True,
+			archive=archive.abspath().as_posix(),
+			duration=time.perf_counter() - start_time,
+			timings=builder.timings.to_dict(),
+			)
+
+
+def _build_project(project_dir: PathLike, timings_file: Optional[PathLike], **kwargs) -> BuildResult:
+	return build_project(project_dir, timings_file=timings_file, **kwargs)
+
+
+def _timings_filename(project_dir: PathLike) -> str:
+	# Projects in different parent directories may share a name, so include a hash of the full path.
+	project_dir = PathPlus(project_dir).abspath()
+	digest = hashlib.sha256(project_dir.as_posix().encode("UTF-8")).hexdigest()[:8]
+	return f"{project_dir.name}-{digest}.json"
+
+
+def build_many(
+		projects: Iterable[PathLike],
+		out_dir: Optional[PathLike] = None,
+		*,
+		jobs: Optional[int] = None,
+		verbose: bool = False,
+		force: bool = False,
+		offline: Optional[bool] = None,
+		update_index: bool = False,
+		timings_dir: Optional[PathLike] = None,
+		) -> List[BuildResult]:
+	"""
+	Build conda packages for many projects on a pool of worker processes.
+
+	Each worker process builds several projects, so the imports and
+	the channel listings held in memory are shared between those projects.
+	Channel lookups are also shared between all workers through the on-disk :class:`~.ChannelCache`.
+
+	A failure to build one project does not stop the other projects from being built.
+
+	:param projects: The projects to build packages for.
+	:param out_dir: The output directory.
+	:default out_dir: :file:`{<project_dir>}/dist` for each project.
+	:param jobs: The number of projects to build at once. Defaults to the number of CPUs.
+	:param verbose: Enable verbose output.
+	:param force: Build the packages even if they are up to date.
+	:param offline: Only use cached conda channel lookups.
+		Defaults to the value of the :envvar:`WHEY_CONDA_OFFLINE` environment variable.
+	:param update_index: Add the packages to the ``repodata.json`` file in the output directory,
+		which should be the :file:`noarch` subdirectory of a local conda channel.
+		Concurrent builds into the same output directory merge their entries safely.
+	:param timings_dir: A directory to write the time taken by each phase of each build to,
+		as :file:`{<project_dir name>}-{<hash>}.json`, where ``hash`` is derived from the absolute path to the project.
+
+	:returns: The result for each project, in the same order as ``projects``.
+	"""
+
+	projects = list(projects)
+	worker = partial(
+			_build_project,
+			out_dir=out_dir,
+			verbose=verbose,
+			force=force,
+			offline=offline,
+			update_index=update_index,
+			)
+
+	if timings_dir is None:
+		timings_files: List[Optional[PathPlus]] = [None] * len(projects)
+	else:
+		timings_files = [PathPlus(timings_dir).abspath() / _timings_filename(p) for p in projects]
+
+	if jobs is None:
+		jobs = os.cpu_count() or 1
+
+	jobs = max(1, min(jobs, len(projects)))
+
+	if jobs == 1:
+		return list(map(worker, projects, timings_files))
+
+	with ProcessPoolExecutor(max_workers=jobs) as executor:
+		return list(executor.map(worker, projects, timings_files))
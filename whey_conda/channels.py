@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+#
+#  channels.py
+"""
+Validation of requirements against conda channels, with a persistent on-disk cache.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import json
+import os
+import time
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote, urlparse
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.stringlist import DelimitedList
+from domdf_python_tools.typing import PathLike
+from packaging.requirements import InvalidRequirement
+from shippinglabel import normalize
+from shippinglabel.requirements import ComparableRequirement
+
+if False:  # TYPE_CHECKING:  # pylint: disable=using-constant-test
+	# 3rd party
+	import requests
+
+__all__ = (
+		"CacheMissError",
+		"ChannelCache",
+		"ChannelIndex",
+		"channel_url",
+		"clear_channel_listings",
+		"fetch_channel_listing",
+		"get_channel_packages",
+		"is_local_channel",
+		"local_channel_path",
+		"lookup_package",
+		"make_session",
+		"prefetch_channels",
+		"resolve_channel",
+		"validate_requirements",
+		)
+
+#: The base URL of the conda API, used for channels given by name.
+CONDA_API_URL: str = "https://conda.anaconda.org"
+
+#: The subdirectories of each channel which are searched for packages.
+CHANNEL_SUBDIRS: Tuple[str, ...] = ("noarch", "linux-64")
+
+#: The maximum number of channel listings which are downloaded concurrently.
+MAX_WORKERS: int = 8
+
+#: The names of the index files which are read from local channels, in order of preference.
+REPODATA_FILENAMES: Tuple[str, ...] = ("repodata.json", "current_repodata.json")
+
+#: The default number of seconds for which cached lookups are valid.
+DEFAULT_TTL: int = 48 * 60 * 60
+
+#: The default maximum total size of the entries in the cache, in bytes.
+DEFAULT_MAX_SIZE: int = 1_000_000
+
+#: The minimum number of seconds between automatic pruning of the cache by :func:`~.validate_requirements`.
+PRUNE_INTERVAL: int = 60 * 60
+
+_channel_listings: Dict[str, "ChannelIndex"] = {}
+_local_channel_mtimes: Dict[str, Tuple[Tuple[str, int], ...]] = {}
+
+
+class CacheMissError(LookupError):
+	"""
+	Raised when a lookup is not in the cache and the cache is in offline mode.
+	"""
+
+
+class ChannelIndex(Collection[str]):
+	"""
+	In-memory index of the names of the packages in a conda channel.
+
+	:param names: The names of the packages in the channel.
+	"""
+
+	def __init__(self, names: Iterable[str]):
+		self.names = frozenset(names)
+		self._normalized: Dict[str, str] = {}
+
+		for name in sorted(self.names):
+			self._normalized.setdefault(normalize(name), name)
+
+	def __contains__(self, name: object) -> bool:
+		return name in self.names
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self.names)
+
+	def __len__(self) -> int:
+		return len(self.names)
+
+	def match(self, name: str) -> Optional[str]:
+		"""
+		Returns the name of the package ``name`` in the channel, or :py:obj:`None` if it isn't in the channel.
+
+		The name in the channel may differ from ``name`` in its normalization (e.g. ``ruamel.yaml`` vs ``ruamel-yaml``).
+
+		:param name:
+		"""
+
+		if name in self.names:
+			return name
+		else:
+			return self._normalized.get(normalize(name))
+
+
+class ChannelCache:
+	"""
+	Persistent on-disk cache of the result of looking up packages in conda channels.
+
+	Each entry is keyed by the channel name and the package name, and records the name of the
+	matching package in the channel (or that there isn't one).
+	Entries expire after ``ttl`` seconds, and once the entries total more than ``max_size`` bytes
+	the least recently used entries are evicted.
+
+	The names of all packages in each channel downloaded to resolve lookups which aren't cached
+	are also stored, with the same ``ttl``, so later processes only download them again once they expire.
+	There is one listing per channel, and they aren't counted towards ``max_size``.
+
+	:param cache_dir: The directory to store the cache in.
+		Defaults to a ``whey-conda`` directory in the user's cache directory.
+	:param ttl: The number of seconds for which cached lookups are valid.
+	:param max_size: The maximum total size of the entries in the cache, in bytes.
+	:param offline: If :py:obj:`True` only cached results are used,
+		and :exc:`~.CacheMissError` is raised if a lookup is not in the cache.
+	"""
+
+	def __init__(
+			self,
+			cache_dir: Optional[PathLike] = None,
+			ttl: int = DEFAULT_TTL,
+			max_size: int = DEFAULT_MAX_SIZE,
+			offline: bool = False,
+			):
+
+		if cache_dir is None:
+			# 3rd party
+			import platformdirs
+
+			cache_dir = PathPlus(platformdirs.user_cache_dir("whey-conda")) / "channels"
+
+		self.cache_dir = PathPlus(cache_dir)
+		self.ttl = ttl
+		self.max_size = max_size
+		self.offline = offline
+		self._new_entries = 0
+
+	@classmethod
+	def from_environment(cls, offline: Optional[bool] = None) -> "ChannelCache":
+		"""
+		Construct a :class:`~.ChannelCache` configured from environment variables.
+
+		* :envvar:`WHEY_CONDA_CACHE_DIR` -- the directory to store the cache in.
+		* :envvar:`WHEY_CONDA_CACHE_TTL` -- the number of seconds for which cached lookups are valid.
+		* :envvar:`WHEY_CONDA_CACHE_SIZE` -- the maximum total size of the entries in the cache, in bytes.
+		* :envvar:`WHEY_CONDA_OFFLINE` -- if set to ``1`` only cached lookups are used.
+
+		:param offline: Overrides the value of :envvar:`WHEY_CONDA_OFFLINE`.
+		"""
+
+		if offline is None:
+			offline = os.environ.get("WHEY_CONDA_OFFLINE", '0').lower() in {'1', "true", "yes"}
+
+		return cls(
+				cache_dir=os.environ.get("WHEY_CONDA_CACHE_DIR") or None,
+				ttl=int(os.environ.get("WHEY_CONDA_CACHE_TTL", DEFAULT_TTL)),
+				max_size=int(os.environ.get("WHEY_CONDA_CACHE_SIZE", DEFAULT_MAX_SIZE)),
+				offline=offline,
+				)
+
+	def _entry_file(self, channel: str, name: str) -> PathPlus:
+		return self.cache_dir / quote(channel, safe='') / f"{normalize(name)}.json"
+
+	def get(self, channel: str, name: str) -> Tuple[bool, Optional[str]]:
+		"""
+		Retrieve the result of looking up ``name`` in ``channel`` from the cache.
+
+		:param channel:
+		:param name: The name of the package.
+
+		:returns: A tuple of whether the lookup was in the cache, and the name of the package in the channel
+			(or :py:obj:`None` if the channel doesn't contain the package).
+		"""
+
+		entry_file = self._entry_file(channel, name)
+
+		try:
+			data = json.loads(entry_file.read_text())
+		except (OSError, ValueError):
+			return False, None
+
+		if data.get("name") != name or data["expires"] < time.time():
+			return False, None
+
+		# Record the access for LRU eviction.
+		os.utime(entry_file)
+
+		return True, data["match"]
+
+	def set(self, channel: str, name: str, match: Optional[str]) -> None:  # noqa: A003  # pylint: disable=redefined-builtin
+		"""
+		Store the result of looking up ``name`` in ``channel`` in the cache.
+
+		:param channel:
+		:param name: The name of the package.
+		:param match: The name of the package in the channel, or :py:obj:`None` if the channel doesn't contain it.
+		"""
+
+		entry_file = self._entry_file(channel, name)
+		entry_file.parent.maybe_make(parents=True)
+
+		tmp_file = entry_file.with_name(f"{entry_file.name}.{os.getpid()}.tmp")
+		tmp_file.dump_json({"name": name, "match": match, "expires": time.time() + self.ttl})
+		os.replace(tmp_file, entry_file)
+		self._new_entries += 1
+
+	def _listing_file(self, channel: str) -> PathPlus:
+		# Local channels (which may begin with '.') are never cached, so this can't clash with a channel.
+		return self.cache_dir / ".listings" / f"{quote(channel, safe='')}.json"
+
+	def get_listing(self, channel: str) -> Optional[List[str]]:
+		"""
+		Retrieve the names of the packages in ``channel`` from the cache.
+
+		:param channel:
+
+		:returns: The names, or :py:obj:`None` if the listing isn't in the cache or has expired.
+		"""
+
+		try:
+			data = json.loads(self._listing_file(channel).read_text())
+		except (OSError, ValueError):
+			return None
+
+		if data.get("channel") != channel or data["expires"] < time.time():
+			return None
+
+		return data["names"]
+
+	def set_listing(self, channel: str, names: Iterable[str]) -> None:
+		"""
+		Store the names of the packages in ``channel`` in the cache.
+
+		:param channel:
+		:param names:
+		"""
+
+		listing_file = self._listing_file(channel)
+		listing_file.parent.maybe_make(parents=True)
+
+		tmp_file = listing_file.with_name(f"{listing_file.name}.{os.getpid()}.tmp")
+		tmp_file.dump_json({"channel": channel, "names": sorted(names), "expires": time.time() + self.ttl})
+		os.replace(tmp_file, listing_file)
+
+	def _scan(self) -> List[Tuple[float, int, PathPlus]]:
+		# Returns the access time, size and file of each entry in the cache, from least to most recently used.
+
+		if not self.cache_dir.is_dir():
+			return []
+
+		entries = []
+
+		for entry_file in self.cache_dir.glob("*/*.json"):
+			if entry_file.parent.name == ".listings":
+				continue
+
+			try:
+				stat = entry_file.stat()
+			except FileNotFoundError:  # pragma: no cover
+				# Removed by another process
+				continue
+
+			entries.append((stat.st_mtime, stat.st_size, entry_file))
+
+		return sorted(entries)
+
+	def entries(self) -> List[PathPlus]:
+		"""
+		Returns the files of the entries in the cache, from least to most recently used.
+		"""
+
+		return [entry_file for _, _, entry_file in self._scan()]
+
+	def prune(self) -> None:
+		"""
+		Remove the least recently used entries from the cache until they total at most :attr:`~.max_size` bytes.
+		"""
+
+		entries = self._scan()
+		excess = sum(size for _, size, _ in entries) - self.max_size
+
+		for _, size, entry_file in entries:
+			if excess <= 0:
+				break
+
+			entry_file.unlink(missing_ok=True)
+			excess -= size
+
+		self._new_entries = 0
+
+		if self.cache_dir.is_dir():
+			(self.cache_dir / ".pruned").touch()
+
+	def _prune_if_due(self) -> None:
+		# Pruning reads the whole cache, so is done at most once every PRUNE_INTERVAL seconds,
+		# rather than on every build which adds an entry.
+
+		try:
+			if time.time() - (self.cache_dir / ".pruned").stat().st_mtime < PRUNE_INTERVAL:
+				return
+		except FileNotFoundError:
+			pass
+
+		self.prune()
+
+	def clear(self) -> None:
+		"""
+		Remove all entries and channel listings from the cache.
+		"""
+
+		for entry_file in self.entries():
+			entry_file.unlink(missing_ok=True)
+
+		if (self.cache_dir / ".listings").is_dir():
+			for listing_file in (self.cache_dir / ".listings").glob("*.json"):
+				listing_file.unlink(missing_ok=True)
+
+
+def is_local_channel(channel: str) -> bool:
+	"""
+	Returns whether ``channel`` is a channel on the local filesystem.
+
+	Local channels are given as ``file://`` URLs, absolute paths,
+	or paths beginning with ``.`` or ``~``.
+
+	:param channel:
+	"""
+
+	return channel.startswith(("file://", '.', '~')) or os.path.isabs(channel)
+
+
+def local_channel_path(channel: str) -> PathPlus:
+	"""
+	Returns the path to the given local channel.
+
+	:param channel: A ``file://`` URL or the path to the channel.
+	"""
+
+	if channel.startswith("file://"):
+		# stdlib
+		from urllib.request import url2pathname
+
+		parsed = urlparse(channel)
+		return PathPlus(url2pathname(f"//{parsed.netloc}{parsed.path}" if parsed.netloc else parsed.path))
+	else:
+		return PathPlus(channel).expanduser()
+
+
+def resolve_channel(channel: str, base_dir: PathLike) -> str:
+	"""
+	Resolve a relative path to a local channel against ``base_dir``.
+
+	Other channels are returned unchanged.
+
+	:param channel:
+	:param base_dir: The directory relative paths are relative to, usually the project directory.
+	"""
+
+	if is_local_channel(channel) and not channel.startswith("file://"):
+		return (PathPlus(base_dir) / local_channel_path(channel)).resolve().as_posix()
+	else:
+		return channel
+
+
+def channel_url(channel: str) -> str:
+	"""
+	Returns the URL of the given conda channel.
+
+	Channels may be given by name (e.g. ``conda-forge``), which are looked up on :data:`~.CONDA_API_URL`,
+	or as the URL of the channel.
+
+	:param channel:
+	"""
+
+	if channel.startswith(("http://", "https://")):
+		return channel.rstrip('/')
+	else:
+		return f"{CONDA_API_URL}/{channel}"
+
+
+def make_session(pool_size: int = MAX_WORKERS) -> "requests.Session":
+	"""
+	Returns a :class:`requests.Session` for downloading channel listings.
+
+	Connections are pooled per host, so downloading several listings
+	from the same host reuses the same connections.
+
+	:param pool_size: The maximum number of connections to keep open to each host.
+	"""
+
+	# 3rd party
+	import requests
+	from requests.adapters import HTTPAdapter
+
+	session = requests.Session()
+	adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+	session.mount("http://", adapter)
+	session.mount("https://", adapter)
+	return session
+
+
+def fetch_channel_listing(channel: str, session: Optional["requests.Session"] = None) -> List[str]:
+	"""
+	Download the names of the packages in the given conda channel.
+
+	:param channel: The name or URL of the channel.
+	:param session: The session to download the listing with.
+
+	:raises ValueError: if the channel can't be found.
+	"""
+
+	if session is None:
+		with make_session(1) as session:
+			return fetch_channel_listing(channel, session)
+
+	conda_packages: Set[str] = set()
+	base_url = channel_url(channel)
+
+	for subdir in CHANNEL_SUBDIRS:
+		response = session.get(f"{base_url}/{subdir}/repodata.json", timeout=60)
+
+		if response.status_code == 404:
+			if subdir == "noarch":
+				raise ValueError(f"Conda channel {channel!r} not found.")
+			continue
+
+		response.raise_for_status()
+		repodata = response.json()
+
+		for key in ("packages", "packages.conda"):
+			for package in repodata.get(key, {}).values():
+				conda_packages.add(package["name"])
+
+	return sorted(conda_packages)
+
+
+def _get_local_channel_packages(channel: str) -> ChannelIndex:
+	channel_dir = local_channel_path(channel)
+	repodata_files = []
+
+	for subdir in CHANNEL_SUBDIRS:
+		for filename in REPODATA_FILENAMES:
+			repodata_file = channel_dir / subdir / filename
+			if repodata_file.is_file():
+				repodata_files.append(repodata_file)
+				break
+		else:
+			if subdir == "noarch":
+				raise ValueError(f"Conda channel {channel!r} not found.")
+
+	mtimes = tuple((repodata_file.as_posix(), repodata_file.stat().st_mtime_ns) for repodata_file in repodata_files)
+
+	if channel not in _channel_listings or _local_channel_mtimes.get(channel) != mtimes:
+		conda_packages: Set[str] = set()
+
+		for repodata_file in repodata_files:
+			repodata = repodata_file.load_json()
+			for key in ("packages", "packages.conda"):
+				for package in repodata.get(key, {}).values():
+					conda_packages.add(package["name"])
+
+		_channel_listings[channel] = ChannelIndex(conda_packages)
+		_local_channel_mtimes[channel] = mtimes
+
+	return _channel_listings[channel]
+
+
+def get_channel_packages(
+		channel: str,
+		session: Optional["requests.Session"] = None,
+		cache: Optional[ChannelCache] = None,
+		) -> ChannelIndex:
+	"""
+	Returns the names of the packages in the given conda channel.
+
+	The listing is held in memory, so is loaded at most once per process.
+	If ``cache`` is given the listing is read from it, and is only downloaded
+	(and stored in the cache) if it isn't in the cache or has expired.
+	The listings of local channels are read from the channel's ``repodata.json``
+	(or ``current_repodata.json``) files, and are reloaded if those files are modified.
+
+	:param channel:
+	:param session: The session to download the listing with.
+	:param cache:
+
+	:raises CacheMissError: if ``cache`` is in offline mode and doesn't contain the listing.
+	"""
+
+	if is_local_channel(channel):
+		return _get_local_channel_packages(channel)
+
+	if channel not in _channel_listings:
+		names = cache.get_listing(channel) if cache is not None else None
+
+		if names is None:
+			if cache is not None and cache.offline:
+				raise CacheMissError(
+						f"Cannot get the listing of the channel {channel!r} in offline mode: "
+						"it is not in the cache.",
+						)
+
+			names = fetch_channel_listing(channel, session)
+
+			if cache is not None:
+				cache.set_listing(channel, names)
+
+		_channel_listings[channel] = ChannelIndex(names)
+
+	return _channel_listings[channel]
+
+
+def prefetch_channels(
+		channels: Iterable[str],
+		max_workers: int = MAX_WORKERS,
+		cache: Optional[ChannelCache] = None,
+		) -> None:
+	"""
+	Download the listings of the given channels concurrently, ready for :func:`~.get_channel_packages`.
+
+	:param channels:
+	:param max_workers: The maximum number of listings to download at once.
+	:param cache: If given, listings in the cache are read from it rather than downloaded,
+		and the downloaded listings are stored in it.
+	"""
+
+	# stdlib
+	from concurrent.futures import ThreadPoolExecutor
+
+	to_fetch = []
+
+	for channel in dict.fromkeys(channels):
+		if channel in _channel_listings:
+			continue
+
+		names = cache.get_listing(channel) if cache is not None and not is_local_channel(channel) else None
+		if names is None:
+			to_fetch.append(channel)
+		else:
+			_channel_listings[channel] = ChannelIndex(names)
+
+	if not to_fetch:
+		return
+	elif len(to_fetch) == 1:
+		get_channel_packages(to_fetch[0], cache=cache)
+		return
+
+	workers = min(max_workers, len(to_fetch))
+
+	with make_session(workers) as session, ThreadPoolExecutor(workers) as executor:
+		futures = [executor.submit(get_channel_packages, channel, session, cache) for channel in to_fetch]
+
+		# Propagate the first error, in channel order.
+		for future in futures:
+			future.result()
+
+
+def clear_channel_listings() -> None:
+	"""
+	Clear the channel listings held in memory by :func:`~.get_channel_packages`.
+	"""
+
+	_channel_listings.clear()
+	_local_channel_mtimes.clear()
+
+
+def lookup_package(name: str, channel: str, cache: Optional[ChannelCache] = None) -> Optional[str]:
+	"""
+	Returns the name of the package ``name`` in ``channel``, or :py:obj:`None` if it can't be found.
+
+	The name in the channel may differ from ``name`` in its normalization (e.g. ``ruamel.yaml`` vs ``ruamel-yaml``).
+
+	:param name:
+	:param channel:
+	:param cache:
+
+	Local channels are always looked up in their index, and are never cached in ``cache``.
+
+	:raises CacheMissError: if ``cache`` is in offline mode and contains neither the lookup
+		nor the listing of the channel.
+	"""
+
+	if is_local_channel(channel):
+		return get_channel_packages(channel).match(name)
+
+	if cache is not None:
+		hit, match = cache.get(channel, name)
+		if hit:
+			return match
+
+	return _lookup_uncached(name, channel, cache)
+
+
+def _lookup_uncached(name: str, channel: str, cache: Optional[ChannelCache]) -> Optional[str]:
+	# Look up a package which isn't in the cache in the channel's listing, and store the result in the cache.
+
+	try:
+		match = get_channel_packages(channel, cache=cache).match(name)
+	except CacheMissError:
+		raise CacheMissError(
+				f"Cannot look up {name!r} in the channel {channel!r} in offline mode: "
+				"the result is not in the cache.",
+				) from None
+
+	if cache is not None:
+		cache.set(channel, name, match)
+
+	return match
+
+
+def validate_requirements(
+		requirements: Iterable[ComparableRequirement],
+		conda_channels: Iterable[str],
+		cache: Optional[ChannelCache] = None,
+		) -> List[ComparableRequirement]:
+	"""
+	Ensure that all requirements are available from the given conda channels,
+	and normalize the names to those in the conda channel.
+
+	This is equivalent to :func:`shippinglabel_conda.validate_requirements`,
+	but the result of each lookup is stored in ``cache``.
+	When all lookups are in the cache no channel listings are fetched.
+	Otherwise the listings of the channels which are required are downloaded concurrently,
+	and the requirements are then resolved in order, so the result is deterministic.
+	A package with exactly the requirement's name in any channel is preferred to one whose name
+	only matches after normalization, which is taken from the first channel containing it.
+
+	:param requirements:
+	:param conda_channels:
+	:param cache:
+
+	:raises CacheMissError: if ``cache`` is in offline mode and doesn't contain a lookup.
+	"""  # noqa: D400
+
+	# 3rd party
+	import shippinglabel_conda
+
+	validated_requirements = []
+	channels = DelimitedList(conda_channels)
+	requirements = list(requirements)
+
+	if cache is None or not cache.offline:
+		# Each lookup is read from the cache once, and the result reused when resolving the requirements.
+		probed = _probe_cache(requirements, channels, cache)
+		prefetch_channels((channel for (channel, _), (hit, _) in probed.items() if not hit), cache=cache)
+	else:
+		probed = {}
+
+	for requirement in requirements:
+
+		# Check alias_mapping first
+		if requirement.name in shippinglabel_conda.alias_mapping:
+			requirement.name = shippinglabel_conda.alias_mapping[requirement.name]
+			validated_requirements.append(requirement)
+			continue
+
+		# An exact name in any channel is preferred to a normalized match in an earlier channel.
+		normalized_match: Optional[str] = None
+
+		for channel in channels:
+			if (channel, requirement.name) in probed:
+				hit, match = probed[channel, requirement.name]
+				if not hit:
+					match = _lookup_uncached(requirement.name, channel, cache)
+			else:
+				match = lookup_package(requirement.name, channel, cache)
+
+			if match == requirement.name:
+				validated_requirements.append(requirement)
+				break
+			elif match is not None and normalized_match is None:
+				normalized_match = match
+		else:
+			if normalized_match is None:
+				raise InvalidRequirement(
+						f"Cannot satisfy the requirement {requirement.name!r} "
+						f"from any of the channels: '{channels:', '}'.",
+						)
+
+			requirement.name = normalized_match
+			validated_requirements.append(requirement)
+
+	if cache is not None and cache._new_entries:
+		cache._prune_if_due()
+
+	return validated_requirements
+
+
+def _probe_cache(
+		requirements: Iterable[ComparableRequirement],
+		channels: Iterable[str],
+		cache: Optional[ChannelCache],
+		) -> Dict[Tuple[str, str], Tuple[bool, Optional[str]]]:
+	# Returns a mapping of (channel, name) to whether the lookup was in the cache (or a local channel)
+	# and its result, for each lookup needed to resolve the requirements.
+	# Channels with misses need their listings fetched.
+
+	# 3rd party
+	import shippinglabel_conda
+
+	probed: Dict[Tuple[str, str], Tuple[bool, Optional[str]]] = {}
+
+	for requirement in requirements:
+		if requirement.name in shippinglabel_conda.alias_mapping:
+			continue
+
+		for channel in channels:
+			if is_local_channel(channel):
+				hit, match = True, get_channel_packages(channel).match(requirement.name)
+			elif cache is None:
+				hit, match = False, None
+			else:
+				hit, match = cache.get(channel, requirement.name)
+
+			probed[channel, requirement.name] = hit, match
+
+			if hit and match == requirement.name:
+				break
+
+	return probed
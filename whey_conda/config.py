@@ -27,14 +27,24 @@ Configuration for ``whey-conda``.
 #
 
 # stdlib
-from typing import Dict, List, Union
+import copy
+from typing import Any, Dict, List, Tuple, Union
 
 # 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
 from dom_toml.parser import TOML_TYPES, AbstractConfigParser, BadConfigError, construct_path
 from packaging.version import Version
 from typing_extensions import Literal
 
-__all__ = ("WheyCondaParser", )
+# this package
+from whey_conda.archive import get_archive_writer
+
+__all__ = ("WheyCondaParser", "clear_config_cache", "load_conda_config")
+
+# Mapping of the paths to pyproject.toml files to their modification time and size,
+# and the configuration parsed from them.
+_config_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
 
 
 class WheyCondaParser(AbstractConfigParser):
@@ -50,6 +60,9 @@ class WheyCondaParser(AbstractConfigParser):
 			"conda-channels": ("conda-forge", ),
 			"min-python-version": None,
 			"max-python-version": None,
+			"package-format": "tar.bz2",
+			"compression-threads": 1,
+			"compression-level": None,
 			}
 
 	table_name = ("tool", "whey-conda")
@@ -81,6 +94,8 @@ class WheyCondaParser(AbstractConfigParser):
 		"""
 		Parse the ``conda-channels`` key, giving a list of required conda channels to build and use the package.
 
+		Channels may also be given as URLs, or as ``file://`` URLs or paths to a local channel.
+
 		The default value is ``[]``.
 
 		:bold-title:`Example:`
@@ -181,6 +196,119 @@ class WheyCondaParser(AbstractConfigParser):
 		assert v.major == 3
 		return v.minor
 
+	def parse_package_format(self, config: Dict[str, TOML_TYPES]) -> str:
+		"""
+		Parse the ``package-format`` key, giving the format of the conda package to create.
+
+		* ``'tar.bz2'`` creates a legacy ``.tar.bz2`` package.
+		* ``'conda'`` creates a ``.conda`` (v2) package,
+		  which is much faster to extract but requires the ``zstandard`` package to build.
+
+		The default value is ``'tar.bz2'``.
+
+		:bold-title:`Example:`
+
+		.. code-block:: TOML
+
+			[tool.whey-conda]
+			package-format = "conda"
+
+		:param config: The unparsed TOML config for the ``[tool.whey-conda]`` table.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		package_format = config["package-format"]
+		path_elements = (*self.table_name, "package-format")
+		self.assert_type(package_format, str, path_elements)
+
+		package_format = package_format.lower().lstrip('.')
+		if package_format not in {"tar.bz2", "conda"}:
+			raise BadConfigError(
+					f"Invalid value for [{construct_path(path_elements)}]: "
+					"Expected 'tar.bz2' or 'conda'.",
+					)
+
+		return package_format
+
+	def parse_compression_threads(self, config: Dict[str, TOML_TYPES]) -> int:
+		"""
+		Parse the ``compression-threads`` key, giving the number of threads to compress the package with.
+
+		For ``.tar.bz2`` packages with more than one thread the package is split into 900 kB blocks
+		which are compressed in parallel, in the same manner as ``pbzip2``.
+
+		The special value ``0`` uses one thread per CPU.
+
+		The default value is ``1``.
+
+		:bold-title:`Example:`
+
+		.. code-block:: TOML
+
+			[tool.whey-conda]
+			compression-threads = 4
+
+		:param config: The unparsed TOML config for the ``[tool.whey-conda]`` table.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		threads = config["compression-threads"]
+		path_elements = (*self.table_name, "compression-threads")
+		self.assert_type(threads, int, path_elements)
+
+		if threads < 0:
+			raise BadConfigError(
+					f"Invalid value for [{construct_path(path_elements)}]: "
+					"Expected a positive integer or 0.",
+					)
+
+		# 0 is resolved by the archive writer, so the parsed config doesn't depend on the machine.
+		return threads
+
+	def parse_compression_level(self, config: Dict[str, TOML_TYPES]) -> int:
+		"""
+		Parse the ``compression-level`` key, giving the level to compress the package at.
+
+		Lower levels build faster, and higher levels give smaller packages.
+
+		* For ``.tar.bz2`` packages the level is between 1 and 9, and defaults to 9.
+		* For ``.conda`` packages the level is between 1 and 22, and defaults to 19.
+
+		The ``whey-conda auto-tune`` command compares the levels for a project.
+
+		:bold-title:`Example:`
+
+		.. code-block:: TOML
+
+			[tool.whey-conda]
+			package-format = "conda"
+			compression-level = 3
+
+		:param config: The unparsed TOML config for the ``[tool.whey-conda]`` table.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		level = config["compression-level"]
+		path_elements = (*self.table_name, "compression-level")
+		self.assert_type(level, int, path_elements)
+
+		package_format = str(config.get("package-format", self.defaults["package-format"])).lower().lstrip('.')
+		if package_format not in {"tar.bz2", "conda"}:
+			# Reported by parse_package_format()
+			return level
+
+		levels = get_archive_writer(package_format).compression_levels
+		if level not in levels:
+			raise BadConfigError(
+					f"Invalid value for [{construct_path(path_elements)}]: "
+					f"Expected an integer between {levels[0]} and {levels[-1]} for {package_format!r} packages.",
+					)
+
+		return level
+
 	@property
 	def keys(self) -> List[str]:
 		"""
@@ -193,6 +321,9 @@ class WheyCondaParser(AbstractConfigParser):
 				"conda-extras",
 				"min-python-version",
 				"max-python-version",
+				"package-format",
+				"compression-threads",
+				"compression-level",
 				]
 
 	def parse(
@@ -211,3 +342,55 @@ class WheyCondaParser(AbstractConfigParser):
 		"""
 
 		return super().parse(config, set_defaults=set_defaults)
+
+
+def load_conda_config(project_dir: PathLike) -> Dict[str, Any]:
+	"""
+	Returns the ``whey-conda`` configuration for the given project,
+	parsed from the ``[tool.mkrecipe]`` and ``[tool.whey-conda]`` tables of its ``pyproject.toml`` file.
+
+	Values from ``[tool.whey-conda]`` take precedence, and defaults are not set.
+
+	The parsed configuration is cached for the lifetime of the process,
+	so the file is only read and parsed again if its modification time or size changes.
+
+	:param project_dir: The project directory, which contains the ``pyproject.toml`` file.
+
+	.. versionadded:: 0.4.0
+	"""  # noqa: D400
+
+	# 3rd party
+	import dom_toml
+	from mkrecipe.config import MkrecipeParser
+
+	pyproject_file = PathPlus(project_dir).abspath() / "pyproject.toml"
+	stat = pyproject_file.stat()
+	stamp = (stat.st_mtime_ns, stat.st_size)
+
+	cached = _config_cache.get(pyproject_file.as_posix())
+
+	if cached is None or cached[0] != stamp:
+		pyproject = dom_toml.loads(pyproject_file.read_text())
+		tool_table = pyproject.get("tool", {})
+
+		config = MkrecipeParser().parse(tool_table.get("mkrecipe", {}), set_defaults=False)
+
+		if "extras" in config:
+			config["conda-extras"] = config["extras"]
+
+		config.update(WheyCondaParser().parse(tool_table.get("whey-conda", {}), set_defaults=False))
+
+		cached = _config_cache[pyproject_file.as_posix()] = (stamp, config)
+
+	# The caller may modify the returned configuration.
+	return copy.deepcopy(cached[1])
+
+
+def clear_config_cache() -> None:
+	"""
+	Clear the cache of configuration parsed by :func:`~.load_conda_config`.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	_config_cache.clear()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+#
+#  repodata.py
+"""
+Maintain the ``repodata.json`` index of a local conda channel.
+
+Packages built by ``whey-conda`` are ``noarch``, so the index and the packages belong
+in the channel's :file:`noarch` subdirectory. To use :file:`dist` as a channel, build into
+:file:`dist/noarch` (e.g. ``whey-conda build --index --out-dir dist/noarch``)
+and then point conda at :file:`dist` (``conda install -c ./dist <package>``).
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextlib
+import hashlib
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+__all__ = (
+		"LOCK_TIMEOUT",
+		"add_to_index",
+		"index_directory",
+		"lock_index",
+		"read_package_record",
+		"read_repodata",
+		)
+
+#: The time to wait for another process to finish updating the index, in seconds.
+#: Locks older than this are assumed to have been left behind by a process which crashed.
+LOCK_TIMEOUT: float = 60.0
+
+_PACKAGE_KEYS: Dict[str, str] = {".tar.bz2": "packages", ".conda": "packages.conda"}
+
+
+def _package_key(filename: str) -> Optional[str]:
+	# Returns the key in repodata.json for the package with the given filename, or None if it isn't a package.
+
+	for extension, key in _PACKAGE_KEYS.items():
+		if filename.endswith(extension):
+			return key
+
+	return None
+
+
+def read_repodata(directory: PathLike) -> Dict[str, Any]:
+	"""
+	Returns the content of the ``repodata.json`` file in ``directory``,
+	or an empty index if the file does not exist.
+
+	:param directory: The subdirectory of the channel, e.g. :file:`{<channel>}/noarch`.
+	"""  # noqa: D400
+
+	directory = PathPlus(directory)
+	repodata_file = directory / "repodata.json"
+
+	if repodata_file.is_file():
+		repodata = repodata_file.load_json()
+	else:
+		repodata = {}
+
+	repodata.setdefault("info", {"subdir": directory.name})
+	repodata.setdefault("packages", {})
+	repodata.setdefault("packages.conda", {})
+	repodata.setdefault("removed", [])
+	repodata.setdefault("repodata_version", 1)
+
+	return repodata
+
+
+def _write_repodata(directory: PathPlus, repodata: Dict[str, Any]) -> None:
+	# Replace repodata.json atomically, so readers never see a partially written file.
+
+	repodata_file = directory / "repodata.json"
+	tmp_file = directory / f"repodata.json.{os.getpid()}.tmp"
+	tmp_file.write_clean(json.dumps(repodata, indent=2, sort_keys=True))
+	os.replace(tmp_file, repodata_file)
+
+
+@contextlib.contextmanager
+def lock_index(directory: PathLike, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+	"""
+	Context manager to hold an exclusive lock on the ``repodata.json`` file in ``directory``
+	while it is updated, so that concurrent builds don't overwrite each other's entries.
+
+	The lock is the file :file:`.repodata.json.lock`, which is created exclusively.
+
+	:param directory: The subdirectory of the channel, e.g. :file:`{<channel>}/noarch`.
+	:param timeout: The time to wait for the lock, in seconds.
+
+	:raises TimeoutError: If the lock could not be acquired within ``timeout`` seconds.
+	"""  # noqa: D400
+
+	directory = PathPlus(directory)
+	directory.maybe_make(parents=True)
+	lock_file = directory / ".repodata.json.lock"
+	deadline = time.monotonic() + timeout
+
+	while True:
+		try:
+			fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+			break
+		except FileExistsError:
+			if _break_stale_lock(lock_file, timeout):
+				continue
+
+			if time.monotonic() > deadline:
+				raise TimeoutError(f"Could not acquire the lock on {lock_file.as_posix()!r}") from None
+
+			time.sleep(0.05)
+
+	try:
+		lock_id = _lock_id(os.fstat(fd))
+		os.close(fd)
+		yield
+	finally:
+		# If the lock was held for so long that another process broke it, that process now owns the lock file.
+		with contextlib.suppress(FileNotFoundError):
+			if _lock_id(lock_file.stat()) == lock_id:
+				lock_file.unlink()
+
+
+def _lock_id(stat: os.stat_result) -> Tuple[int, int, int]:
+	# Identifies a particular lock file, even if a new lock reuses the inode of an old one.
+	return stat.st_dev, stat.st_ino, stat.st_mtime_ns
+
+
+def _break_stale_lock(lock_file: PathPlus, timeout: float) -> bool:
+	# Remove the lock if it is older than ``timeout`` seconds, having been left behind by a process which crashed.
+	# Returns whether the lock no longer exists, in which case acquiring it should be retried.
+
+	try:
+		stat = lock_file.stat()
+	except FileNotFoundError:
+		return True
+
+	if time.time() - stat.st_mtime <= timeout:
+		return False
+
+	# Another process may break the stale lock and acquire a new one between the check and the removal,
+	# so the lock is first renamed atomically, and only removed if it is still the stale lock.
+	stale_file = lock_file.with_name(f"{lock_file.name}.{os.getpid()}.{threading.get_ident()}.stale")
+
+	try:
+		os.rename(lock_file, stale_file)
+	except FileNotFoundError:
+		return True
+
+	try:
+		if _lock_id(stale_file.stat()) != _lock_id(stat):
+			# A new lock was taken; put it back, unless yet another process has since taken the lock.
+			with contextlib.suppress(FileExistsError):
+				os.link(stale_file, lock_file)
+	finally:
+		stale_file.unlink()
+
+	return True
+
+
+def read_package_record(package: PathLike) -> Dict[str, Any]:
+	"""
+	Returns the entry for the given conda package in ``repodata.json``,
+	by reading its ``info/index.json`` file and hashing the package.
+
+	This reads the whole package, so the record written next to the package when it is built
+	(see :meth:`CondaArchiveWriter.write_repodata_record() <.CondaArchiveWriter.write_repodata_record>`)
+	should be used instead where possible.
+
+	:param package: The ``.tar.bz2`` or ``.conda`` package.
+	"""  # noqa: D400
+
+	package = PathPlus(package)
+
+	if package.name.endswith(".conda"):
+		# 3rd party
+		import zstandard
+
+		with zipfile.ZipFile(package) as conda_zip:
+			info_name = f"info-{package.name[:-len('.conda')]}.tar.zst"
+			info_data = zstandard.ZstdDecompressor().decompressobj().decompress(conda_zip.read(info_name))
+
+		info_tar = tarfile.open(fileobj=io.BytesIO(info_data))
+	else:
+		info_tar = tarfile.open(package)
+
+	with info_tar:
+		index_file = info_tar.extractfile("info/index.json")
+		if index_file is None:  # pragma: no cover
+			raise FileNotFoundError(f"'info/index.json' not found in {package.name!r}")
+		index = json.load(index_file)
+
+	md5 = hashlib.md5()
+	sha256 = hashlib.sha256()
+
+	with package.open("rb") as fp:
+		for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+			md5.update(chunk)
+			sha256.update(chunk)
+
+	return {**index, "md5": md5.hexdigest(), "sha256": sha256.hexdigest(), "size": package.stat().st_size}
+
+
+def add_to_index(directory: PathLike, records: Mapping[str, Dict[str, Any]]) -> None:
+	"""
+	Add or replace the entries for the given packages in the ``repodata.json`` file in ``directory``.
+
+	The other entries in the file are left untouched, and the packages are not read.
+
+	:param directory: The subdirectory of the channel, e.g. :file:`{<channel>}/noarch`.
+	:param records: Mapping of package filenames to their entries in ``repodata.json``
+		(see :meth:`CondaArchiveWriter.get_repodata_record() <.CondaArchiveWriter.get_repodata_record>`).
+	"""
+
+	directory = PathPlus(directory)
+
+	with lock_index(directory):
+		repodata = read_repodata(directory)
+
+		for filename, record in records.items():
+			key = _package_key(filename)
+			if key is None:
+				raise ValueError(f"{filename!r} is not a conda package.")
+
+			repodata[key][filename] = record
+
+		_write_repodata(directory, repodata)
+
+
+def index_directory(directory: PathLike) -> Dict[str, Any]:
+	"""
+	Update the ``repodata.json`` file in ``directory`` to match the conda packages in that directory.
+
+	Entries are removed for packages which no longer exist.
+	Packages which have not changed since the index was last written keep their existing entries,
+	and the records written next to packages when they are built are used where they are current.
+	Only packages with neither are read.
+
+	:param directory: The subdirectory of the channel, e.g. :file:`{<channel>}/noarch`.
+
+	:returns: The new content of the ``repodata.json`` file.
+	"""
+
+	directory = PathPlus(directory)
+
+	with lock_index(directory):
+		repodata_file = directory / "repodata.json"
+		repodata = read_repodata(directory)
+		indexed_at = repodata_file.stat().st_mtime_ns if repodata_file.is_file() else -1
+
+		new_packages: Dict[str, Dict[str, Any]] = {key: {} for key in _PACKAGE_KEYS.values()}
+
+		for package in sorted(directory.iterdir()):
+			key = _package_key(package.name)
+			if key is None or not package.is_file():
+				continue
+
+			stat = package.stat()
+			record = repodata[key].get(package.name)
+
+			if record is None or record.get("size") != stat.st_size or stat.st_mtime_ns > indexed_at:
+				record = _load_record_file(package, stat) or read_package_record(package)
+
+			new_packages[key][package.name] = record
+
+		repodata.update(new_packages)
+		_write_repodata(directory, repodata)
+
+	return repodata
+
+
+def _load_record_file(package: PathPlus, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+	# Returns the record written next to the package when it was built, if it is current.
+
+	record_file = package.with_name(f"{package.name}.json")
+
+	try:
+		if record_file.stat().st_mtime_ns < stat.st_mtime_ns:
+			return None
+		record = record_file.load_json()
+	except (FileNotFoundError, ValueError):
+		return None
+
+	if record.get("size") != stat.st_size:
+		return None
+
+	return record
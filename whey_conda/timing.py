@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+#
+#  timing.py
+"""
+Instrumentation of the phases of a build.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextlib
+import json
+import time
+from typing import Any, Dict, Iterator, List
+
+# 3rd party
+from domdf_python_tools.typing import PathLike
+
+__all__ = ("BuildTimings", "PhaseTiming")
+
+
+class PhaseTiming:
+	"""
+	The time taken by, and the amount of data processed in, one phase of a build.
+
+	:param name: The name of the phase. The names of nested phases are joined with ``/``.
+	"""
+
+	def __init__(self, name: str):
+
+		#: The name of the phase.
+		self.name: str = name
+
+		#: The wall-clock time taken by the phase, in seconds.
+		self.wall_time: float = 0.0
+
+		#: The CPU time used by the process (in all threads) during the phase, in seconds.
+		self.cpu_time: float = 0.0
+
+		#: The number of bytes read during the phase.
+		self.bytes_read: int = 0
+
+		#: The number of bytes written during the phase.
+		self.bytes_written: int = 0
+
+		#: The number of files processed during the phase.
+		self.files: int = 0
+
+	def to_dict(self) -> Dict[str, Any]:
+		"""
+		Returns a dictionary representation of the timing, for serialising to JSON.
+		"""
+
+		return {
+				"name": self.name,
+				"wall_time": self.wall_time,
+				"cpu_time": self.cpu_time,
+				"bytes_read": self.bytes_read,
+				"bytes_written": self.bytes_written,
+				"files": self.files,
+				}
+
+	def __repr__(self) -> str:
+		return f"<PhaseTiming {self.name!r} ({self.wall_time:.3f}s)>"
+
+
+class BuildTimings:
+	"""
+	Records the time taken by, and the amount of data processed in, each phase of a build.
+
+	Phases may be nested, in which case the time of the inner phase is included in the time of the outer phase.
+	"""
+
+	def __init__(self) -> None:
+
+		#: The phases, in the order they started.
+		self.phases: List[PhaseTiming] = []
+
+		self._stack: List[str] = []
+
+	@contextlib.contextmanager
+	def phase(self, name: str) -> Iterator[PhaseTiming]:
+		"""
+		Context manager to time a phase of the build.
+
+		The :class:`~.PhaseTiming` is yielded so the amount of data processed can be recorded.
+
+		:param name:
+		"""
+
+		self._stack.append(name)
+		timing = PhaseTiming('/'.join(self._stack))
+		self.phases.append(timing)
+
+		start_wall = time.perf_counter()
+		start_cpu = time.process_time()
+
+		try:
+			yield timing
+		finally:
+			timing.wall_time += time.perf_counter() - start_wall
+			timing.cpu_time += time.process_time() - start_cpu
+			self._stack.pop()
+
+	@property
+	def total_time(self) -> float:
+		"""
+		The total wall-clock time of the outermost phases, in seconds.
+		"""
+
+		return sum(timing.wall_time for timing in self.phases if '/' not in timing.name)
+
+	def to_dict(self) -> Dict[str, Any]:
+		"""
+		Returns a dictionary representation of the timings, for serialising to JSON.
+		"""
+
+		return {"phases": [timing.to_dict() for timing in self.phases], "total_time": self.total_time}
+
+	def dump(self, filename: PathLike, **extra: Any) -> None:
+		"""
+		Write the timings to the given file as JSON.
+
+		:param filename:
+		:param extra: Additional keys to include in the JSON object, such as the name of the project.
+		"""
+
+		with open(filename, 'w', encoding="UTF-8") as fp:
+			json.dump({**extra, **self.to_dict()}, fp, indent=2)
+			fp.write('\n')
+
+	def format_table(self) -> str:
+		"""
+		Returns the timings formatted as a table for display in the terminal.
+		"""
+
+		rows = [("Phase", "Wall (s)", "CPU (s)", "Read (kB)", "Written (kB)", "Files")]
+
+		for timing in self.phases:
+			depth = timing.name.count('/')
+			rows.append((
+					f"{'  ' * depth}{timing.name.rsplit('/', 1)[-1]}",
+					f"{timing.wall_time:.3f}",
+					f"{timing.cpu_time:.3f}",
+					f"{timing.bytes_read / 1000:.1f}",
+					f"{timing.bytes_written / 1000:.1f}",
+					str(timing.files),
+					))
+
+		widths = [max(len(row[idx]) for row in rows) for idx in range(len(rows[0]))]
+
+		lines = []
+		for row in rows:
+			cells = [row[0].ljust(widths[0])]
+			cells.extend(cell.rjust(width) for cell, width in zip(row[1:], widths[1:]))
+			lines.append("  ".join(cells).rstrip())
+
+		return '\n'.join(lines)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+#
+#  tune.py
+"""
+Compare the time taken to build, and the size of, conda packages with different compression settings.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import contextlib
+import io
+import tempfile
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+# this package
+from whey_conda.timing import BuildTimings
+
+if False:  # TYPE_CHECKING:  # pylint: disable=using-constant-test
+	# this package
+	from whey_conda.channels import ChannelCache
+
+__all__ = ("DEFAULT_CANDIDATES", "TuneResult", "auto_tune")
+
+#: The package formats and compression levels compared by :func:`~.auto_tune` by default.
+DEFAULT_CANDIDATES: Tuple[Tuple[str, int], ...] = (
+		("tar.bz2", 1),
+		("tar.bz2", 5),
+		("tar.bz2", 9),
+		("conda", 1),
+		("conda", 3),
+		("conda", 10),
+		("conda", 19),
+		("conda", 22),
+		)
+
+
+class TuneResult(NamedTuple):
+	"""
+	The time taken to create, and the size of, a conda package with one compression setting.
+	"""
+
+	#: The package format, as used in the :conf:`package-format` option.
+	package_format: str
+
+	#: The compression level, as used in the :conf:`compression-level` option.
+	level: int
+
+	#: The time taken to write the package, in seconds.
+	duration: float
+
+	#: The size of the package, in bytes.
+	size: int
+
+	#: The size of the package contents before compression, in bytes.
+	content_size: int
+
+	@property
+	def ratio(self) -> float:
+		"""
+		The size of the package as a fraction of the size of its contents.
+		"""
+
+		if not self.content_size:
+			return 1.0
+
+		return self.size / self.content_size
+
+
+def auto_tune(
+		project_dir: PathLike,
+		candidates: Iterable[Tuple[str, int]] = DEFAULT_CANDIDATES,
+		*,
+		threads: Optional[int] = None,
+		repeat: int = 1,
+		channel_cache: Optional["ChannelCache"] = None,
+		) -> List[TuneResult]:
+	"""
+	Build a wheel for the project, and convert it to a conda package with each of the given package formats
+	and compression levels in turn.
+
+	The packages are written to a temporary directory and discarded.
+
+	:param project_dir: The project to build the packages for.
+	:param candidates: Tuples of a package format and a compression level.
+	:param threads: The number of threads to compress with.
+		Defaults to the project's :conf:`compression-threads` option.
+	:param repeat: The number of times to create each package. The shortest time is reported.
+	:param channel_cache: The cache to use for looking up requirements in conda channels.
+
+	:returns: The time taken to write, and the size of, each package, in the order of ``candidates``.
+	"""  # noqa: D400
+
+	# 3rd party
+	from whey.foreman import Foreman
+
+	# this package
+	from whey_conda import CondaBuilder
+
+	foreman = Foreman(project_dir=PathPlus(project_dir))
+	results = []
+
+	with tempfile.TemporaryDirectory() as tmpdir:
+		tmp_path = PathPlus(tmpdir)
+
+		builder = CondaBuilder(
+				project_dir=foreman.project_dir,
+				config=foreman.config,
+				build_dir=tmp_path / "build",
+				out_dir=tmp_path / "dist",
+				colour=False,
+				channel_cache=channel_cache,
+				)
+
+		if threads is not None:
+			builder.config["compression-threads"] = threads
+
+		# The builder prints its progress, which isn't of interest here.
+		with contextlib.redirect_stdout(io.StringIO()):
+			wheel_file = builder.out_dir / builder.build_wheel()
+
+		for package_format, level in candidates:
+			builder.config["package-format"] = package_format
+			builder.config["compression-level"] = level
+			durations = []
+
+			for _ in range(repeat):
+				builder.timings = BuildTimings()
+				conda_file = builder.out_dir / builder.create_conda_archive_from_wheel(wheel_file)
+
+				timing = next(timing for timing in builder.timings.phases if timing.name == "archive")
+				durations.append(timing.wall_time)
+
+				conda_file.unlink()
+				conda_file.with_name(f"{conda_file.name}.json").unlink()
+
+			results.append(
+					TuneResult(
+							package_format=package_format,
+							level=level,
+							duration=min(durations),
+							size=timing.bytes_written,
+							content_size=timing.bytes_read,
+							),
+					)
+
+	return results
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+#
+#  wheel.py
+"""
+Read the contents of wheels for conversion into conda packages.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import csv
+import io
+import posixpath
+import tarfile
+import time
+import zipfile
+from base64 import urlsafe_b64encode
+from functools import partial
+from operator import attrgetter
+from typing import IO, Callable, Dict, Iterator, List, NamedTuple, Optional, Union
+
+# 3rd party
+from shippinglabel.checksum import get_sha256_hash
+
+if False:  # TYPE_CHECKING:  # pylint: disable=using-constant-test
+	# this package
+	from whey_conda.archive import CondaArchiveWriter, FanOutWriter
+
+__all__ = (
+		"INSTALLER",
+		"InstalledFile",
+		"add_wheel_to_archive",
+		"find_dist_info",
+		"iter_installed_files",
+		"read_record",
+		"record_digest",
+		)
+
+INSTALLER = b"conda\n"
+"""
+The content of the ``*.dist-info/INSTALLER`` file in conda packages.
+"""
+
+# Files pip creates when installing a wheel, which are either regenerated or excluded from conda packages.
+_installer_files = frozenset({"INSTALLER", "REQUESTED", "direct_url.json"})
+
+
+class InstalledFile(NamedTuple):
+	"""
+	Represents a file which is installed into ``site-packages`` from a wheel.
+
+	The content of the file is only read (and decompressed) when :attr:`~.InstalledFile.opener` is called.
+	"""
+
+	#: The path of the file, relative to ``site-packages``.
+	path: str
+
+	#: The size of the file, in bytes.
+	size: int
+
+	#: The permissions of the file.
+	mode: int
+
+	#: The modification time of the file, as a Unix timestamp.
+	mtime: float
+
+	#: Callable which returns a binary file object for reading the content of the file.
+	opener: Callable[[], IO[bytes]]
+
+	def to_tarinfo(self, arcname: str) -> tarfile.TarInfo:
+		"""
+		Returns a :class:`tarfile.TarInfo` header for the file.
+
+		:param arcname: The name of the member in the archive.
+		"""
+
+		tarinfo = tarfile.TarInfo(arcname)
+		tarinfo.size = self.size
+		tarinfo.mode = self.mode
+		tarinfo.mtime = int(self.mtime)
+		return tarinfo
+
+	@classmethod
+	def from_bytes(cls, path: str, data: bytes, mode: int = 0o644) -> "InstalledFile":
+		"""
+		Construct an :class:`~.InstalledFile` for a file with content generated in memory.
+
+		:param path: The path of the file, relative to ``site-packages``.
+		:param data: The content of the file.
+		:param mode: The permissions of the file.
+		"""
+
+		return cls(path, len(data), mode, time.time(), partial(io.BytesIO, data))
+
+
+def record_digest(data: bytes) -> str:
+	"""
+	Returns the hash of the given content, in the format used in :pep:`376` ``RECORD`` files.
+
+	:param data:
+
+	.. versionadded:: 0.4.0
+	"""
+
+	sha256_hash = get_sha256_hash(io.BytesIO(data)).digest()
+	return "sha256=" + urlsafe_b64encode(sha256_hash).decode("latin1").rstrip('=')
+
+
+def _record_row(filename: str, data: bytes) -> List[str]:
+	"""
+	Constructs a :pep:`376` ``RECORD`` row for a file with the given content.
+
+	:param filename: The filename, relative to ``site-packages``.
+	:param data: The content of the file.
+	"""
+
+	return [filename, record_digest(data), str(len(data))]
+
+
+def find_dist_info(wheel: zipfile.ZipFile) -> str:
+	"""
+	Returns the name of the ``*.dist-info`` directory in the given wheel.
+
+	:param wheel:
+
+	:raises ValueError: If the wheel does not contain a ``*.dist-info`` directory.
+	"""
+
+	for name in wheel.namelist():
+		directory, filename = posixpath.split(name)
+		if filename == "WHEEL" and directory.endswith(".dist-info") and '/' not in directory:
+			return directory
+
+	raise ValueError(f"No '*.dist-info' directory found in {wheel.filename!r}")
+
+
+def read_record(wheel: zipfile.ZipFile) -> Dict[str, str]:
+	"""
+	Returns a mapping of the files listed in the wheel's ``RECORD`` file to their hashes.
+
+	Files without a hash (such as ``RECORD`` itself) map to an empty string.
+
+	:param wheel:
+
+	.. versionadded:: 0.4.0
+	"""
+
+	record = wheel.read(posixpath.join(find_dist_info(wheel), "RECORD")).decode("UTF-8")
+	return {row[0]: row[1] for row in csv.reader(record.splitlines()) if row}
+
+
+def _installed_path(name: str, data_dir: str) -> Optional[str]:
+	"""
+	Returns the path relative to ``site-packages`` that the wheel member ``name`` is installed to,
+	or :py:obj:`None` if the file is not installed into ``site-packages``.
+
+	:param name:
+	:param data_dir: The name of the ``*.data`` directory in the wheel.
+	"""  # noqa: D400
+
+	if name.startswith(f"{data_dir}/"):
+		scheme, _, path = name[len(data_dir) + 1:].partition('/')
+		if scheme in {"purelib", "platlib"} and path:
+			return path
+		else:
+			return None
+
+	return name
+
+
+def _rewrite_record(record: bytes, dist_info: str, data_dir: str) -> bytes:
+	"""
+	Rewrite the wheel's ``RECORD`` file to reflect the files in the conda package.
+
+	:param record: The original content of the ``RECORD`` file.
+	:param dist_info: The name of the ``*.dist-info`` directory.
+	:param data_dir: The name of the ``*.data`` directory.
+	"""
+
+	rows: List[List[str]] = []
+
+	for row in csv.reader(record.decode("UTF-8").splitlines()):
+		if not row:
+			continue
+
+		path = _installed_path(row[0], data_dir)
+		if path is None:
+			continue
+		elif posixpath.dirname(path) == dist_info and posixpath.basename(path) in _installer_files:
+			continue
+
+		rows.append([path, *row[1:]])
+
+	installer_path = posixpath.join(dist_info, "INSTALLER")
+	rows.append(_record_row(installer_path, INSTALLER))
+
+	buf = io.StringIO()
+	writer = csv.writer(buf, lineterminator='\n')
+	writer.writerows(sorted(rows))
+
+	return buf.getvalue().encode("UTF-8")
+
+
+def _get_mode(zip_info: zipfile.ZipInfo) -> int:
+	# Match pip, which makes the file executable if any of the executable bits are set.
+	if (zip_info.external_attr >> 16) & 0o111:
+		return 0o755
+	else:
+		return 0o644
+
+
+def iter_installed_files(wheel: zipfile.ZipFile, sort: bool = False) -> Iterator[InstalledFile]:
+	"""
+	Iterate over the files which are installed into ``site-packages`` from the given wheel.
+
+	This mirrors what ``pip install --target`` does, without needing to extract the wheel to disk,
+	except that the ``*.dist-info/INSTALLER`` file says ``conda`` rather than ``pip``,
+	and the ``*.dist-info/REQUESTED`` and ``*.dist-info/direct_url.json`` files are not created.
+	The ``*.dist-info/RECORD`` file is updated accordingly, in memory.
+
+	Files in the wheel's ``*.data`` directory which are not installed into ``site-packages``
+	(such as scripts and headers) are skipped.
+
+	:param wheel:
+	:param sort: Iterate over the files in order of their installed paths,
+		rather than in the order in which they appear in the wheel.
+	"""
+
+	if sort:
+		yield from sorted(iter_installed_files(wheel), key=attrgetter("path"))
+		return
+
+	dist_info = find_dist_info(wheel)
+	data_dir = f"{dist_info[:-len('.dist-info')]}.data"
+	record_info: Optional[zipfile.ZipInfo] = None
+
+	for zip_info in wheel.infolist():
+		if zip_info.is_dir():
+			continue
+
+		path = _installed_path(zip_info.filename, data_dir)
+		if path is None:
+			continue
+
+		mtime = time.mktime(zip_info.date_time + (0, 0, -1))
+
+		if posixpath.dirname(path) == dist_info:
+			filename = posixpath.basename(path)
+			if filename == "RECORD":
+				record_info = zip_info
+				continue
+			elif filename in _installer_files:
+				continue
+
+		yield InstalledFile(path, zip_info.file_size, _get_mode(zip_info), mtime, partial(wheel.open, zip_info))
+
+	yield InstalledFile.from_bytes(posixpath.join(dist_info, "INSTALLER"), INSTALLER)
+
+	if record_info is not None:
+		record = _rewrite_record(wheel.read(record_info), dist_info, data_dir)
+		yield InstalledFile.from_bytes(posixpath.join(dist_info, "RECORD"), record)
+
+
+def add_wheel_to_archive(
+		conda_archive: Union["CondaArchiveWriter", "FanOutWriter"],
+		wheel: zipfile.ZipFile,
+		sort: bool = False,
+		) -> List[str]:
+	"""
+	Add the files which are installed into ``site-packages`` from the given wheel to the conda archive.
+
+	The content of each file is decompressed straight into the archive.
+
+	:param conda_archive: The archive, or a :class:`~.FanOutWriter` to add the files to several archives at once.
+	:param wheel:
+	:param sort: Add the files in order of their names, rather than the order in which they appear in the wheel.
+
+	:returns: The paths of the files in the archive, for the ``info/files`` file.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	files_entries = []
+
+	for file in iter_installed_files(wheel, sort=sort):
+		filename = posixpath.join("site-packages", file.path)
+		files_entries.append(filename)
+
+		with file.opener() as fp:
+			conda_archive.addfile(file.to_tarinfo(filename), fp)
+
+	return files_entries
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+#
+#  wheel2conda.py
+"""
+Convert existing wheels, such as those from PyPI, to conda packages.
+
+The conda package metadata is read from each wheel's ``METADATA`` file,
+so no ``pyproject.toml`` file is required.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2026 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import json
+import os
+import posixpath
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import getaddresses
+from functools import partial
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+# 3rd party
+from dist_meta import metadata
+from dist_meta.metadata_mapping import MetadataMapping
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+from mkrecipe import filter_reqs_with_markers
+from packaging.markers import Marker
+from shippinglabel.requirements import ComparableRequirement
+from shippinglabel_conda import make_conda_description, prepare_requirements
+
+# this package
+from whey_conda.archive import (
+		_clean,
+		_get_about_urls,
+		_get_timestamp,
+		_pin_numpy,
+		get_archive_writer,
+		get_source_date_epoch
+		)
+from whey_conda.channels import ChannelCache, is_local_channel, validate_requirements
+from whey_conda.repodata import add_to_index
+from whey_conda.wheel import add_wheel_to_archive, find_dist_info
+
+__all__ = ("ConversionResult", "WheelConverter", "convert_wheels", "find_wheels")
+
+# The Python versions environment markers are evaluated for when detecting requirements for extras.
+_PYTHON_VERSIONS = tuple(f"3.{minor}" for minor in range(6, 15))
+
+
+class WheelConverter:
+	"""
+	Converts pure-Python wheels to conda packages, using the metadata in each wheel's ``METADATA`` file.
+
+	:param out_dir: The output directory.
+	:param conda_channels: The conda channels to check the requirements against.
+	:param package_format: The format of the conda packages. Either ``'tar.bz2'`` or ``'conda'``.
+	:param compression_threads: The number of threads to compress each package with.
+	:param build_number:
+	:param channel_cache: The cache to use for looking up requirements in conda channels.
+		Defaults to a cache configured from environment variables by :meth:`ChannelCache.from_environment() <.ChannelCache.from_environment>`.
+	:param update_index: Add the packages to the ``repodata.json`` file in the output directory,
+		which should be the :file:`noarch` subdirectory of a local conda channel.
+	"""
+
+	def __init__(
+			self,
+			out_dir: PathLike,
+			conda_channels: Sequence[str] = ("conda-forge", ),
+			*,
+			package_format: str = "tar.bz2",
+			compression_threads: int = 1,
+			build_number: int = 1,
+			channel_cache: Optional[ChannelCache] = None,
+			update_index: bool = False,
+			):
+
+		if channel_cache is None:
+			channel_cache = ChannelCache.from_environment()
+
+		#: The output directory.
+		self.out_dir = PathPlus(out_dir)
+
+		#: The conda channels to check the requirements against.
+		self.conda_channels: List[str] = list(conda_channels)
+
+		#: The format of the conda packages.
+		self.package_format = package_format
+
+		#: The number of threads to compress each package with.
+		self.compression_threads = compression_threads
+
+		#: The build number of the packages.
+		self.build_number = build_number
+
+		#: The cache to use for looking up requirements in conda channels.
+		self.channel_cache: ChannelCache = channel_cache
+
+		#: Add the packages to the ``repodata.json`` file in the output directory.
+		self.update_index: bool = update_index
+
+	def get_runtime_requirements(self, metadata_map: MetadataMapping) -> List[ComparableRequirement]:
+		"""
+		Returns a list of the runtime requirements of the wheel.
+
+		Requirements which are only needed for the extras listed in ``Provides-Extra`` are excluded.
+
+		:param metadata_map: The content of the wheel's ``METADATA`` file.
+		"""
+
+		requirements = []
+		extras = metadata_map.get_all("Provides-Extra", ())
+
+		for requirement in map(ComparableRequirement, metadata_map.get_all("Requires-Dist", ())):
+			if requirement.marker is not None and _is_for_extra(requirement.marker, extras):
+				continue
+			requirements.append(requirement)
+
+		all_requirements = validate_requirements(
+				prepare_requirements(filter_reqs_with_markers({"dependencies": []}, requirements)),
+				self.conda_channels,
+				cache=self.channel_cache,
+				)
+
+		return _pin_numpy(all_requirements)
+
+	def get_conda_index(self, metadata_map: MetadataMapping) -> Dict[str, Any]:
+		"""
+		Returns the content of the conda ``index.json`` file.
+
+		:param metadata_map: The content of the wheel's ``METADATA`` file.
+		"""
+
+		return {
+				"name": metadata_map["Name"].lower(),
+				"version": metadata_map["Version"],
+				"build": f"py_{self.build_number}",
+				"build_number": self.build_number,
+				"depends": [*map(str, self.get_runtime_requirements(metadata_map)), "python"],
+				"arch": None,
+				"noarch": "python",
+				"platform": None,
+				"subdir": "noarch",
+				"timestamp": _get_timestamp(),
+				}
+
+	def get_conda_about(self, metadata_map: MetadataMapping) -> Dict[str, Any]:
+		"""
+		Returns the content of the conda ``about.json`` file.
+
+		:param metadata_map: The content of the wheel's ``METADATA`` file.
+		"""
+
+		urls = {}
+		if "Home-page" in metadata_map:
+			urls["Homepage"] = metadata_map["Home-page"]
+
+		for project_url in metadata_map.get_all("Project-URL", ()):
+			category, _, url = project_url.partition(',')
+			urls[category.strip()] = url.strip()
+
+		about: Dict[str, Any] = _get_about_urls(urls)
+
+		about["license"] = metadata_map.get("License-Expression", metadata_map.get("License"))
+
+		summary = metadata_map.get("Summary", '')
+		if summary:
+			about["summary"] = summary
+
+		about["description"] = make_conda_description(
+				summary,
+				[channel for channel in self.conda_channels if not is_local_channel(channel)],
+				)
+
+		maintainers = _get_names(metadata_map, "Maintainer") or _get_names(metadata_map, "Author")
+		if maintainers:
+			about["extra"] = {"maintainers": maintainers}
+
+		return about
+
+	def get_info_files(self, wheel: zipfile.ZipFile, metadata_map: MetadataMapping) -> Dict[str, bytes]:
+		"""
+		Returns the content of the files in the ``info`` directory of the conda package,
+		except for ``info/files`` and ``info/paths.json``, which depend on the contents of the package.
+
+		:param wheel:
+		:param metadata_map: The content of the wheel's ``METADATA`` file.
+		"""  # noqa: D400
+
+		info_files = {}
+		dist_info = find_dist_info(wheel)
+		names = set(wheel.namelist())
+
+		for license_file in metadata_map.get_all("License-File", ()):
+			for filename in (f"{dist_info}/licenses/{license_file}", f"{dist_info}/{license_file}"):
+				if filename in names:
+					info_files["info/license.txt"] = _clean(wheel.read(filename).decode("UTF-8"))
+					break
+			if info_files:
+				break
+
+		info_files["info/about.json"] = _clean(json.dumps(self.get_conda_about(metadata_map), indent=2))
+		info_files["info/index.json"] = _clean(json.dumps(self.get_conda_index(metadata_map), indent=2))
+
+		return info_files
+
+	def convert(self, wheel_file: PathLike) -> PathPlus:
+		"""
+		Convert the given wheel to a conda package.
+
+		:param wheel_file:
+
+		:raises ValueError: If the wheel is not a pure-Python wheel.
+
+		:returns: The path to the conda package.
+		"""
+
+		wheel_file = PathPlus(wheel_file)
+
+		if not wheel_file.stem.endswith("-none-any"):
+			raise ValueError(f"{wheel_file.name!r} is not a pure-Python wheel.")
+
+		writer_cls = get_archive_writer(self.package_format)
+
+		with zipfile.ZipFile(wheel_file) as wheel:
+			metadata_map = metadata.loads(wheel.read(posixpath.join(find_dist_info(wheel), "METADATA")).decode("UTF-8"))
+			info_files = self.get_info_files(wheel, metadata_map)
+
+			name = metadata_map["Name"].lower()
+			conda_filename = self.out_dir / f"{name}-{metadata_map['Version']}-py_{self.build_number}{writer_cls.extension}"
+			self.out_dir.maybe_make(parents=True)
+
+			source_date_epoch = get_source_date_epoch()
+
+			with writer_cls(
+					conda_filename,
+					threads=self.compression_threads,
+					source_date_epoch=source_date_epoch,
+					) as conda_archive:
+				files_entries = add_wheel_to_archive(conda_archive, wheel, sort=source_date_epoch is not None)
+				info_files["info/files"] = _clean('\n'.join(files_entries))
+				info_files["info/paths.json"] = _clean(conda_archive.get_paths_json())
+
+				for filename, content in info_files.items():
+					conda_archive.add_bytes(filename, content)
+
+			index = json.loads(info_files["info/index.json"])
+			conda_archive.write_repodata_record(index)
+
+			if self.update_index:
+				add_to_index(self.out_dir, {conda_filename.name: conda_archive.get_repodata_record(index)})
+
+		return conda_filename
+
+
+class ConversionResult(NamedTuple):
+	"""
+	The result of converting a single wheel with :func:`~.convert_wheels`.
+	"""
+
+	#: The wheel.
+	wheel: str
+
+	#: Whether the wheel was converted successfully.
+	success: bool
+
+	#: The absolute path to the conda package, or :py:obj:`None` if the conversion failed.
+	archive: Optional[str]
+
+	#: The time taken to convert the wheel, in seconds.
+	duration: float
+
+	#: A description of the error which caused the conversion to fail, or :py:obj:`None` if it succeeded.
+	error: Optional[str] = None
+
+
+def find_wheels(paths: Iterable[PathLike]) -> List[PathPlus]:
+	"""
+	Returns the wheels in the given paths.
+
+	:param paths: Wheel files, or directories which contain wheel files.
+	"""
+
+	wheels = []
+
+	for path in map(PathPlus, paths):
+		if path.is_dir():
+			wheels.extend(sorted(path.glob("*.whl")))
+		else:
+			wheels.append(path)
+
+	return wheels
+
+
+def _convert_wheel(wheel_file: PathPlus, **kwargs) -> ConversionResult:
+	start_time = time.perf_counter()
+
+	try:
+		archive = WheelConverter(**kwargs).convert(wheel_file)
+	except Exception as e:
+		return ConversionResult(
+				wheel=wheel_file.as_posix(),
+				success=False,
+				archive=None,
+				duration=time.perf_counter() - start_time,
+				error=f"{type(e).__name__}: {e}",
+				)
+
+	return ConversionResult(
+			wheel=wheel_file.as_posix(),
+			success=True,
+			archive=archive.abspath().as_posix(),
+			duration=time.perf_counter() - start_time,
+			)
+
+
+def convert_wheels(
+		wheels: Iterable[PathLike],
+		out_dir: PathLike,
+		conda_channels: Sequence[str] = ("conda-forge", ),
+		*,
+		jobs: Optional[int] = None,
+		package_format: str = "tar.bz2",
+		offline: Optional[bool] = None,
+		update_index: bool = False,
+		) -> List[ConversionResult]:
+	"""
+	Convert many wheels to conda packages on a pool of worker processes.
+
+	A failure to convert one wheel does not stop the other wheels from being converted.
+
+	:param wheels: The wheels to convert.
+	:param out_dir: The output directory.
+	:param conda_channels: The conda channels to check the requirements against.
+	:param jobs: The number of wheels to convert at once. Defaults to the number of CPUs.
+	:param package_format: The format of the conda packages. Either ``'tar.bz2'`` or ``'conda'``.
+	:param offline: Only use cached conda channel lookups.
+		Defaults to the value of the :envvar:`WHEY_CONDA_OFFLINE` environment variable.
+	:param update_index: Add the packages to the ``repodata.json`` file in the output directory,
+		which should be the :file:`noarch` subdirectory of a local conda channel.
+
+	:returns: The result for each wheel, in the same order as ``wheels``.
+	"""
+
+	wheel_files = [PathPlus(wheel_file).abspath() for wheel_file in wheels]
+	worker = partial(
+			_convert_wheel,
+			out_dir=PathPlus(out_dir).abspath(),
+			conda_channels=list(conda_channels),
+			package_format=package_format,
+			channel_cache=ChannelCache.from_environment(offline=offline),
+			update_index=update_index,
+			)
+
+	if jobs is None:
+		jobs = os.cpu_count() or 1
+
+	jobs = max(1, min(jobs, len(wheel_files)))
+
+	if jobs == 1:
+		return [worker(wheel_file) for wheel_file in wheel_files]
+
+	with ProcessPoolExecutor(max_workers=jobs) as executor:
+		return list(executor.map(worker, wheel_files))
+
+
+def _get_names(metadata_map: MetadataMapping, field: str) -> List[str]:
+	# Returns the names from the e.g. "Author" and "Author-email" fields.
+
+	names = []
+
+	if field in metadata_map:
+		names.append(metadata_map[field])
+
+	for name, _ in getaddresses(metadata_map.get_all(f"{field}-email", ())):
+		if name:
+			names.append(name)
+
+	return names
+
+
+def _is_for_extra(marker: Marker, extras: Iterable[str]) -> bool:
+	# Returns whether a requirement with the given marker is only needed for one of the extras.
+	# The marker is evaluated for each supported Python version, so that a requirement for
+	# e.g. an extra on older Pythons isn't mistaken for a runtime requirement.
+
+	environments = [
+			{"python_version": version, "python_full_version": f"{version}.0"} for version in _PYTHON_VERSIONS
+			]
+
+	if any(marker.evaluate({**environment, "extra": ''}) for environment in environments):
+		return False
+
+	return any(marker.evaluate({**environment, "extra": extra}) for environment in environments for extra in extras)